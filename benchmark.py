@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+non-interactive benchmark suite for all implementations
+
+runs a fixed catalogue of problems with each engine, a few times after a
+warmup, and reports median / stddev of running time, peak memory and search
+nodes per second, results can be written into a JSON file and compared with
+a baseline file to find regressions
+
+examples:
+    ./benchmark.py list
+    ./benchmark.py run --tier smoke --output baseline.json
+    ./benchmark.py run --tier smoke --output current.json
+    ./benchmark.py compare baseline.json current.json
+"""
+
+import sys
+import json
+import platform
+import statistics
+import tracemalloc
+import argparse
+from time import perf_counter, strftime
+
+from pieces import ChessPiece
+from solution import (
+    find_solutions_s,
+    find_solutions_r,
+    find_solutions_q,
+    find_solutions_bb,
+    find_solutions_pm,
+    find_solutions_u,
+    find_solutions,
+    count_solutions,
+)
+from solution_symmetry import count_solutions_sym
+from solution_parallel import count_solutions_parallel
+from solution_memo import count_solutions_memo
+from solution_numpy import find_solutions_np
+
+RESULT_VERSION = 1
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+DEFAULT_THRESHOLD = 0.10  # 10% slower than baseline is a regression
+DEFAULT_MIN_DELTA = 0.001  # seconds, smaller slowdowns are just noise
+
+TIERS = ('smoke', 'standard', 'stress')
+
+# name, tier, row_count, col_count, count_by_symbol, expected count
+# expected count is None if not known, then all engines must agree
+CATALOGUE = [
+    ('3x3-K2R1', 'smoke', 3, 3, {'K': 2, 'R': 1}, 4),
+    ('4x4-R2N4', 'smoke', 4, 4, {'R': 2, 'N': 4}, 8),
+    ('5x5-K2Q1B1N1', 'smoke', 5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1}, 4696),
+    ('6x6-K2Q1B1N1', 'standard', 6, 6, {'K': 2, 'Q': 1, 'B': 1, 'N': 1},
+     159072),
+    ('6x6-N8', 'standard', 6, 6, {'N': 8}, 688946),
+    ('8x8-Q8', 'standard', 8, 8, {'Q': 8}, 92),
+    ('6x6-K2Q2B2N1', 'standard', 6, 6, {'K': 2, 'Q': 2, 'B': 2, 'N': 1},
+     23752),
+    ('7x7-K2Q2B2N1', 'standard', 7, 7, {'K': 2, 'Q': 2, 'B': 2, 'N': 1},
+     3063828),
+    ('7x7-K3Q1R1N2', 'stress', 7, 7, {'K': 3, 'Q': 1, 'R': 1, 'N': 2},
+     6076544),
+    ('8x8-K2Q2B2N1', 'stress', 8, 8, {'K': 2, 'Q': 2, 'B': 2, 'N': 1},
+     None),
+]
+
+
+def _count_by_generator(find_solutions):
+    def count_func(row_count, col_count, count_by_symbol):
+        return sum(
+            1 for _ in find_solutions(row_count, col_count, count_by_symbol)
+        )
+    return count_func
+
+
+def _find_solutions_fc(row_count, col_count, count_by_symbol):
+    return find_solutions_s(
+        row_count,
+        col_count,
+        count_by_symbol,
+        forward_check=True,
+    )
+
+
+# each engine is a function that returns the number of solutions
+# when called with (row_count, col_count, count_by_symbol)
+engines = {
+    # what main.py runs by default, with fast paths like queens/rooks lines
+    'default': _count_by_generator(find_solutions),
+    'stack': _count_by_generator(find_solutions_s),
+    'recursive': _count_by_generator(find_solutions_r),
+    'forward-check': _count_by_generator(_find_solutions_fc),
+    'queue': _count_by_generator(find_solutions_q),
+    'bitboard': _count_by_generator(find_solutions_bb),
+    'piece-major': _count_by_generator(find_solutions_pm),
+    'undo': _count_by_generator(find_solutions_u),
+    'numpy': _count_by_generator(find_solutions_np),
+    'count': count_solutions,
+    'symmetry': count_solutions_sym,
+    'memo': count_solutions_memo,
+    'parallel': count_solutions_parallel,
+}
+
+
+def count_nodes(row_count, col_count, count_by_symbol):
+    """
+    return the number of nodes (partial boards, not including the empty
+    board) of the search tree of `find_solutions_s`, which is used as the
+    unit of work for all engines, to calculate nodes per second
+    """
+    attack_table = ChessPiece.attack_table(row_count, col_count)
+    cell_count = row_count * col_count
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    stage_size = sum(stage)
+    if not 0 < stage_size <= cell_count:
+        return 0
+
+    def count_low(stage_size, cell_num, occupied, attacked):
+        free = ~(occupied | attacked) & \
+            ((1 << (cell_count - stage_size + 1)) - 1) & \
+            -(1 << cell_num)
+        nodes = 0
+        while free:
+            cell_bit = free & -free
+            free ^= cell_bit
+            cell_num = cell_bit.bit_length() - 1
+            for piece_id, count in enumerate(stage):
+                if count < 1:
+                    continue
+                mask = attack_table[piece_id][cell_num]
+                if mask & occupied:
+                    continue
+                nodes += 1
+                if stage_size > 1:
+                    stage[piece_id] -= 1
+                    nodes += count_low(
+                        stage_size - 1,
+                        cell_num + 1,
+                        occupied | cell_bit,
+                        attacked | mask,
+                    )
+                    stage[piece_id] += 1
+        return nodes
+
+    return count_low(stage_size, 0, 0, 0)
+
+
+def get_cases(tiers=None, names=None):
+    """
+    return the list of catalogue items with given tiers and names
+    (None for all)
+    """
+    return [
+        case for case in CATALOGUE
+        if (tiers is None or case[1] in tiers) and
+        (names is None or case[0] in names)
+    ]
+
+
+def measure_peak_memory(func, *args):
+    """
+    call `func(*args)` once and return the peak memory allocated by Python
+    while running it, in bytes
+    this is a separate run, because tracing slows down the function
+    """
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_case(case, engine_name, repeat=DEFAULT_REPEAT, warmup=DEFAULT_WARMUP,
+             memory=True, nodes=None):
+    """
+    benchmark one engine on one catalogue item, return a result dict
+
+    nodes: number of search nodes of this case, see `count_nodes`
+        it's calculated if not given
+    """
+    name, tier, row_count, col_count, count_by_symbol, expected = case
+    func = engines[engine_name]
+    args = (row_count, col_count, count_by_symbol)
+    for _ in range(warmup):
+        func(*args)
+    times = []
+    result_count = None
+    for _ in range(repeat):
+        tm0 = perf_counter()
+        result_count = func(*args)
+        times.append(perf_counter() - tm0)
+    if expected is not None and result_count != expected:
+        raise AssertionError(
+            '%s on %s: wrong count %s, expected %s'
+            % (engine_name, name, result_count, expected)
+        )
+    if nodes is None:
+        nodes = count_nodes(*args)
+    median = statistics.median(times)
+    return {
+        'case': name,
+        'tier': tier,
+        'engine': engine_name,
+        'count': result_count,
+        'times': times,
+        'median': median,
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'min': min(times),
+        'peak_memory': measure_peak_memory(func, *args) if memory else None,
+        'nodes': nodes,
+        'nodes_per_sec': nodes / median if median > 0 else None,
+    }
+
+
+def run_benchmark(cases, engine_names, repeat=DEFAULT_REPEAT,
+                  warmup=DEFAULT_WARMUP, memory=True, log=None):
+    """
+    run all `engine_names` on all `cases`, return a dict that can be saved
+    as JSON
+
+    log: a function that is called with each result dict, or None
+    """
+    results = []
+    for case in cases:
+        nodes = count_nodes(*case[2:5])
+        counts = set()
+        for engine_name in engine_names:
+            result = run_case(
+                case,
+                engine_name,
+                repeat=repeat,
+                warmup=warmup,
+                memory=memory,
+                nodes=nodes,
+            )
+            counts.add(result['count'])
+            results.append(result)
+            if log:
+                log(result)
+        if len(counts) > 1:
+            raise AssertionError(
+                'engines do not agree on %s: %s' % (case[0], sorted(counts))
+            )
+    return {
+        'version': RESULT_VERSION,
+        'date': strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'warmup': warmup,
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD,
+                    min_delta=DEFAULT_MIN_DELTA):
+    """
+    compare two result dicts given by `run_benchmark`
+
+    returns a list of (case, engine, baseline_median, current_median, ratio,
+    regression) for each (case, engine) that is in both, where `regression`
+    is True if current median is slower than baseline by more than
+    `threshold` (as a fraction) and by more than `min_delta` seconds
+    """
+    baseline_by_key = {
+        (result['case'], result['engine']): result
+        for result in baseline['results']
+    }
+    rows = []
+    for result in current['results']:
+        key = (result['case'], result['engine'])
+        base = baseline_by_key.get(key)
+        if base is None:
+            continue
+        if base['median'] > 0:
+            ratio = result['median'] / base['median']
+        else:
+            ratio = 1.0
+        rows.append(key + (
+            base['median'],
+            result['median'],
+            ratio,
+            ratio > 1 + threshold and
+            result['median'] - base['median'] > min_delta,
+        ))
+    return rows
+
+
+def format_result(result):
+    """
+    return a result of `run_case` as a line of text that can be shown in
+    console
+    """
+    memory = result['peak_memory']
+    nodes_per_sec = result['nodes_per_sec']
+    return '%-14s %-12s %10.4f s  +- %8.4f  %10s KiB  %12s nodes/s' % (
+        result['case'],
+        result['engine'],
+        result['median'],
+        result['stdev'],
+        '-' if memory is None else memory // 1024,
+        '-' if nodes_per_sec is None else '%.0f' % nodes_per_sec,
+    )
+
+
+def main():
+    """
+    parse command line arguments, and list the catalogue, run benchmarks or
+    compare results, returns the exit status
+    """
+    parser = argparse.ArgumentParser(description='benchmark suite')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    subparsers.add_parser('list', help='list catalogue and engines')
+
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument(
+        '--tier',
+        dest='tiers',
+        action='append',
+        choices=TIERS,
+        help='tier of problems to run, can be repeated (default: smoke)',
+    )
+    run_parser.add_argument(
+        '--case',
+        dest='cases',
+        action='append',
+        help='name of problem to run, can be repeated',
+    )
+    run_parser.add_argument(
+        '--engine',
+        dest='engines',
+        action='append',
+        choices=sorted(engines.keys()),
+        help='engine to run, can be repeated (default: all)',
+    )
+    run_parser.add_argument(
+        '--repeat',
+        type=int,
+        default=DEFAULT_REPEAT,
+        help='number of timed runs (default: %s)' % DEFAULT_REPEAT,
+    )
+    run_parser.add_argument(
+        '--warmup',
+        type=int,
+        default=DEFAULT_WARMUP,
+        help='number of untimed runs before timed runs '
+             '(default: %s)' % DEFAULT_WARMUP,
+    )
+    run_parser.add_argument(
+        '--no-memory',
+        dest='memory',
+        action='store_false',
+        default=True,
+        help='do not measure peak memory (saves one run)',
+    )
+    run_parser.add_argument(
+        '-o',
+        '--output',
+        default=None,
+        help='write results into this JSON file',
+    )
+
+    compare_parser = subparsers.add_parser(
+        'compare',
+        help='compare results with a baseline, exit with status 1 if '
+             'there is a regression',
+    )
+    compare_parser.add_argument('baseline', help='baseline JSON file')
+    compare_parser.add_argument('current', help='current JSON file')
+    compare_parser.add_argument(
+        '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help='allowed slowdown as a fraction (default: %s)'
+             % DEFAULT_THRESHOLD,
+    )
+    compare_parser.add_argument(
+        '--min-delta',
+        type=float,
+        default=DEFAULT_MIN_DELTA,
+        help='allowed slowdown in seconds, to ignore noise in very short '
+             'runs (default: %s)' % DEFAULT_MIN_DELTA,
+    )
+
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for name, tier, row_count, col_count, count_by_symbol, expected \
+                in CATALOGUE:
+            print('%-14s %-9s %s' % (name, tier, expected))
+        print('engines: %s' % ', '.join(sorted(engines.keys())))
+        return 0
+
+    if args.command == 'run':
+        if args.repeat < 1:
+            run_parser.error('--repeat must be a positive number')
+        if args.warmup < 0:
+            run_parser.error('--warmup can not be negative')
+        tiers = args.tiers
+        if tiers is None and args.cases is None:
+            tiers = ['smoke']
+        cases = get_cases(tiers, args.cases)
+        if not cases:
+            parser.error('no matching problem in catalogue')
+        data = run_benchmark(
+            cases,
+            args.engines or sorted(engines.keys()),
+            repeat=args.repeat,
+            warmup=args.warmup,
+            memory=args.memory,
+            log=lambda result: print(format_result(result)),
+        )
+        if args.output:
+            with open(args.output, 'w') as fileobj:
+                json.dump(data, fileobj, indent=2)
+        return 0
+
+    with open(args.baseline) as fileobj:
+        baseline = json.load(fileobj)
+    with open(args.current) as fileobj:
+        current = json.load(fileobj)
+    regression_count = 0
+    for name, engine_name, base_median, median, ratio, regression in \
+            compare_results(
+                baseline,
+                current,
+                args.threshold,
+                args.min_delta,
+            ):
+        print('%-14s %-12s %10.4f s -> %10.4f s  %6.2fx%s' % (
+            name,
+            engine_name,
+            base_median,
+            median,
+            ratio,
+            '  REGRESSION' if regression else '',
+        ))
+        regression_count += regression
+    if regression_count:
+        print('%s regression(s)' % regression_count)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
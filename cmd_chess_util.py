@@ -51,13 +51,14 @@ def mark_board_under_attack_cells(board, row_count, col_count, symbol='.'):
     with given symbol
     return a new board dict
     """
+    attacked = ChessPiece.board_attack_mask(board, row_count, col_count)
     new_board = {}
     for row_num in range(row_count):
         for col_num in range(col_count):
             try:
                 new_board[(row_num, col_num)] = board[(row_num, col_num)]
             except KeyError:
-                if ChessPiece.pos_attacked_by_board(row_num, col_num, board):
+                if attacked >> (row_num * col_count + col_num) & 1:
                     new_board[(row_num, col_num)] = symbol
     return new_board
 
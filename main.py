@@ -5,20 +5,132 @@ To solve the challenge problem, run:
     ./main.py --count 7 7 -k2 -q2 -b2 -n1
 """
 
+import os
 import sys
+import io
+import json
+import sqlite3
 from time import time as now
 import argparse
+from itertools import islice
 
 from pieces import ChessPiece
 from solution import (
     find_solutions_s,
     find_solutions_r,
     find_solutions_q,
+    find_solutions_bb,
+    find_solutions_pm,
+    find_solutions_u,
+    find_solutions as find_solutions_default,
+    count_solutions,
+    check_piece_order,
+    PIECE_ORDER,
+)
+from solution_symmetry import (
+    find_solutions_sym,
+    count_solutions_sym,
+)
+from solution_parallel import (
+    find_solutions_parallel,
+    count_solutions_parallel,
+)
+from solution_memo import MemoCounter, DEFAULT_MAX_SIZE
+from solution_bin import (
+    SolutionWriter,
+    check_board_size,
+    read_header,
+    iter_boards_bin,
+)
+from solution_stats import SearchStats
+from solution_checkpoint import CheckpointCounter, DEFAULT_INTERVAL
+from solution_progress import ProgressReporter
+from solution_frontier import DEFAULT_MEMORY_LIMIT
+from solution_single import get_single_symbol
+from solution_estimate import estimate_tree, DEFAULT_TIME_BUDGET
+from solution_transfer import use_transfer
+from solution_sample import sample_solutions
+from solution_rank import find_solutions_from
+from solution_numpy import find_solutions_np, DEFAULT_BATCH_SIZE
+from solution_batch import run_batch, iter_jsonl
+from solution_cache import (
+    SolutionCache,
+    cached_count_func,
+    get_default_path,
 )
 from chess_util import format_board
 from cmd_util import input_yesno
 from cmd_chess_util import input_problem
 
+find_solutions_by_engine = {
+    'bitboard': find_solutions_bb,
+    'stack': find_solutions_s,
+    'recursive': find_solutions_r,
+    'queue': find_solutions_q,
+    'piece-major': find_solutions_pm,
+    'undo': find_solutions_u,
+    'numpy': find_solutions_np,
+}
+
+
+def print_count(count_func, *args):
+    """
+    count_func: a function that returns the number of solutions/configurations
+        when called with `*args`
+    """
+    print('Calculating, please wait... (Control+C to cancel)')
+    tm0 = now()
+    try:
+        solution_count = count_func(*args)
+    except KeyboardInterrupt:
+        print('\nGoodbye')
+        return
+    delta = now() - tm0
+    print('Number of Unique Configurations: %s' % solution_count)
+    print('Running Time: %.4f seconds' % delta)
+
+
+def open_cache(enable=True, path=None):
+    """
+    return a SolutionCache if `enable` is True, or None
+    if the cache file can not be opened, shows a warning and returns None
+    """
+    if not enable:
+        return None
+    try:
+        return SolutionCache(path)
+    except (OSError, sqlite3.Error) as e:
+        print('Warning: can not open cache file: %s' % e, file=sys.stderr)
+        return None
+
+
+def make_progress(enable=True):
+    """
+    return a ProgressReporter if `enable` is True and standard error is a
+    terminal, otherwise None
+    """
+    if enable and sys.stderr.isatty():
+        return ProgressReporter()
+    return None
+
+
+def count_with_progress(row_count, col_count, count_by_symbol, progress):
+    """
+    count solutions, showing progress if `progress` is not None
+    problems with only one piece type, or only short-range pieces (see
+    `use_transfer`), are counted by dedicated implementations that don't
+    show progress
+    """
+    if progress is None or get_single_symbol(count_by_symbol) is not None \
+       or use_transfer(row_count, col_count, count_by_symbol):
+        return count_solutions(row_count, col_count, count_by_symbol)
+    return CheckpointCounter(
+        row_count,
+        col_count,
+        count_by_symbol,
+        progress=progress,
+    ).run()
+
 
 def count_or_show_by_generator(gen, count_enable, row_count, col_count):
     """
@@ -26,16 +138,7 @@ def count_or_show_by_generator(gen, count_enable, row_count, col_count):
     count_enable: bool, only count solutions/configurations, don't show them
     """
     if count_enable:
-        print('Calculating, please wait... (Control+C to cancel)')
-        tm0 = now()
-        try:
-            solution_count = sum(1 for _ in gen)
-        except KeyboardInterrupt:
-            print('\nGoodbye')
-            return
-        delta = now() - tm0
-        print('Number of Unique Configurations: %s' % solution_count)
-        print('Running Time: %.4f seconds' % delta)
+        print_count(lambda: sum(1 for _ in gen))
     else:
         print('Found Configurations:\n')
         for board in gen:
@@ -47,6 +150,189 @@ def count_or_show_by_generator(gen, count_enable, row_count, col_count):
                 break
 
 
+def sample_main(args, count_by_symbol):
+    """
+    show or write `args.sample` uniform random solutions
+    """
+    boards = sample_solutions(
+        args.row_count,
+        args.col_count,
+        count_by_symbol,
+        args.sample,
+        seed=args.seed,
+    )
+    if not boards:
+        print('No configuration found', file=sys.stderr)
+        return
+    if args.output:
+        # not all solutions, so the count is not cached
+        write_by_generator(
+            iter(boards),
+            args.output,
+            args.output_format,
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+        )
+        return
+    print('Random Configurations:\n')
+    for board in boards:
+        print(format_board(board, args.row_count, args.col_count))
+
+
+def page_main(args, count_by_symbol):
+    """
+    show or write solutions from index `args.offset`, at most `args.limit`
+    of them
+    """
+    gen = find_solutions_from(
+        args.row_count,
+        args.col_count,
+        count_by_symbol,
+        offset=args.offset,
+    )
+    if args.limit is not None:
+        gen = islice(gen, args.limit)
+    if args.output:
+        # not all solutions, so the count is not cached
+        write_by_generator(
+            gen,
+            args.output,
+            args.output_format,
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+        )
+        return
+    count_or_show_by_generator(gen, False, args.row_count, args.col_count)
+
+
+def write_by_generator(gen, path, output_format, row_count, col_count,
+                       count_by_symbol):
+    """
+    gen: a generator returned by find_solutions_*
+    path: path of output file, or '-' for standard output
+    output_format: 'text' or 'bin', see `solution_bin` module for 'bin'
+
+    returns the number of written solutions, or None if interrupted
+    """
+    print(
+        'Writing configurations to %s, please wait... (Control+C to cancel)'
+        % path,
+        file=sys.stderr,
+    )
+    tm0 = now()
+    if output_format == 'bin':
+        # before creating the file
+        check_board_size(row_count, col_count)
+    if path == '-':
+        fileobj = sys.stdout.buffer
+    else:
+        fileobj = open(path, 'wb')
+    if output_format == 'bin':
+        writer = SolutionWriter(fileobj, row_count, col_count, count_by_symbol)
+    else:
+        writer = None
+        fileobj = io.TextIOWrapper(
+            fileobj,
+            encoding='utf-8',
+            write_through=False,
+        )
+    solution_count = 0
+    completed = False
+    try:
+        for board in gen:
+            if writer is None:
+                fileobj.write(format_board(board, row_count, col_count))
+                fileobj.write('\n\n')
+            else:
+                writer.write(board)
+            solution_count += 1
+        completed = True
+    except KeyboardInterrupt:
+        print('\nGoodbye', file=sys.stderr)
+    finally:
+        if writer is not None:
+            writer.close()
+        if path == '-':
+            fileobj.flush()
+            if writer is None:
+                fileobj.detach()
+        else:
+            fileobj.close()
+    delta = now() - tm0
+    print(
+        'Number of Written Configurations: %s' % solution_count,
+        file=sys.stderr,
+    )
+    print('Running Time: %.4f seconds' % delta, file=sys.stderr)
+    if completed:
+        return solution_count
+    return None
+
+
+def write_and_cache(gen, args, count_by_symbol):
+    """
+    write all solutions of `gen` to `args.output`, and put their count
+    (and path of binary file) into the cache
+    """
+    solution_count = write_by_generator(
+        gen,
+        args.output,
+        args.output_format,
+        args.row_count,
+        args.col_count,
+        count_by_symbol,
+    )
+    cache = open_cache(args.cache, args.cache_file)
+    if solution_count is not None and cache is not None:
+        cache.put_count(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            solution_count,
+        )
+        if args.output_format == 'bin' and args.output != '-':
+            cache.put_solutions_path(
+                args.row_count,
+                args.col_count,
+                count_by_symbol,
+                args.output,
+            )
+
+
+def find_stored_solutions(cache, row_count, col_count, count_by_symbol,
+                          output=None):
+    """
+    return a generator of boards from a complete binary solution file of
+    the problem, whose path is stored in `cache`, or None if there is none
+    (or it's the `output` file, which is going to be overwritten)
+    """
+    if cache is None:
+        return None
+    path = cache.get_solutions_path(row_count, col_count, count_by_symbol)
+    if path is None or output and os.path.abspath(output) == path:
+        return None
+    try:
+        with open(path, 'rb') as fileobj:
+            header = read_header(fileobj)
+    except (OSError, ValueError):
+        return None
+    counts = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    header_counts = [
+        header['count_by_symbol'].get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    if header['record_count'] is None or header_counts != counts or \
+       (header['row_count'], header['col_count']) != (row_count, col_count):
+        return None  # not complete, or overwritten by another problem
+    print('Reading stored configurations from %s' % path, file=sys.stderr)
+    return iter_boards_bin(path)
+
+
 def interactive_main():
     """
     ask the board size and pieces count
@@ -58,7 +344,16 @@ def interactive_main():
         'Count configurations? [Yes/No] ',
         default=False,
     )
-    gen = find_solutions_s(
+    if count_enable:
+        print_count(
+            cached_count_func(count_with_progress, open_cache()),
+            row_count,
+            col_count,
+            count_by_symbol,
+            make_progress(),
+        )
+        return
+    gen = find_solutions_bb(
         row_count,
         col_count,
         count_by_symbol,
@@ -71,6 +366,205 @@ def interactive_main():
     )
 
 
+def checkpoint_main(parser, args, count_by_symbol):
+    """
+    count with checkpoints, or resume counting from a checkpoint file
+    """
+    interval = args.checkpoint_interval or None
+    interval_nodes = args.checkpoint_nodes or None
+    progress = make_progress(args.progress)
+    if args.resume:
+        try:
+            counter = CheckpointCounter.load(
+                args.resume,
+                interval=interval,
+                interval_nodes=interval_nodes,
+                progress=progress,
+            )
+        except (OSError, ValueError, KeyError) as e:
+            parser.error('can not load checkpoint: %s' % e)
+        if args.row_count is not None and (
+            (args.row_count, args.col_count) !=
+            (counter.row_count, counter.col_count) or
+            any(count_by_symbol.values()) and
+            count_by_symbol != counter.count_by_symbol
+        ):
+            parser.error('checkpoint file is for a different problem')
+        if args.checkpoint:
+            counter.path = args.checkpoint
+    else:
+        if args.row_count is None or args.col_count is None:
+            parser.error('number of rows and columns are required')
+        counter = CheckpointCounter(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            path=args.checkpoint,
+            interval=interval,
+            interval_nodes=interval_nodes,
+            progress=progress,
+        )
+    print_count(counter.run)
+    if not counter.is_done():
+        print(
+            'Progress is saved in %s, continue with --resume %s'
+            % (counter.path, counter.path)
+        )
+        return
+    cache = open_cache(args.cache, args.cache_file)
+    if cache is not None:
+        cache.put_count(
+            counter.row_count,
+            counter.col_count,
+            counter.count_by_symbol,
+            counter.count,
+        )
+
+
+def batch_main(argv):
+    """
+    solve problems given as JSON lines, see `solution_batch` module
+    argv: command line arguments after 'batch'
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py batch',
+        description='solve problems given as JSON lines, and write results '
+                    'as JSON lines, as soon as each problem is solved '
+                    '(all input is read before solving)',
+    )
+    parser.add_argument(
+        'input',
+        nargs='?',
+        default='-',
+        help='input file, one problem in each line (default: standard '
+             'input)',
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        default='-',
+        help='output file (default: standard output)',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=0,
+        help='number of worker processes (default: 0, number of CPUs)',
+    )
+    parser.add_argument(
+        '--no-cache',
+        dest='cache',
+        action='store_false',
+        default=True,
+        help='do not use the cache of solution counts',
+    )
+    parser.add_argument(
+        '--cache-file',
+        dest='cache_file',
+        default=None,
+        help='path of the cache file of solution counts',
+    )
+    args = parser.parse_args(argv)
+
+    if args.input == '-':
+        items = list(iter_jsonl(sys.stdin))
+    else:
+        with open(args.input) as fileobj:
+            items = list(iter_jsonl(fileobj))
+    if args.output == '-':
+        out = sys.stdout
+    else:
+        out = open(args.output, 'w')
+    try:
+        for result in run_batch(
+            items,
+            jobs=args.jobs or None,
+            cache=open_cache(args.cache, args.cache_file),
+        ):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    except KeyboardInterrupt:
+        print('\nGoodbye', file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def serve_main(argv):
+    """
+    run the local solver service, see `solution_server` module
+    argv: command line arguments after 'serve'
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py serve',
+        description='run a solver service that accepts count and enumerate '
+                    'requests as JSON lines, on a Unix socket or a localhost '
+                    'TCP port',
+    )
+    parser.add_argument(
+        '--socket',
+        default=None,
+        help='path of Unix socket to listen on',
+    )
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='host to listen on, if --socket is not given '
+             '(default: 127.0.0.1)',
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=0,
+        help='TCP port to listen on, if --socket is not given '
+             '(default: 0, a free port)',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=0,
+        help='number of worker processes (default: 0, number of CPUs)',
+    )
+    parser.add_argument(
+        '--no-cache',
+        dest='cache',
+        action='store_false',
+        default=True,
+        help='do not use the cache of solution counts',
+    )
+    parser.add_argument(
+        '--cache-file',
+        dest='cache_file',
+        default=None,
+        help='path of the cache file of solution counts',
+    )
+    args = parser.parse_args(argv)
+    if sys.version_info < (3, 7):
+        parser.error('the solver service needs Python 3.7 or later')
+    # imported here, because it can not even be parsed by Python < 3.5
+    from solution_server import serve
+
+    def ready(addresses):
+        for address in addresses:
+            if isinstance(address, tuple):
+                address = '%s:%s' % address[:2]
+            print('Listening on %s' % address, file=sys.stderr)
+
+    try:
+        serve(
+            path=args.socket,
+            host=args.host,
+            port=args.port,
+            jobs=args.jobs or None,
+            cache=open_cache(args.cache, args.cache_file),
+            ready=ready,
+        )
+    except KeyboardInterrupt:
+        print('\nGoodbye', file=sys.stderr)
+
+
 def argparse_main():
     """
     parses the command line arguments and options, and performs operations
@@ -80,12 +574,14 @@ def argparse_main():
         action='store',
         dest='row_count',
         type=int,
+        nargs='?',
         help='number of rows in the board',
     )
     parser.add_argument(
         action='store',
         dest='col_count',
         type=int,
+        nargs='?',
         help='number of columns in the board',
     )
     parser.add_argument(
@@ -97,12 +593,212 @@ def argparse_main():
         help='only count the number of unique configurations, '
              'don\'t show them',
     )
+    parser.add_argument(
+        '-o',
+        '--output',
+        dest='output',
+        default=None,
+        help='write all configurations into this file (\'-\' for standard '
+             'output) instead of showing them one by one',
+    )
+    parser.add_argument(
+        '--format',
+        dest='output_format',
+        choices=('text', 'bin'),
+        default='text',
+        help='format of output file: text, or compact binary records '
+             '(default: text)',
+    )
+    parser.add_argument(
+        '--engine',
+        dest='engine',
+        choices=sorted(find_solutions_by_engine.keys()),
+        default=None,
+        help='implementation to find (or count) configurations, default is '
+             'undo (or a dedicated implementation for only queens or only '
+             'rooks, or a dedicated counting implementation)',
+    )
     parser.add_argument(
         '--recursive',
-        dest='recursive',
+        dest='engine',
+        action='store_const',
+        const='recursive',
+        help='use recursive implementation, same as --engine=recursive',
+    )
+    parser.add_argument(
+        '--piece-order',
+        dest='piece_order',
+        default=PIECE_ORDER,
+        help='order of putting piece types for piece-major implementation '
+             '(default: %s)' % PIECE_ORDER,
+    )
+    parser.add_argument(
+        '--memory-limit',
+        dest='memory_limit',
+        type=int,
+        default=DEFAULT_MEMORY_LIMIT >> 20,
+        help='memory limit of each level of queue implementation in MiB, '
+             'the rest is spilled into temporary files '
+             '(default: %s)' % (DEFAULT_MEMORY_LIMIT >> 20),
+    )
+    parser.add_argument(
+        '--batch-size',
+        dest='batch_size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help='number of states to expand at once in numpy implementation '
+             '(default: %s)' % DEFAULT_BATCH_SIZE,
+    )
+    parser.add_argument(
+        '--symmetry',
+        dest='symmetry',
+        action='store_true',
+        default=False,
+        help='only search for canonical configurations under rotations and '
+             'reflections of the board, and count or show their images',
+    )
+    parser.add_argument(
+        '--memo',
+        dest='memo',
+        action='store_true',
+        default=False,
+        help='count using a memo table of subtree counts',
+    )
+    parser.add_argument(
+        '--memo-size',
+        dest='memo_size',
+        type=int,
+        default=DEFAULT_MAX_SIZE,
+        help='maximum number of entries in memo table '
+             '(default: %s)' % DEFAULT_MAX_SIZE,
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        dest='jobs',
+        type=int,
+        default=None,
+        help='number of worker processes to solve in parallel '
+             '(0 for number of CPUs)',
+    )
+    parser.add_argument(
+        '--no-cache',
+        dest='cache',
+        action='store_false',
+        default=True,
+        help='do not use the cache of solution counts',
+    )
+    parser.add_argument(
+        '--cache-file',
+        dest='cache_file',
+        default=None,
+        help='path of the cache file of solution counts '
+             '(default: %s)' % get_default_path(),
+    )
+    parser.add_argument(
+        '--stats',
+        dest='stats',
+        action='store_true',
+        default=False,
+        help='collect and show search statistics: nodes and cuts by depth '
+             'and piece type, only for stack and bitboard engines',
+    )
+    parser.add_argument(
+        '--forward-check',
+        dest='forward_check',
+        action='store_true',
+        default=False,
+        help='cut branches of search as soon as there are not enough safe '
+             'cells left for the rest of pieces, only for stack (default '
+             'with this option) and recursive engines',
+    )
+    parser.add_argument(
+        '--no-progress',
+        dest='progress',
+        action='store_false',
+        default=True,
+        help='do not show progress while counting (it\'s only shown when '
+             'standard error is a terminal)',
+    )
+    parser.add_argument(
+        '--estimate',
+        dest='estimate',
         action='store_true',
         default=False,
-        help='use recursive implementation instead of stack implementation'
+        help='estimate number of nodes, number of solutions and running '
+             'time with random probes of the search tree, instead of '
+             'searching it',
+    )
+    parser.add_argument(
+        '--time-budget',
+        dest='time_budget',
+        type=float,
+        default=DEFAULT_TIME_BUDGET,
+        help='number of seconds to spend on --estimate (default: %s)'
+             % DEFAULT_TIME_BUDGET,
+    )
+    parser.add_argument(
+        '--sample',
+        dest='sample',
+        type=int,
+        default=None,
+        metavar='N',
+        help='show (or write to --output) N uniform random solutions, '
+             'without finding all of them',
+    )
+    parser.add_argument(
+        '--offset',
+        dest='offset',
+        type=int,
+        default=0,
+        metavar='K',
+        help='skip the first K solutions without searching them, and start '
+             'from the solution of index K (starting from 0)',
+    )
+    parser.add_argument(
+        '--limit',
+        dest='limit',
+        type=int,
+        default=None,
+        metavar='N',
+        help='show (or write to --output) at most N solutions',
+    )
+    parser.add_argument(
+        '--seed',
+        dest='seed',
+        type=int,
+        default=None,
+        help='seed of random number generator, for reproducible results',
+    )
+    parser.add_argument(
+        '--checkpoint',
+        dest='checkpoint',
+        default=None,
+        help='while counting, save the progress into this file '
+             'periodically, and on Control+C',
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        dest='checkpoint_interval',
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help='number of seconds between checkpoints, 0 to disable '
+             '(default: %s)' % DEFAULT_INTERVAL,
+    )
+    parser.add_argument(
+        '--checkpoint-nodes',
+        dest='checkpoint_nodes',
+        type=int,
+        default=0,
+        help='number of search nodes between checkpoints, 0 to disable '
+             '(default: 0)',
+    )
+    parser.add_argument(
+        '--resume',
+        dest='resume',
+        default=None,
+        help='continue counting from this checkpoint file, board size and '
+             'pieces are read from the file',
     )
 
     for cls in ChessPiece.class_list:
@@ -123,26 +819,285 @@ def argparse_main():
         for cls in ChessPiece.class_list
     }
 
-    find_solutions = find_solutions_r if args.recursive else find_solutions_s
+    if args.batch_size < 1:
+        parser.error('--batch-size must be a positive number')
 
-    gen = find_solutions(
-        args.row_count,
-        args.col_count,
-        count_by_symbol,
-    )
-    count_or_show_by_generator(
-        gen,
-        args.count_enable,
-        args.row_count,
-        args.col_count,
-    )
+    if args.stats:
+        if args.symmetry or args.memo or args.jobs is not None or \
+           args.checkpoint or args.resume:
+            parser.error(
+                '--stats can not be used with --symmetry, --memo, --jobs, '
+                '--checkpoint or --resume'
+            )
+        if args.engine not in (None, 'stack', 'bitboard'):
+            parser.error('--stats only works with stack and bitboard engines')
+
+    if args.forward_check:
+        if args.symmetry or args.memo or args.jobs is not None or \
+           args.checkpoint or args.resume:
+            parser.error(
+                '--forward-check can not be used with --symmetry, --memo, '
+                '--jobs, --checkpoint or --resume'
+            )
+        if args.engine not in (None, 'stack', 'recursive'):
+            parser.error(
+                '--forward-check only works with stack and recursive engines'
+            )
+        if args.stats and args.engine == 'recursive':
+            parser.error('--stats only works with stack and bitboard engines')
+        args.engine = args.engine or 'stack'
+
+    if args.resume or args.checkpoint:
+        if args.engine or args.symmetry or args.memo or \
+           args.jobs is not None:
+            parser.error(
+                '--checkpoint and --resume can not be used with --engine, '
+                '--symmetry, --memo or --jobs'
+            )
+        if args.checkpoint and not args.resume and not args.count_enable:
+            parser.error('--checkpoint can only be used with --count')
+        checkpoint_main(parser, args, count_by_symbol)
+        return
+
+    if args.row_count is None or args.col_count is None:
+        parser.error('number of rows and columns are required')
+
+    if args.estimate:
+        if args.output or args.engine or args.symmetry or args.memo or \
+           args.jobs is not None or args.stats or args.forward_check:
+            parser.error(
+                '--estimate can not be used with --output, --engine, '
+                '--symmetry, --memo, --jobs, --stats or --forward-check'
+            )
+        print(estimate_tree(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            time_budget=args.time_budget,
+            seed=args.seed,
+        ).format_table())
+        return
+
+    if args.output and args.output_format == 'bin':
+        try:
+            check_board_size(args.row_count, args.col_count)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.sample is not None:
+        if args.count_enable or args.engine or args.symmetry or args.memo or \
+           args.jobs is not None or args.stats or args.forward_check or \
+           args.offset or args.limit is not None:
+            parser.error(
+                '--sample can not be used with --count, --engine, '
+                '--symmetry, --memo, --jobs, --stats, --forward-check, '
+                '--offset or --limit'
+            )
+        if args.sample < 1:
+            parser.error('--sample must be a positive number')
+        sample_main(args, count_by_symbol)
+        return
+
+    if args.offset or args.limit is not None:
+        if args.count_enable or args.engine or args.symmetry or args.memo or \
+           args.jobs is not None or args.stats or args.forward_check:
+            parser.error(
+                '--offset and --limit can not be used with --count, '
+                '--engine, --symmetry, --memo, --jobs, --stats or '
+                '--forward-check'
+            )
+        if args.offset < 0 or (args.limit is not None and args.limit < 0):
+            parser.error('--offset and --limit can not be negative')
+        page_main(args, count_by_symbol)
+        return
+
+    if args.output and args.count_enable:
+        parser.error('--output can not be used with --count')
+
+    if args.count_enable:
+        cache = open_cache(args.cache, args.cache_file)
+    else:
+        cache = None
+
+    if args.memo:
+        if not args.count_enable:
+            parser.error('--memo can only be used with --count')
+        if args.engine or args.symmetry or args.jobs is not None:
+            parser.error(
+                '--memo can not be used with --engine, --symmetry '
+                'or --jobs'
+            )
+        counter = MemoCounter(
+            args.row_count,
+            args.col_count,
+            max_size=args.memo_size,
+        )
+        print_count(
+            cached_count_func(
+                lambda row_count, col_count, count_by_symbol:
+                counter.count(count_by_symbol),
+                cache,
+            ),
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+        )
+        print(
+            'Memo Table: {hits} hits, {misses} misses, {evictions} '
+            'evictions, {size} entries'.format(**counter.get_stats())
+        )
+        return
+
+    if args.jobs is not None:
+        if args.engine or args.symmetry:
+            parser.error(
+                '--jobs can not be used with --engine or --symmetry'
+            )
+        jobs = args.jobs or None
+        if args.count_enable:
+            print_count(
+                cached_count_func(count_solutions_parallel, cache),
+                args.row_count,
+                args.col_count,
+                count_by_symbol,
+                jobs,
+            )
+            return
+        gen = find_solutions_parallel(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            jobs,
+        )
+        if args.output:
+            write_and_cache(gen, args, count_by_symbol)
+            return
+        count_or_show_by_generator(
+            gen,
+            False,
+            args.row_count,
+            args.col_count,
+        )
+        return
+
+    if args.symmetry and args.engine:
+        parser.error('--symmetry can not be used with --engine')
+
+    try:
+        check_piece_order(args.piece_order)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.count_enable and not args.engine and not args.stats:
+        if args.symmetry:
+            print_count(
+                cached_count_func(count_solutions_sym, cache),
+                args.row_count,
+                args.col_count,
+                count_by_symbol,
+            )
+            return
+        print_count(
+            cached_count_func(count_with_progress, cache),
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            make_progress(args.progress),
+        )
+        return
+
+    if args.symmetry:
+        find_solutions = find_solutions_sym
+    elif args.engine:
+        find_solutions = find_solutions_by_engine[args.engine]
+    elif args.stats:
+        find_solutions = find_solutions_bb
+    else:
+        find_solutions = find_solutions_default
+
+    stats = None
+    if find_solutions is find_solutions_pm:
+        gen = find_solutions_pm(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            piece_order=args.piece_order,
+        )
+    elif find_solutions is find_solutions_q:
+        gen = find_solutions_q(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            memory_limit=args.memory_limit << 20,
+        )
+    elif find_solutions is find_solutions_np:
+        gen = find_solutions_np(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            batch_size=args.batch_size,
+        )
+    elif args.forward_check and args.stats:
+        stats = SearchStats()
+        gen = find_solutions(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            stats=stats,
+            forward_check=True,
+        )
+    elif args.forward_check:
+        gen = find_solutions(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            forward_check=True,
+        )
+    elif args.stats:
+        stats = SearchStats()
+        gen = find_solutions(
+            args.row_count,
+            args.col_count,
+            count_by_symbol,
+            stats=stats,
+        )
+    else:
+        gen = None
+        if find_solutions is find_solutions_default:
+            gen = find_stored_solutions(
+                open_cache(args.cache, args.cache_file),
+                args.row_count,
+                args.col_count,
+                count_by_symbol,
+                args.output,
+            )
+        if gen is None:
+            gen = find_solutions(
+                args.row_count,
+                args.col_count,
+                count_by_symbol,
+            )
+    if args.output:
+        write_and_cache(gen, args, count_by_symbol)
+    else:
+        count_or_show_by_generator(
+            gen,
+            args.count_enable,
+            args.row_count,
+            args.col_count,
+        )
+    if stats is not None:
+        print(
+            stats.format_table(),
+            file=sys.stderr if args.output else sys.stdout,
+        )
 
 # ______________________ Test Functions ______________________ #
 
 
 def compare_find_solutions_result():
     """
-    run and compare the result of 3 implementations of find_solutions
+    run and compare the result of 6 implementations of find_solutions
     make sure they all return the same set of configurations
     with no duplicates
     """
@@ -155,6 +1110,9 @@ def compare_find_solutions_result():
         find_solutions_r,
         find_solutions_q,
         find_solutions_s,
+        find_solutions_bb,
+        find_solutions_pm,
+        find_solutions_u,
     )
 
     for func in func_list:  # pylint!
@@ -169,35 +1127,12 @@ def compare_find_solutions_result():
     assert solution_set_list[1:] == solution_set_list[:-1]  # all items equal
 
 
-def compare_find_solutions_time():
-    """
-    run and compare the running time of 3 implementations of find_solutions
-    """
-
-    row_count, col_count, count_by_symbol = input_problem()
-
-    time_list = []
-
-    func_list = (
-        find_solutions_s,
-        find_solutions_r,
-        find_solutions_q,
-        find_solutions_s,
-        find_solutions_r,
-        find_solutions_q,
-    )
-
-    for func in func_list:  # pylint!
-        tm0 = now()
-        for _ in func(row_count, col_count, count_by_symbol):
-            pass
-        delta = now() - tm0
-        time_list.append(delta)
-        print('%.4f seconds   (%s)' % (delta, func))
-
-
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve_main(sys.argv[2:])
+    elif len(sys.argv) > 1:
         argparse_main()
     else:
         interactive_main()
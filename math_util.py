@@ -0,0 +1,56 @@
+"""
+contains math functions that are not available in older Python versions
+(`math.comb`, `math.perm` and `statistics.NormalDist` need Python 3.8)
+"""
+
+from math import erf, sqrt
+
+try:
+    from math import comb, perm
+except ImportError:
+    def comb(n, k):
+        """
+        return the number of ways to choose `k` items from `n` items
+        """
+        if not 0 <= k <= n:
+            return 0
+        k = min(k, n - k)
+        result = 1
+        for index in range(k):
+            result = result * (n - index) // (index + 1)
+        return result
+
+    def perm(n, k):
+        """
+        return the number of ways to choose `k` items from `n` items, in
+        order
+        """
+        if not 0 <= k <= n:
+            return 0
+        result = 1
+        for index in range(k):
+            result *= n - index
+        return result
+
+try:
+    from statistics import NormalDist
+except ImportError:
+    NormalDist = None
+
+
+def normal_inv_cdf(p):
+    """
+    return `x` so that a standard normal variable is less than `x` with
+    probability `p` (0 < p < 1)
+    """
+    if NormalDist is not None:
+        return NormalDist().inv_cdf(p)
+    # bisection on the cdf, it's only called once for each estimate
+    low, high = -40.0, 40.0
+    for _ in range(200):
+        mid = (low + high) / 2
+        if (1 + erf(mid / sqrt(2))) / 2 < p:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
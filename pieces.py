@@ -1,6 +1,32 @@
 #!/usr/bin/env python3
 """defines classes for different types of chess pieces"""
 
+import functools
+
+ATTACK_TABLE_CACHE_SIZE = 32
+
+
+@functools.lru_cache(maxsize=ATTACK_TABLE_CACHE_SIZE)
+def _make_attack_table(row_count, col_count):
+    """
+    build the attack table of given board size, see `ChessPiece.attack_table`
+    """
+    cell_count = row_count * col_count
+    table = []
+    for cls in ChessPiece.class_list:
+        masks = []
+        for cell_num in range(cell_count):
+            piece = cls(*divmod(cell_num, col_count))
+            mask = 0
+            for other_num in range(cell_count):
+                if other_num == cell_num:
+                    continue
+                if piece.attacks_pos(*divmod(other_num, col_count)):
+                    mask |= 1 << other_num
+            masks.append(mask)
+        table.append(tuple(masks))
+    return tuple(table)
+
 
 class ChessPiece(object):
     """base class for chess piece type
@@ -9,6 +35,9 @@ class ChessPiece(object):
     name = ''
     symbol = ''
     cid = None
+    # maximum distance (in rows or columns) of attacked cells, or None if
+    # it's only limited by board size
+    attack_range = None
     class_by_name = {}
     class_by_symbol = {}
     class_list = []
@@ -24,8 +53,50 @@ class ChessPiece(object):
         sub.cid = len(cls.class_list)
         cls.class_list.append(sub)
 
+        # cached tables don't have a row for the new class
+        _make_attack_table.cache_clear()
+
         return sub
 
+    @classmethod
+    def attack_table(cls, row_count, col_count):
+        """
+        return the precomputed attack table of given board size, which is
+        a tuple of attack masks for each registered piece type (indexed by
+        `cid`), see `attack_masks`
+
+        tables are built once and kept in an LRU cache keyed by board size
+        """
+        return _make_attack_table(row_count, col_count)
+
+    @classmethod
+    def attack_masks(cls, row_count, col_count):
+        """
+        return a tuple of int bit masks indexed by
+            cell_num = row_num * col_count + col_num
+        in which bit number `n` is set if a piece of this type on `cell_num`
+        attacks (threatens) cell `n` (a piece does not attack its own cell)
+
+        must be called on a registered ChessPiece subclass
+        """
+        return _make_attack_table(row_count, col_count)[cls.cid]
+
+    @classmethod
+    def board_attack_mask(cls, board, row_count, col_count):
+        """
+        return an int bit mask of all cells that are under attack by pieces
+        on `board`, see `attack_masks`
+
+        board: a dict { (row_num, col_num) => piece_symbol }
+        """
+        table = _make_attack_table(row_count, col_count)
+        mask = 0
+        for (row_num, col_num), symbol in board.items():
+            mask |= table[cls.class_by_symbol[symbol].cid][
+                row_num * col_count + col_num
+            ]
+        return mask
+
     def __init__(self, row_num, col_num):
         """
         row_num: row number, starting from 0
@@ -85,6 +156,7 @@ class King(ChessPiece):
     """King piece class"""
     name = 'king'
     symbol = 'K'
+    attack_range = 1
 
     def attacks_pos(self, row_num, col_num):
         return max(
@@ -131,6 +203,7 @@ class Knight(ChessPiece):
     """Knight piece class"""
     name = 'knight'
     symbol = 'N'
+    attack_range = 2
 
     def attacks_pos(self, row_num, col_num):
         return {1, 2} == {
@@ -4,23 +4,60 @@ this module is responsible for finding and iterating over all unique possible
 solutions / configurations by the given parameters
 """
 
-import queue
-
 from pieces import ChessPiece
-
-
-def find_solutions_s(row_count, col_count, count_by_symbol):
+from solution_frontier import (
+    iter_solution_records,
+    record_to_board,
+    DEFAULT_MEMORY_LIMIT,
+)
+from solution_stats import (
+    CUT_ATTACKED,
+    CUT_ATTACKS_BOARD,
+    CUT_BOUND,
+    CUT_FORWARD,
+)
+from solution_forward import make_forward_checker
+from solution_single import (
+    get_single_symbol,
+    count_func_by_symbol,
+    find_solutions_lines,
+)
+from solution_transfer import use_transfer, count_solutions_transfer
+
+PIECE_ORDER = 'QRBKN'  # default order of `find_solutions_pm`
+
+
+def find_solutions_s(row_count, col_count, count_by_symbol, stats=None,
+                     forward_check=False):
     """find and iterate over solution boards, implemented with Stack
 
     row_count: int, number or rows
     col_count: int, number of columns
     count_by_symbol: dict of { piece_symbol => count }
+    stats: a `solution_stats.SearchStats` object to collect statistics,
+        or None
+    forward_check: bool, cut branches that don't have enough safe cells
+        left, see `solution_forward`
 
     this is a generator, yields a completed `board` each time
     where `board` is a dict of {(row_num, col_num) => piece_symbol}
     """
+    if forward_check:
+        check = make_forward_checker(row_count, col_count)
+    else:
+        check = None
+    if stats is not None:
+        yield from _find_solutions_s_stats(
+            row_count,
+            col_count,
+            count_by_symbol,
+            stats,
+            check,
+        )
+        return
     # `todo` is a stack (we use .append, and .pop)
-    # each item is a tuple of (board, stage, cell_num)
+    # each item is a tuple of
+    #   (board, stage, stage_size, cell_num, occupied, attacked)
     #   `board` is a dict of {(row_num, col_num) => piece_symbol}
     #   `stage` is a list containing count or each piece type:
     #       [king_count, queen_count, bishop_count, rook_count, knight_count]
@@ -30,7 +67,12 @@ def find_solutions_s(row_count, col_count, count_by_symbol):
     #       board, this way we avoid giving duplicate solutions and extra
     #       computation
     #       To decode cell_num: row_num, col_num = divmod(cell_num, col_count)
+    #   `occupied` and `attacked` are ints used as sets of cells: bit number
+    #       `cell_num` is set if that cell has a piece / is under attack
+    #       see `ChessPiece.attack_table`
+    # `check` is the forward checker, states that it rejects are not pushed
     cell_count = row_count * col_count
+    attack_table = ChessPiece.attack_table(row_count, col_count)
     stage = [
         count_by_symbol.get(cls.symbol, 0)
         for cls in ChessPiece.class_list
@@ -41,7 +83,8 @@ def find_solutions_s(row_count, col_count, count_by_symbol):
         stage,  # initial stage
         sum(stage),  # initial stage_size
         0,      # first cell (top-left corner)
-        None,   # last_piece
+        0,      # occupied cells
+        0,      # attacked cells
     )]
 
     while todo:  # stack not empty
@@ -50,60 +93,183 @@ def find_solutions_s(row_count, col_count, count_by_symbol):
             stage,
             stage_size,
             cell_num,
-            last_piece,
+            occupied,
+            attacked,
         ) = todo.pop()
 
-        if cell_num < cell_count - stage_size:
+        if cell_num < cell_count - stage_size and (not check or check(
+            occupied,
+            attacked,
+            cell_num + 1,
+            stage,
+            stage_size,
+        )):
             # we can leave cell empty, skip to next one
             todo.append((
                 board,
                 stage,
                 stage_size,
                 cell_num + 1,
-                last_piece,
+                occupied,
+                attacked,
             ))
 
+        cell_bit = 1 << cell_num
+        if attacked & cell_bit:  # cell is under attack by board
+            continue
         cell_pos = divmod(cell_num, col_count)
         # cell_pos == (row_num, col_num)
-        if last_piece and last_piece.attacks_pos(*cell_pos):
-            continue
-        if ChessPiece.pos_attacked_by_board(cell_pos[0], cell_pos[1], board):
+        tmp_todo = []
+        for piece_id, count in enumerate(stage):
+            if count < 1:
+                continue
+            mask = attack_table[piece_id][cell_num]
+            if mask & occupied:  # new piece attacks board
+                continue
+
+            new_board = board.copy()
+            new_board[cell_pos] = ChessPiece.class_list[piece_id].symbol
+
+            if stage_size <= 1:  # new_stage empty, new_board complete
+                yield new_board
+                continue
+
+            if cell_num < cell_count - (stage_size - 1):
+                new_stage = list(stage)
+                new_stage[piece_id] -= 1
+                if check and not check(
+                    occupied | cell_bit,
+                    attacked | mask,
+                    cell_num + 1,
+                    new_stage,
+                    stage_size - 1,
+                ):
+                    continue
+                tmp_todo.append((
+                    new_board,
+                    new_stage,
+                    stage_size - 1,
+                    cell_num + 1,
+                    occupied | cell_bit,
+                    attacked | mask,
+                ))
+        todo += reversed(tmp_todo)
+
+
+def _find_solutions_s_stats(row_count, col_count, count_by_symbol, stats,
+                            check=None):
+    """
+    the same as `find_solutions_s`, but also collects statistics in `stats`
+    this is kept separate, so that `find_solutions_s` has no extra work
+    when `stats` is not given (with or without forward checking)
+    `SearchStatsTest.test_same_boards` checks that both loops are in sync
+
+    check: a function given by `make_forward_checker`, or None
+    """
+    cell_count = row_count * col_count
+    attack_table = ChessPiece.attack_table(row_count, col_count)
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    piece_total = sum(stage)
+    nodes = stats.nodes
+    cuts = stats.cuts
+    todo = [({}, stage, piece_total, 0, 0, 0)]
+
+    stats.start()
+    while todo:  # stack not empty
+        (
+            board,
+            stage,
+            stage_size,
+            cell_num,
+            occupied,
+            attacked,
+        ) = todo.pop()
+        depth = piece_total - stage_size
+
+        if cell_num >= cell_count - stage_size:
+            cuts[CUT_BOUND, depth, None] += 1
+        elif check and not check(
+            occupied,
+            attacked,
+            cell_num + 1,
+            stage,
+            stage_size,
+        ):
+            cuts[CUT_FORWARD, depth, None] += 1
+        else:
+            # we can leave cell empty, skip to next one
+            todo.append((
+                board,
+                stage,
+                stage_size,
+                cell_num + 1,
+                occupied,
+                attacked,
+            ))
+
+        cell_bit = 1 << cell_num
+        if attacked & cell_bit:  # cell is under attack by board
+            cuts[CUT_ATTACKED, depth, None] += 1
             continue
+        cell_pos = divmod(cell_num, col_count)
         tmp_todo = []
         for piece_id, count in enumerate(stage):
             if count < 1:
                 continue
-            piece = ChessPiece.class_list[piece_id](*cell_pos)
-            if piece.attacks_board(board):
+            mask = attack_table[piece_id][cell_num]
+            if mask & occupied:  # new piece attacks board
+                cuts[CUT_ATTACKS_BOARD, depth, piece_id] += 1
                 continue
 
+            nodes[depth, piece_id] += 1
             new_board = board.copy()
-            new_board[cell_pos] = piece.symbol
+            new_board[cell_pos] = ChessPiece.class_list[piece_id].symbol
 
             if stage_size <= 1:  # new_stage empty, new_board complete
+                stats.solutions += 1
                 yield new_board
                 continue
 
             if cell_num < cell_count - (stage_size - 1):
                 new_stage = list(stage)
                 new_stage[piece_id] -= 1
+                if check and not check(
+                    occupied | cell_bit,
+                    attacked | mask,
+                    cell_num + 1,
+                    new_stage,
+                    stage_size - 1,
+                ):
+                    cuts[CUT_FORWARD, depth, piece_id] += 1
+                    continue
                 tmp_todo.append((
                     new_board,
                     new_stage,
                     stage_size - 1,
                     cell_num + 1,
-                    piece,  # the new last_piece
+                    occupied | cell_bit,
+                    attacked | mask,
                 ))
+            else:
+                cuts[CUT_BOUND, depth, piece_id] += 1
         todo += reversed(tmp_todo)
+    stats.stop()
 
 
-def _rec_low(row_count,
+def _rec_low(attack_table,
+             row_count,
              col_count,
              board,
              stage,
              stage_size,
              cell_num,
-             last_piece):
+             occupied,
+             attacked,
+             check=None):
+    #   `attack_table` is given by `ChessPiece.attack_table`
     #   `stage` is a list containing count or each piece type:
     #       [king_count, queen_count, bishop_count, rook_count, knight_count]
     #   `cell_num` is an int resulting from `row_num * col_count + col_num`
@@ -112,21 +278,25 @@ def _rec_low(row_count,
     #       board, this way we avoid giving duplicate solutions and extra
     #       computation
     #       To decode cell_num: row_num, col_num = divmod(cell_num, col_count)
+    #   `occupied` and `attacked` are ints used as sets of cells: bit number
+    #       `cell_num` is set if that cell has a piece / is under attack
+    #   `check` is a function given by `make_forward_checker`, or None
 
     cell_count = row_count * col_count
 
     cell_pos = divmod(cell_num, col_count)
     # cell_pos == (row_num, col_num)
-    if not ChessPiece.pos_attacked_by_board(cell_pos[0], cell_pos[1], board):
+    cell_bit = 1 << cell_num
+    if not attacked & cell_bit:
         for piece_id, count in enumerate(stage):
             if count < 1:
                 continue
-            piece = ChessPiece.class_list[piece_id](*cell_pos)
-            if piece.attacks_board(board):
+            mask = attack_table[piece_id][cell_num]
+            if mask & occupied:  # new piece attacks board
                 continue
 
             new_board = board.copy()
-            new_board[cell_pos] = piece.symbol
+            new_board[cell_pos] = ChessPiece.class_list[piece_id].symbol
 
             if stage_size <= 1:  # new_stage empty, new_board complete
                 yield new_board
@@ -135,36 +305,59 @@ def _rec_low(row_count,
             if cell_num < cell_count - (stage_size - 1):
                 new_stage = list(stage)
                 new_stage[piece_id] -= 1
+                if check and not check(
+                    occupied | cell_bit,
+                    attacked | mask,
+                    cell_num + 1,
+                    new_stage,
+                    stage_size - 1,
+                ):
+                    continue
                 yield from _rec_low(
+                    attack_table,
                     row_count,
                     col_count,
                     new_board,
                     new_stage,
                     stage_size - 1,
                     cell_num + 1,
-                    piece,  # the new last_piece
+                    occupied | cell_bit,
+                    attacked | mask,
+                    check,
                 )
 
-    if cell_num < cell_count - stage_size:
+    if cell_num < cell_count - stage_size and (not check or check(
+        occupied,
+        attacked,
+        cell_num + 1,
+        stage,
+        stage_size,
+    )):
         # we can leave cell empty, skip to next one
         yield from _rec_low(
+            attack_table,
             row_count,
             col_count,
             board,
             stage,
             stage_size,
             cell_num + 1,
-            last_piece,
+            occupied,
+            attacked,
+            check,
         )
 
 
-def find_solutions_r(row_count, col_count, count_by_symbol):
+def find_solutions_r(row_count, col_count, count_by_symbol,
+                     forward_check=False):
     """find and iterate over solution boards, implemented with Recursion
     This works only with Python 3.3 and later, as we use `yield from ...`
 
     row_count: int, number or rows
     col_count: int, number of columns
     count_by_symbol: dict of { piece_symbol => count }
+    forward_check: bool, cut branches that don't have enough safe cells
+        left, see `solution_forward`
 
     this is a generator, yields a completed `board` each time
     where `board` is a dict of {(row_num, col_num) => piece_symbol}
@@ -174,87 +367,628 @@ def find_solutions_r(row_count, col_count, count_by_symbol):
         for cls in ChessPiece.class_list
     ]
     yield from _rec_low(
+        ChessPiece.attack_table(row_count, col_count),
         row_count,
         col_count,
         {},     # initial board
         stage,  # initial stage
         sum(stage),  # initial stage_size
         0,      # first cell (top-left corner)
-        None,   # last_piece
+        0,      # occupied cells
+        0,      # attacked cells
+        make_forward_checker(row_count, col_count)
+        if forward_check else None,
     )
 
 
-def find_solutions_q(row_count, col_count, count_by_symbol):
+def find_solutions_q(row_count, col_count, count_by_symbol,
+                     memory_limit=DEFAULT_MEMORY_LIMIT):
     """find and iterate over solution boards, implemented with Queue
+    (breadth-first, level by level), see `solution_frontier` module
 
     row_count: int, number or rows
     col_count: int, number of columns
     count_by_symbol: dict of { piece_symbol => count }
+    memory_limit: maximum number of bytes to keep in memory for each level
+        of the search tree, the rest is spilled into temporary files
 
     this is a generator, yields a completed `board` each time
     where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`, but only after
+    all levels before the last are complete
+    """
+    for record in iter_solution_records(
+        row_count,
+        col_count,
+        count_by_symbol,
+        memory_limit,
+    ):
+        yield record_to_board(record, col_count)
+
+
+def find_solutions_u(row_count, col_count, count_by_symbol):
+    """find and iterate over solution boards, with a single search state
+    that is changed in place, and undone on backtracking
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`
+
+    nothing is allocated for each node of search tree, pieces are plain
+    ints (piece_id), and the board dict is only built for solutions
     """
-    # `todo` is a Queue instance (we use .empty, .put, and .get)
-    # each item is a tuple of (board, stage, cell_num)
-    #   `board` is a dict of {(row_num, col_num) => piece_symbol}
-    #   `stage` is a list containing count or each piece type:
-    #       [king_count, queen_count, bishop_count, rook_count, knight_count]
-    #   `cell_num` is an int resulting from `row_num * col_count + col_num`
-    #       representing the next cell that we want to check
-    #       and we don't want any piece to put before this cell on the current
-    #       board, this way we avoid giving duplicate solutions and extra
-    #       computation
-    #       To decode cell_num: row_num, col_num = divmod(cell_num, col_count)
     cell_count = row_count * col_count
+    attack_table = ChessPiece.attack_table(row_count, col_count)
     stage = [
         count_by_symbol.get(cls.symbol, 0)
         for cls in ChessPiece.class_list
     ]
-    todo = queue.Queue()
-    todo.put((
-        {},     # initial board
-        stage,  # initial stage
-        0,      # first cell (top-left corner)
-    ))
+    piece_total = sum(stage)
+    if not 0 < piece_total <= cell_count:
+        return
+    class_count = len(stage)
+    positions = [divmod(cell_num, col_count) for cell_num in range(cell_count)]
+    symbols = [cls.symbol for cls in ChessPiece.class_list]
+    # `limits[stage_size]` is a mask of cells that leave enough cells after
+    # them for the rest of pieces
+    limits = [
+        (1 << (cell_count - stage_size + 1)) - 1
+        for stage_size in range(piece_total + 1)
+    ]
+    # search state of each depth (number of pieces on board), for undo
+    cells = [0] * piece_total  # cell_num of each placed piece
+    pieces = [0] * piece_total  # piece_id of each placed piece
+    occupied_stack = [0] * piece_total
+    attacked_stack = [0] * piece_total
+    free_stack = [0] * piece_total
+
+    depth = 0
+    occupied = 0
+    attacked = 0
+    free = limits[piece_total]  # cells that we can put the next piece on
+    piece_id = 0  # next piece type to try on the lowest free cell
+    while True:
+        if not free:
+            if depth == 0:
+                return
+            # undo the last placement, and try the next piece type there
+            depth -= 1
+            piece_id = pieces[depth]
+            stage[piece_id] += 1
+            occupied = occupied_stack[depth]
+            attacked = attacked_stack[depth]
+            free = free_stack[depth]
+            piece_id += 1
+            continue
+        cell_bit = free & -free  # lowest free cell
+        cell_num = cell_bit.bit_length() - 1
+        while piece_id < class_count and (
+            stage[piece_id] < 1 or
+            attack_table[piece_id][cell_num] & occupied
+        ):
+            piece_id += 1
+        if piece_id == class_count:  # no more piece types for this cell
+            free ^= cell_bit
+            piece_id = 0
+            continue
+        cells[depth] = cell_num
+        pieces[depth] = piece_id
+        if depth + 1 == piece_total:  # board complete
+            yield {
+                positions[cells[index]]: symbols[pieces[index]]
+                for index in range(piece_total)
+            }
+            piece_id += 1
+            continue
+        occupied_stack[depth] = occupied
+        attacked_stack[depth] = attacked
+        free_stack[depth] = free
+        stage[piece_id] -= 1
+        occupied |= cell_bit
+        attacked |= attack_table[piece_id][cell_num]
+        depth += 1
+        free = ~(occupied | attacked) & limits[piece_total - depth] & \
+            -(cell_bit << 1)
+        piece_id = 0
+
+
+def placed_to_board(placed, col_count):
+    """
+    convert a linked list of placements into a `board` dict
+    `placed` is either None or a tuple of (cell_num, piece_id, placed)
+    """
+    symbols = [cls.symbol for cls in ChessPiece.class_list]
+    board = {}
+    while placed:
+        cell_num, piece_id, placed = placed
+        board[divmod(cell_num, col_count)] = symbols[piece_id]
+    return board
 
-    while not todo.empty():  # queue not empty
-        board, stage, cell_num = todo.get()
-        stage_size = sum(stage)
 
-        if cell_num < cell_count - stage_size:
-            # we can leave cell empty, skip to next one
-            todo.put((
-                board,
-                stage,
-                cell_num + 1,
-            ))
+def iter_placed_bb(attack_table, cell_count, todo):
+    """
+    the main loop of bitboard implementation, starting from the given `todo`
+    stack, see `find_solutions_bb`
 
-        cell_pos = divmod(cell_num, col_count)
-        # cell_pos == (row_num, col_num)
-        if ChessPiece.pos_attacked_by_board(cell_pos[0], cell_pos[1], board):
-            continue
+    this is a generator, yields `placed` linked list of each solution
+    """
+    while todo:  # stack not empty
+        (
+            placed,
+            stage,
+            stage_size,
+            cell_num,
+            occupied,
+            attacked,
+        ) = todo.pop()
+
+        # `free` has a bit set for each cell that we can put a piece on:
+        # not before `cell_num`, not occupied or under attack, and leaving
+        # enough cells after it for the rest of pieces
+        free = ~(occupied | attacked) & \
+            ((1 << (cell_count - stage_size + 1)) - 1) & \
+            -(1 << cell_num)
+        active = [
+            (piece_id, attack_table[piece_id])
+            for piece_id, count in enumerate(stage)
+            if count > 0
+        ]
+        tmp_todo = []
+        while free:
+            cell_bit = free & -free  # lowest free cell
+            free ^= cell_bit
+            cell_num = cell_bit.bit_length() - 1
+            for piece_id, masks in active:
+                mask = masks[cell_num]
+                if mask & occupied:  # new piece attacks board
+                    continue
+
+                if stage_size <= 1:  # new_stage empty, new_board complete
+                    yield (cell_num, piece_id, placed)
+                    continue
+
+                new_stage = list(stage)
+                new_stage[piece_id] -= 1
+                tmp_todo.append((
+                    (cell_num, piece_id, placed),
+                    new_stage,
+                    stage_size - 1,
+                    cell_num + 1,
+                    occupied | cell_bit,
+                    attacked | mask,
+                ))
+        todo += reversed(tmp_todo)
+
+
+def _iter_placed_bb_stats(attack_table, cell_count, todo, stats,
+                          piece_total):
+    """
+    the same as `iter_placed_bb`, but also collects statistics in `stats`
+    this is kept separate, so that `iter_placed_bb` has no extra work
+    `SearchStatsTest.test_same_boards` checks that both loops are in sync
+    `piece_total` is the total number of pieces, to calculate depth
+
+    cells are skipped all at once here, so for each state we count the
+    cells that are under attack, and the free cells that are left out
+    because there would not be enough cells after them for the rest of
+    pieces
+    """
+    nodes = stats.nodes
+    cuts = stats.cuts
+    all_cells = (1 << cell_count) - 1
+    while todo:  # stack not empty
+        (
+            placed,
+            stage,
+            stage_size,
+            cell_num,
+            occupied,
+            attacked,
+        ) = todo.pop()
+        depth = piece_total - stage_size
+
+        after = all_cells & -(1 << cell_num)  # cells from `cell_num`
+        limit = (1 << (cell_count - stage_size + 1)) - 1
+        cuts[CUT_ATTACKED, depth, None] += \
+            bin(attacked & ~occupied & after & limit).count('1')
+        cuts[CUT_BOUND, depth, None] += \
+            bin(~(occupied | attacked) & after & ~limit).count('1')
+        free = ~(occupied | attacked) & limit & after
+        active = [
+            (piece_id, attack_table[piece_id])
+            for piece_id, count in enumerate(stage)
+            if count > 0
+        ]
+        tmp_todo = []
+        while free:
+            cell_bit = free & -free  # lowest free cell
+            free ^= cell_bit
+            cell_num = cell_bit.bit_length() - 1
+            for piece_id, masks in active:
+                mask = masks[cell_num]
+                if mask & occupied:  # new piece attacks board
+                    cuts[CUT_ATTACKS_BOARD, depth, piece_id] += 1
+                    continue
+                nodes[depth, piece_id] += 1
+
+                if stage_size <= 1:  # new_stage empty, new_board complete
+                    stats.solutions += 1
+                    yield (cell_num, piece_id, placed)
+                    continue
+
+                new_stage = list(stage)
+                new_stage[piece_id] -= 1
+                tmp_todo.append((
+                    (cell_num, piece_id, placed),
+                    new_stage,
+                    stage_size - 1,
+                    cell_num + 1,
+                    occupied | cell_bit,
+                    attacked | mask,
+                ))
+        todo += reversed(tmp_todo)
+
+
+def iter_children_bb(attack_table, cell_count, state):
+    """
+    iterate over child states of given `state` of bitboard implementation,
+    in the same order as `find_solutions_bb` visits them
+    `state` is a tuple of
+        (placed, stage, stage_size, cell_num, occupied, attacked)
+    see `find_solutions_bb`, a child with `stage_size == 0` is a solution
+    """
+    placed, stage, stage_size, cell_num, occupied, attacked = state
+    free = ~(occupied | attacked) & \
+        ((1 << (cell_count - stage_size + 1)) - 1) & \
+        -(1 << cell_num)
+    while free:
+        cell_bit = free & -free  # lowest free cell
+        free ^= cell_bit
+        cell_num = cell_bit.bit_length() - 1
         for piece_id, count in enumerate(stage):
             if count < 1:
                 continue
-            if cell_pos in board:
-                continue
-            piece = ChessPiece.class_list[piece_id](*cell_pos)
-            if piece.attacks_board(board):
+            mask = attack_table[piece_id][cell_num]
+            if mask & occupied:  # new piece attacks board
                 continue
-
-            new_board = board.copy()
-            new_board[cell_pos] = piece.symbol
-
             new_stage = list(stage)
             new_stage[piece_id] -= 1
+            yield (
+                (cell_num, piece_id, placed),
+                new_stage,
+                stage_size - 1,
+                cell_num + 1,
+                occupied | cell_bit,
+                attacked | mask,
+            )
 
-            if stage_size <= 1:  # new_stage empty, new_board complete
-                yield new_board
-                continue
 
-            if cell_num < cell_count - (stage_size - 1):
-                todo.put((
-                    new_board,
-                    new_stage,
-                    cell_num + 1,
-                ))
+def find_solutions_bb(row_count, col_count, count_by_symbol, stats=None):
+    """find and iterate over solution boards, implemented with Stack and
+    integer bitboards
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    stats: a `solution_stats.SearchStats` object to collect statistics,
+        or None
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`
+    """
+    # `todo` is a stack (we use .append, and .pop)
+    # each item is a tuple of
+    #   (placed, stage, stage_size, cell_num, occupied, attacked)
+    #   `placed` is a linked list of placed pieces, either None or a tuple
+    #       of (cell_num, piece_id, placed), we only build the board dict
+    #       when it's complete
+    #   `stage` is a list containing count or each piece type:
+    #       [king_count, queen_count, bishop_count, rook_count, knight_count]
+    #   `cell_num` is the first cell that we can put the next piece on
+    #   `occupied` and `attacked` are ints used as sets of cells: bit number
+    #       `cell_num` is set if that cell has a piece / is under attack
+    #       see `ChessPiece.attack_table`
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    stage_size = sum(stage)
+    if not 0 < stage_size <= row_count * col_count:
+        return
+    todo = [(
+        None,   # nothing placed yet
+        stage,  # initial stage
+        stage_size,  # initial stage_size
+        0,      # first cell (top-left corner)
+        0,      # occupied cells
+        0,      # attacked cells
+    )]
+    attack_table = ChessPiece.attack_table(row_count, col_count)
+    if stats is None:
+        for placed in iter_placed_bb(
+            attack_table,
+            row_count * col_count,
+            todo,
+        ):
+            yield placed_to_board(placed, col_count)
+        return
+    stats.start()
+    for placed in _iter_placed_bb_stats(
+        attack_table,
+        row_count * col_count,
+        todo,
+        stats,
+        stage_size,
+    ):
+        yield placed_to_board(placed, col_count)
+    stats.stop()
+
+
+def count_bb(attack_table, cell_count, stage, stage_size, cell_num,
+             occupied, attacked):
+    """
+    return the number of ways to put the rest of pieces (given by `stage`)
+    starting from `cell_num`, see `count_solutions` and `find_solutions_bb`
+    `stage_size` must be at least 1
+
+    it's a loop with a stack for each depth (like `find_solutions_u`), so
+    there is no function call or list for each node
+    `stage` is modified while counting, but restored before return
+    """
+    class_count = len(stage)
+    limits = [
+        (1 << (cell_count - size + 1)) - 1
+        for size in range(stage_size + 1)
+    ]
+    last = stage_size - 1  # depth of the last piece
+    pieces = [0] * stage_size
+    occupied_stack = [0] * stage_size
+    attacked_stack = [0] * stage_size
+    free_stack = [0] * stage_size
+    count = 0
+    depth = 0
+    free = ~(occupied | attacked) & limits[stage_size] & -(1 << cell_num)
+    piece_id = 0
+    while True:
+        if depth == last:
+            # the last piece: count free cells that it would not attack any
+            # piece from, and since all pieces attack symmetrically, these
+            # are the cells that are not attacked by the same type of piece
+            # on any of the occupied cells
+            masks = attack_table[stage.index(1)]
+            while free:
+                cell_bit = free & -free
+                free ^= cell_bit
+                if not masks[cell_bit.bit_length() - 1] & occupied:
+                    count += 1
+        if not free:
+            if depth == 0:
+                return count
+            # undo the last placement, and try the next piece type there
+            depth -= 1
+            piece_id = pieces[depth]
+            stage[piece_id] += 1
+            occupied = occupied_stack[depth]
+            attacked = attacked_stack[depth]
+            free = free_stack[depth]
+            piece_id += 1
+            continue
+        cell_bit = free & -free  # lowest free cell
+        cell_num = cell_bit.bit_length() - 1
+        while piece_id < class_count and (
+            stage[piece_id] < 1 or
+            attack_table[piece_id][cell_num] & occupied
+        ):
+            piece_id += 1
+        if piece_id == class_count:  # no more piece types for this cell
+            free ^= cell_bit
+            piece_id = 0
+            continue
+        pieces[depth] = piece_id
+        occupied_stack[depth] = occupied
+        attacked_stack[depth] = attacked
+        free_stack[depth] = free
+        stage[piece_id] -= 1
+        occupied |= cell_bit
+        attacked |= attack_table[piece_id][cell_num]
+        depth += 1
+        free = ~(occupied | attacked) & limits[stage_size - depth] & \
+            -(cell_bit << 1)
+        piece_id = 0
+
+
+def count_solutions(row_count, col_count, count_by_symbol):
+    """count solution boards, without building any board
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+
+    returns the number of solutions that `find_solutions_s` would give
+    problems with only one piece type are counted by `solution_single`, and
+    problems with only short-range pieces on narrow enough boards by
+    `solution_transfer` (see `use_transfer`)
+    """
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    stage_size = sum(stage)
+    cell_count = row_count * col_count
+    if not 0 < stage_size <= cell_count:
+        return 0
+    symbol = get_single_symbol(count_by_symbol)
+    if symbol is not None:
+        return count_func_by_symbol[symbol](row_count, col_count, stage_size)
+    if use_transfer(row_count, col_count, count_by_symbol):
+        return count_solutions_transfer(row_count, col_count, count_by_symbol)
+    return count_bb(
+        ChessPiece.attack_table(row_count, col_count),
+        cell_count,
+        stage,
+        stage_size,
+        0,  # first cell (top-left corner)
+        0,  # occupied cells
+        0,  # attacked cells
+    )
+
+
+def find_solutions(row_count, col_count, count_by_symbol):
+    """find and iterate over solution boards, using the fastest
+    implementation for the problem: `find_solutions_lines` for only queens
+    or only rooks, and `find_solutions_u` otherwise
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`
+    """
+    symbol = get_single_symbol(count_by_symbol)
+    if symbol in ('Q', 'R'):
+        yield from find_solutions_lines(
+            row_count,
+            col_count,
+            symbol,
+            count_by_symbol[symbol],
+        )
+        return
+    yield from find_solutions_u(row_count, col_count, count_by_symbol)
+
+
+def _pm_low(attack_table,
+            cell_count,
+            stage,
+            piece_order,
+            order_index,
+            count,
+            cell_num,
+            occupied,
+            attacked,
+            placed):
+    #   `piece_order` is a list of piece_id of all piece types to put, and
+    #       `order_index` is the index of current piece type in it
+    #   `count` is the number of pieces of current type left to put,
+    #       including this one
+    #   `cell_num` is the first cell that we can put current piece on,
+    #       pieces of the same type are put in increasing cell order, this
+    #       way we avoid giving duplicate solutions
+    #   `occupied` and `attacked` are ints used as sets of cells: bit number
+    #       `cell_num` is set if that cell has a piece / is under attack
+    #   `placed` is a linked list of placed pieces, see `find_solutions_bb`
+    piece_id = piece_order[order_index]
+    masks = attack_table[piece_id]
+    free = ~(occupied | attacked) & ((1 << cell_count) - 1) & \
+        -(1 << cell_num)
+    free_count = bin(free).count('1')
+    while free_count >= count:  # enough free cells left for this type
+        cell_bit = free & -free  # lowest free cell
+        free ^= cell_bit
+        free_count -= 1
+        cell_num = cell_bit.bit_length() - 1
+        mask = masks[cell_num]
+        if mask & occupied:  # new piece attacks board
+            continue
+        new_placed = (cell_num, piece_id, placed)
+        if count > 1:  # more pieces of this type
+            yield from _pm_low(
+                attack_table,
+                cell_count,
+                stage,
+                piece_order,
+                order_index,
+                count - 1,
+                cell_num + 1,
+                occupied | cell_bit,
+                attacked | mask,
+                new_placed,
+            )
+        elif order_index + 1 < len(piece_order):  # next piece type
+            yield from _pm_low(
+                attack_table,
+                cell_count,
+                stage,
+                piece_order,
+                order_index + 1,
+                stage[piece_order[order_index + 1]],
+                0,
+                occupied | cell_bit,
+                attacked | mask,
+                new_placed,
+            )
+        else:  # board complete
+            yield new_placed
+
+
+def check_piece_order(piece_order):
+    """
+    raise ValueError if `piece_order` (a string of piece symbols) has an
+    invalid or a repeated symbol
+    """
+    for index, symbol in enumerate(piece_order):
+        if symbol not in ChessPiece.class_by_symbol:
+            raise ValueError('invalid piece symbol %r in piece order' % symbol)
+        if symbol in piece_order[:index]:
+            raise ValueError(
+                'repeated piece symbol %r in piece order' % symbol
+            )
+
+
+def find_solutions_pm(row_count, col_count, count_by_symbol,
+                      piece_order=PIECE_ORDER):
+    """find and iterate over solution boards, putting pieces type by type
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    piece_order: string of piece symbols, the order of putting piece types
+        piece types that are not in it are put last, see
+        `check_piece_order` for invalid ones
+        the default order puts pieces that attack more cells first, which
+        cuts dead branches sooner
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    gives the same set of boards as `find_solutions_s`, in another order
+    """
+    check_piece_order(piece_order)
+    cell_count = row_count * col_count
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    if not 0 < sum(stage) <= cell_count:
+        return
+    piece_order = [
+        ChessPiece.class_by_symbol[symbol].cid
+        for symbol in piece_order
+    ] + [
+        cls.cid
+        for cls in ChessPiece.class_list
+        if cls.symbol not in piece_order
+    ]
+    piece_order = [
+        piece_id
+        for piece_id in piece_order
+        if stage[piece_id] > 0
+    ]
+    for placed in _pm_low(
+        ChessPiece.attack_table(row_count, col_count),
+        cell_count,
+        stage,
+        piece_order,
+        0,  # first piece type
+        stage[piece_order[0]],
+        0,  # first cell (top-left corner)
+        0,  # occupied cells
+        0,  # attacked cells
+        None,  # nothing placed yet
+    ):
+        yield placed_to_board(placed, col_count)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+solving many problems in one run, given as JSON lines
+
+each input line is a JSON object like:
+    {"id": "a", "rows": 7, "cols": 7, "pieces": {"K": 2, "Q": 2}}
+with optional "method": "count" (default), "symmetry", "memo" or "stats"
+and each output line is a JSON object like:
+    {"index": 0, "id": "a", "rows": 7, "cols": 7, "pieces": {...},
+     "count": 3063828, "time": 12.3}
+with "stats" for method "stats", "cached": true if the count was found in
+cache, or "error" instead of "count" if the problem is invalid
+
+problems with the same board size are sent together to worker processes,
+so they share the attack table (and memo table) of that size, that's why
+all problems are read before solving them (see `solution_server` to solve
+problems as they arrive)
+"""
+
+import os
+import json
+import multiprocessing
+from time import perf_counter
+
+from pieces import ChessPiece
+from solution import count_solutions, find_solutions_bb
+from solution_symmetry import count_solutions_sym
+from solution_memo import MemoCounter
+from solution_stats import SearchStats
+
+CHUNK_SIZE = 16  # maximum number of problems sent to a worker at once
+METHODS = ('count', 'symmetry', 'memo', 'stats')
+
+_memo_counters = {}  # MemoCounter by (row_count, col_count), in each process
+
+
+def parse_problem(data):
+    """
+    validate a problem given as a dict (parsed JSON), and return a tuple of
+        (row_count, col_count, count_by_symbol, method)
+    raises ValueError if it's not valid
+    """
+    if not isinstance(data, dict):
+        raise ValueError('problem must be a JSON object')
+    try:
+        row_count = data['rows']
+        col_count = data['cols']
+    except KeyError as e:
+        raise ValueError('missing %s' % e)
+    for value in (row_count, col_count):
+        if not isinstance(value, int) or isinstance(value, bool) or \
+           value < 1:
+            raise ValueError('rows and cols must be positive integers')
+    pieces = data.get('pieces', {})
+    if not isinstance(pieces, dict):
+        raise ValueError('pieces must be a JSON object')
+    count_by_symbol = {}
+    for symbol, count in pieces.items():
+        if symbol not in ChessPiece.class_by_symbol:
+            raise ValueError('invalid piece symbol %r' % symbol)
+        if not isinstance(count, int) or isinstance(count, bool) or \
+           count < 0:
+            raise ValueError('piece counts must be non-negative integers')
+        count_by_symbol[symbol] = count
+    method = data.get('method', 'count')
+    if method not in METHODS:
+        raise ValueError('invalid method %r' % method)
+    return row_count, col_count, count_by_symbol, method
+
+
+def solve_problem(row_count, col_count, count_by_symbol, method='count'):
+    """
+    solve one problem, return a dict with "count" and "time" (in seconds)
+    and "stats" for method "stats"
+    """
+    result = {}
+    tm0 = perf_counter()
+    if method == 'symmetry':
+        count = count_solutions_sym(row_count, col_count, count_by_symbol)
+    elif method == 'memo':
+        key = (row_count, col_count)
+        counter = _memo_counters.get(key)
+        if counter is None:
+            counter = _memo_counters[key] = MemoCounter(row_count, col_count)
+        count = counter.count(count_by_symbol)
+    elif method == 'stats':
+        stats = SearchStats()
+        count = sum(1 for _ in find_solutions_bb(
+            row_count,
+            col_count,
+            count_by_symbol,
+            stats=stats,
+        ))
+        result['stats'] = stats.to_dict()
+    else:
+        count = count_solutions(row_count, col_count, count_by_symbol)
+    result['count'] = count
+    result['time'] = perf_counter() - tm0
+    return result
+
+
+def _solve_chunk(chunk):
+    """
+    worker function, solve a list of (index, problem) where problem is
+    given by `parse_problem`, return a list of (index, result)
+    """
+    return [
+        (index, solve_problem(*problem))
+        for index, problem in chunk
+    ]
+
+
+def _make_chunks(problems):
+    """
+    group problems of the same board size, and split groups into chunks
+    problems: list of (index, problem)
+    """
+    groups = {}
+    for index, problem in problems:
+        groups.setdefault(problem[:2], []).append((index, problem))
+    chunks = []
+    for group in groups.values():
+        for start in range(0, len(group), CHUNK_SIZE):
+            chunks.append(group[start:start + CHUNK_SIZE])
+    # bigger boards first, so they don't finish last
+    chunks.sort(key=lambda chunk: -chunk[0][1][0] * chunk[0][1][1])
+    return chunks
+
+
+def run_batch(items, jobs=None, cache=None):
+    """
+    solve a list of problems, using `jobs` worker processes
+
+    items: list (or iterable) of parsed JSON values, see module docstring
+        all of them are taken before solving the first problem
+    jobs: number of worker processes, defaults to number of CPUs
+    cache: a `solution_cache.SolutionCache`, or None
+
+    this is a generator, yields a result dict for each problem, as soon as
+    it's solved, not in the order of `items`
+    """
+    problems = []
+    pending = {}  # result dicts of problems to solve, by index
+    for index, data in enumerate(items):
+        result = {'index': index}
+        if isinstance(data, dict) and 'id' in data:
+            result['id'] = data['id']
+        try:
+            problem = parse_problem(data)
+        except ValueError as e:
+            result['error'] = str(e)
+            yield result
+            continue
+        row_count, col_count, count_by_symbol, method = problem
+        result.update(
+            rows=row_count,
+            cols=col_count,
+            pieces=count_by_symbol,
+        )
+        if cache is not None and method != 'stats':
+            count = cache.get_count(row_count, col_count, count_by_symbol)
+            if count is not None:
+                result.update(count=count, time=0.0, cached=True)
+                yield result
+                continue
+        problems.append((index, problem))
+        pending[index] = result
+
+    for index, solved in _map_chunks(_make_chunks(problems), jobs):
+        result = pending.pop(index)
+        result.update(solved)
+        if cache is not None:
+            cache.put_count(
+                result['rows'],
+                result['cols'],
+                result['pieces'],
+                result['count'],
+            )
+        yield result
+
+
+def _map_chunks(chunks, jobs):
+    """
+    solve chunks using `jobs` worker processes, and iterate over
+    (index, result) of problems as soon as each chunk is solved
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        for chunk in chunks:
+            yield from _solve_chunk(chunk)
+        return
+    with multiprocessing.Pool(jobs) as pool:
+        for chunk_result in pool.imap_unordered(
+            _solve_chunk,
+            chunks,
+            chunksize=1,
+        ):
+            yield from chunk_result
+
+
+def iter_jsonl(fileobj):
+    """
+    iterate over JSON values of lines of a text file object, skipping empty
+    lines, invalid lines are given as None
+    """
+    for line in fileobj:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+compact binary format for storing solutions / configurations, and a
+memory-mapped store for random access to them by index
+
+a file starts with a header:
+    magic (4 bytes), version (uint8), class_count (uint8),
+    row_count (uint16), col_count (uint16), record_count (uint64),
+    then count of each piece type (class_count * uint16)
+followed by fixed-size records, one for each board:
+    (cell_num (uint16), piece_id (uint8)) for each piece, sorted by cell_num
+all numbers are little-endian
+"""
+
+import mmap
+import struct
+
+from pieces import ChessPiece
+
+MAGIC = b'CHSB'
+VERSION = 1
+UNKNOWN_COUNT = 2 ** 64 - 1  # record_count of a file that is not closed
+BUFFER_SIZE = 1 << 20  # bytes
+
+_header_struct = struct.Struct('<4sBBHHQ')
+_record_count_offset = 10  # offset of record_count in header
+
+
+def _counts_struct(class_count):
+    return struct.Struct('<%dH' % class_count)
+
+
+def _record_struct(piece_total):
+    return struct.Struct('<' + 'HB' * piece_total)
+
+
+def check_board_size(row_count, col_count):
+    """
+    raise ValueError if cell numbers, row_count or col_count of a board do
+    not fit uint16 fields of the format
+    """
+    if row_count * col_count > 0x10000 or row_count > 0xFFFF or \
+       col_count > 0xFFFF:
+        raise ValueError('board is too large for binary format')
+
+
+class SolutionWriter(object):
+    """
+    writes solution boards of a problem into a binary file object
+    can be used as a context manager
+    """
+    def __init__(self, fileobj, row_count, col_count, count_by_symbol,
+                 buffer_size=BUFFER_SIZE):
+        """
+        fileobj: a binary file object opened for writing
+        row_count: int, number or rows
+        col_count: int, number of columns
+        count_by_symbol: dict of { piece_symbol => count }
+        buffer_size: number of bytes to collect before each write
+        """
+        check_board_size(row_count, col_count)
+        self.fileobj = fileobj
+        self.col_count = col_count
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.record_count = 0
+        counts = [
+            count_by_symbol.get(cls.symbol, 0)
+            for cls in ChessPiece.class_list
+        ]
+        self.record_struct = _record_struct(sum(counts))
+        try:
+            self.header_pos = fileobj.tell()
+        except (AttributeError, OSError):
+            self.header_pos = None  # not seekable, like a pipe
+        fileobj.write(_header_struct.pack(
+            MAGIC,
+            VERSION,
+            len(counts),
+            row_count,
+            col_count,
+            UNKNOWN_COUNT,
+        ))
+        fileobj.write(_counts_struct(len(counts)).pack(*counts))
+
+    def write(self, board):
+        """
+        add a board to file
+
+        board: a dict { (row_num, col_num) => piece_symbol }
+        """
+        values = []
+        for (row_num, col_num), symbol in sorted(board.items()):
+            values.append(row_num * self.col_count + col_num)
+            values.append(ChessPiece.class_by_symbol[symbol].cid)
+        self.buffer += self.record_struct.pack(*values)
+        self.record_count += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """write buffered boards to file object"""
+        if self.buffer:
+            self.fileobj.write(self.buffer)
+            self.buffer = bytearray()
+
+    def close(self):
+        """
+        flush buffered boards, and update record_count in header if
+        file object is seekable, does not close the file object
+        """
+        self.flush()
+        if self.header_pos is None:
+            return
+        pos = self.fileobj.tell()
+        self.fileobj.seek(self.header_pos + _record_count_offset)
+        self.fileobj.write(struct.pack('<Q', self.record_count))
+        self.fileobj.seek(pos)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_header(fileobj):
+    """
+    read the header of a binary solution file, return a dict with keys:
+        row_count, col_count, count_by_symbol, record_count, header_size,
+        piece_count, record_size
+    `record_count` is None if the file was not closed properly
+    """
+    data = fileobj.read(_header_struct.size)
+    if len(data) < _header_struct.size:
+        raise ValueError('not a solution file: too short')
+    (
+        magic,
+        version,
+        class_count,
+        row_count,
+        col_count,
+        record_count,
+    ) = _header_struct.unpack(data)
+    if magic != MAGIC:
+        raise ValueError('not a solution file: bad magic %r' % magic)
+    if version != VERSION:
+        raise ValueError('unsupported solution file version %s' % version)
+    counts_struct = _counts_struct(class_count)
+    counts = counts_struct.unpack(fileobj.read(counts_struct.size))
+    return {
+        'row_count': row_count,
+        'col_count': col_count,
+        'count_by_symbol': {
+            ChessPiece.class_list[piece_id].symbol: count
+            for piece_id, count in enumerate(counts)
+        },
+        'record_count': None if record_count == UNKNOWN_COUNT
+        else record_count,
+        'header_size': _header_struct.size + counts_struct.size,
+        'piece_count': sum(counts),
+        'record_size': _record_struct(sum(counts)).size,
+    }
+
+
+def decode_record(values, col_count):
+    """
+    convert unpacked values of a record into a `board` dict
+    """
+    symbols = [cls.symbol for cls in ChessPiece.class_list]
+    return {
+        divmod(values[index], col_count): symbols[values[index + 1]]
+        for index in range(0, len(values), 2)
+    }
+
+
+def iter_boards_bin(path, chunk_size=BUFFER_SIZE):
+    """
+    iterate over boards of a binary solution file
+
+    path: path of the file
+    chunk_size: approximate number of bytes to read each time
+
+    this is a generator, yields a `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    """
+    with open(path, 'rb') as fileobj:
+        header = read_header(fileobj)
+        col_count = header['col_count']
+        record_size = header['record_size']
+        if record_size < 1:
+            return
+        record_struct = _record_struct(header['piece_count'])
+        chunk_size = max(1, chunk_size // record_size) * record_size
+        while True:
+            data = fileobj.read(chunk_size)
+            if not data:
+                break
+            extra = len(data) % record_size
+            if extra:  # truncated file
+                data = data[:-extra]
+            for values in record_struct.iter_unpack(data):
+                yield decode_record(values, col_count)
+            if extra:
+                break
+
+
+class SolutionStore(object):
+    """
+    random access to boards of a binary solution file, using mmap
+
+    store[n] returns the n-th board, as a `board` dict
+    store[a:b] returns a SolutionStoreView, without reading or copying
+    can be used as a context manager
+    """
+    def __init__(self, path):
+        """
+        path: path of a binary solution file, see `SolutionWriter`
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            header = read_header(self._file)
+            self._file.seek(0, 2)
+            file_size = self._file.tell()
+            self._mmap = mmap.mmap(
+                self._file.fileno(),
+                0,
+                access=mmap.ACCESS_READ,
+            )
+        except BaseException:
+            self._file.close()
+            raise
+        self.header = header
+        self.row_count = header['row_count']
+        self.col_count = header['col_count']
+        self.count_by_symbol = header['count_by_symbol']
+        self.header_size = header['header_size']
+        self.record_size = header['record_size']
+        self._record_struct = _record_struct(header['piece_count'])
+        if self.record_size > 0:
+            # a file that is not closed properly has no record_count
+            self._length = (file_size - self.header_size) // self.record_size
+            if header['record_count'] is not None:
+                self._length = min(self._length, header['record_count'])
+        else:
+            self._length = header['record_count'] or 0
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SolutionStoreView(self, range(self._length)[index])
+        return self.get_board(range(self._length)[index])
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self.get_board(index)
+
+    def get_board(self, index):
+        """
+        return the board of given index, as a dict
+            { (row_num, col_num) => piece_symbol }
+        index must be non-negative and less than len(store)
+        """
+        return decode_record(
+            self._record_struct.unpack_from(
+                self._mmap,
+                self.header_size + index * self.record_size,
+            ),
+            self.col_count,
+        )
+
+    def get_buffer(self, start, stop):
+        """
+        return a memoryview of raw records from `start` to `stop` (not
+        including), without copying
+        must be released before closing the store
+        """
+        start, stop, _ = slice(start, stop).indices(self._length)
+        stop = max(start, stop)
+        return memoryview(self._mmap)[
+            self.header_size + start * self.record_size:
+            self.header_size + stop * self.record_size
+        ]
+
+    def close(self):
+        """close the memory map and file"""
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SolutionStoreView(object):
+    """
+    a lazy sequence of boards of a SolutionStore, given by slicing it
+    boards are read only when they are accessed
+    """
+    def __init__(self, store, index_range):
+        """
+        store: a SolutionStore instance
+        index_range: a range object of board indexes in store
+        """
+        self.store = store
+        self.index_range = index_range
+
+    def __len__(self):
+        return len(self.index_range)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SolutionStoreView(self.store, self.index_range[index])
+        return self.store.get_board(self.index_range[index])
+
+    def __iter__(self):
+        for index in self.index_range:
+            yield self.store.get_board(index)
+
+    def get_buffer(self):
+        """
+        return a memoryview of raw records of this view, without copying
+        only for views with step 1, see `SolutionStore.get_buffer`
+        """
+        if self.index_range.step != 1:
+            raise ValueError('only views with step 1 have a buffer')
+        return self.store.get_buffer(
+            self.index_range.start,
+            self.index_range.stop,
+        )
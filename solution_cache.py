@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+persistent on-disk cache of solution counts (and paths of solution files)
+
+counts are kept in an SQLite database, keyed by a canonical problem key, so
+symmetric variants of a problem (like swapped rows and columns) share the
+same entry, the least recently used entries are removed when there are more
+than a maximum number of entries
+
+SQLite takes care of locking, so the cache can be used by many processes at
+the same time
+"""
+
+import os
+import sqlite3
+from time import time as now
+
+from pieces import ChessPiece
+from solution import count_solutions
+
+DEFAULT_MAX_ENTRIES = 10000
+LOCK_TIMEOUT = 30.0  # seconds to wait for another process
+
+
+def get_default_path():
+    """
+    return the default path of cache file, in $XDG_CACHE_HOME or ~/.cache
+    """
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'chess-challenge', 'counts.sqlite3')
+
+
+def _counts_str(count_by_symbol):
+    return ''.join(
+        '%s%s' % (cls.symbol, count_by_symbol.get(cls.symbol, 0))
+        for cls in ChessPiece.class_list
+    )
+
+
+def problem_key(row_count, col_count, count_by_symbol):
+    """
+    return the canonical key of a problem, as a string
+
+    all piece types attack symmetrically under rotations and reflections of
+    the board, so a problem and the one with rows and columns swapped have
+    the same number of solutions, and the same key
+    """
+    return '%sx%s:%s' % (
+        min(row_count, col_count),
+        max(row_count, col_count),
+        _counts_str(count_by_symbol),
+    )
+
+
+def exact_problem_key(row_count, col_count, count_by_symbol):
+    """
+    return the key of a problem without swapping rows and columns, for
+    things that depend on the orientation of board, like solution files
+    """
+    return '%sx%s:%s' % (row_count, col_count, _counts_str(count_by_symbol))
+
+
+class SolutionCache(object):
+    """
+    persistent cache of solution counts, and paths of solution files
+    can be used as a context manager
+    """
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        path: path of SQLite database file, default is `get_default_path()`
+            the directory is created if it does not exist
+        max_entries: maximum number of entries in each table
+        """
+        if path is None:
+            path = get_default_path()
+        if path != ':memory:':
+            cache_dir = os.path.dirname(os.path.abspath(path))
+            os.makedirs(cache_dir, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        # it may be used from another thread than the one that opened it
+        # (one thread at a time), like the solver service does
+        self.conn = sqlite3.connect(
+            path,
+            timeout=LOCK_TIMEOUT,
+            check_same_thread=False,
+        )
+        with self.conn:
+            # counts can be larger than 64-bit integers, so they are kept
+            # as text
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS counts ('
+                'key TEXT PRIMARY KEY, '
+                'count TEXT NOT NULL, '
+                'last_used REAL NOT NULL)'
+            )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'key TEXT PRIMARY KEY, '
+                'path TEXT NOT NULL, '
+                'last_used REAL NOT NULL)'
+            )
+
+    def close(self):
+        """close the database connection"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get(self, table, key):
+        with self.conn:
+            row = self.conn.execute(
+                'SELECT %s FROM %s WHERE key = ?' % (
+                    'count' if table == 'counts' else 'path',
+                    table,
+                ),
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                'UPDATE %s SET last_used = ? WHERE key = ?' % table,
+                (now(), key),
+            )
+        return row[0]
+
+    def _put(self, table, key, value):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO %s VALUES (?, ?, ?)' % table,
+                (key, value, now()),
+            )
+            # remove the least recently used entries
+            self.conn.execute(
+                'DELETE FROM %s WHERE key NOT IN ('
+                'SELECT key FROM %s ORDER BY last_used DESC LIMIT ?)'
+                % (table, table),
+                (self.max_entries,),
+            )
+
+    def get_count(self, row_count, col_count, count_by_symbol):
+        """
+        return the cached number of solutions of a problem, or None
+        """
+        count = self._get(
+            'counts',
+            problem_key(row_count, col_count, count_by_symbol),
+        )
+        if count is None:
+            return None
+        return int(count)
+
+    def put_count(self, row_count, col_count, count_by_symbol, count):
+        """
+        store the number of solutions of a problem
+        """
+        self._put(
+            'counts',
+            problem_key(row_count, col_count, count_by_symbol),
+            str(count),
+        )
+
+    def get_solutions_path(self, row_count, col_count, count_by_symbol):
+        """
+        return the path of a stored solution file of a problem, see
+        `solution_bin`, or None if there is none, or it does not exist
+        anymore
+        """
+        path = self._get(
+            'files',
+            exact_problem_key(row_count, col_count, count_by_symbol),
+        )
+        if path is None or not os.path.isfile(path):
+            return None
+        return path
+
+    def put_solutions_path(self, row_count, col_count, count_by_symbol, path):
+        """
+        store the path of a solution file of a problem
+        """
+        self._put(
+            'files',
+            exact_problem_key(row_count, col_count, count_by_symbol),
+            os.path.abspath(path),
+        )
+
+    def get_size(self):
+        """return the number of cached counts"""
+        return self.conn.execute('SELECT COUNT(*) FROM counts').fetchone()[0]
+
+    def clear(self):
+        """remove all entries"""
+        with self.conn:
+            self.conn.execute('DELETE FROM counts')
+            self.conn.execute('DELETE FROM files')
+
+
+def cached_count_func(count_func, cache):
+    """
+    return a function like `count_func` that looks up the count in `cache`
+    first, and stores it in `cache` after calculating it
+
+    count_func: a function that is called with
+        (row_count, col_count, count_by_symbol, *args)
+        and returns the number of solutions
+    cache: a SolutionCache object, or None to return `count_func` itself
+    """
+    if cache is None:
+        return count_func
+
+    def func(row_count, col_count, count_by_symbol, *args):
+        count = cache.get_count(row_count, col_count, count_by_symbol)
+        if count is None:
+            count = count_func(row_count, col_count, count_by_symbol, *args)
+            cache.put_count(row_count, col_count, count_by_symbol, count)
+        return count
+
+    return func
+
+
+def count_solutions_cached(row_count, col_count, count_by_symbol,
+                           cache=None, count_func=count_solutions):
+    """count solution boards, using the persistent cache
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    cache: a SolutionCache object, default is one with default path
+    count_func: function to count when it's not in cache
+
+    returns the number of solutions that `find_solutions_s` would give
+    """
+    if cache is None:
+        with SolutionCache() as cache:
+            return cached_count_func(count_func, cache)(
+                row_count,
+                col_count,
+                count_by_symbol,
+            )
+    return cached_count_func(count_func, cache)(
+        row_count,
+        col_count,
+        count_by_symbol,
+    )
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+counting solutions / configurations with checkpoints, so that a long
+running count can be stopped, and resumed later with the same result
+
+the search is done with an explicit stack (like `find_solutions_bb`), and
+the stack and running count are saved periodically into a JSON file
+
+each stack item also keeps its share of the whole search tree (its parent's
+share, divided between its children by their estimated subtree sizes), so
+the completed fraction of the search is known at any time, to show progress
+"""
+
+import os
+import json
+import signal
+import threading
+from time import time as now
+
+from pieces import ChessPiece
+from math_util import comb
+from solution import count_bb
+
+CHECKPOINT_VERSION = 2
+DEFAULT_INTERVAL = 60.0  # seconds between checkpoints
+CHECK_NODES = 1024  # number of nodes between checking the time
+
+# states with this many pieces left (or fewer) are counted directly
+# instead of putting their children on the stack
+DIRECT_STAGE_SIZE = 3
+
+
+class CheckpointCounter(object):
+    """
+    counts solutions / configurations using an explicit stack, and saves
+    the stack and running count into a checkpoint file periodically, and
+    when interrupted by Control+C
+    """
+    def __init__(self, row_count, col_count, count_by_symbol, path=None,
+                 interval=DEFAULT_INTERVAL, interval_nodes=None,
+                 progress=None):
+        """
+        row_count: int, number or rows
+        col_count: int, number of columns
+        count_by_symbol: dict of { piece_symbol => count }
+        path: path of checkpoint file, or None to disable checkpoints
+        interval: number of seconds between checkpoints, or None
+        interval_nodes: number of nodes between checkpoints, or None
+        progress: a `solution_progress.ProgressReporter`, or None
+        """
+        self.row_count = row_count
+        self.col_count = col_count
+        self.count_by_symbol = {
+            cls.symbol: count_by_symbol.get(cls.symbol, 0)
+            for cls in ChessPiece.class_list
+        }
+        self.path = path
+        self.interval = interval
+        self.interval_nodes = interval_nodes
+        self.progress = progress
+        self.count = 0  # number of solutions found so far
+        self.nodes = 0  # number of stack items processed so far
+        self.done = 0.0  # completed fraction of the search tree
+        # each item of `todo` stack is a tuple of
+        #   (stage, stage_size, cell_num, occupied, attacked, width)
+        # see `find_solutions_bb`, `width` is the fraction of search tree
+        # under this item
+        stage = tuple(
+            self.count_by_symbol[cls.symbol]
+            for cls in ChessPiece.class_list
+        )
+        stage_size = sum(stage)
+        if 0 < stage_size <= row_count * col_count:
+            self.todo = [(stage, stage_size, 0, 0, 0, 1.0)]
+        else:
+            self.todo = []
+            self.done = 1.0
+        self._interrupted = False
+
+    def is_done(self):
+        """return True if counting is complete"""
+        return not self.todo
+
+    def to_dict(self):
+        """return the checkpoint data as a dict that can be saved as JSON"""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'row_count': self.row_count,
+            'col_count': self.col_count,
+            'count_by_symbol': self.count_by_symbol,
+            'count': self.count,
+            'nodes': self.nodes,
+            'done': self.done,
+            'todo': [
+                list(item[0]) + list(item[1:])
+                for item in self.todo
+            ],
+        }
+
+    def save(self):
+        """
+        write the checkpoint file, replacing the old one at once, so that
+        we never leave a half-written checkpoint
+        """
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as fileobj:
+            json.dump(self.to_dict(), fileobj)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path, interval=DEFAULT_INTERVAL, interval_nodes=None,
+             progress=None):
+        """
+        create a CheckpointCounter from a checkpoint file, to continue
+        counting, new checkpoints are written into the same file
+        """
+        with open(path) as fileobj:
+            data = json.load(fileobj)
+        if data.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(
+                'unsupported checkpoint version %r' % data.get('version')
+            )
+        counter = cls(
+            data['row_count'],
+            data['col_count'],
+            data['count_by_symbol'],
+            path=path,
+            interval=interval,
+            interval_nodes=interval_nodes,
+            progress=progress,
+        )
+        class_count = len(ChessPiece.class_list)
+        counter.count = data['count']
+        counter.nodes = data['nodes']
+        counter.done = data['done']
+        counter.todo = [
+            (tuple(item[:class_count]),) + tuple(item[class_count:])
+            for item in data['todo']
+        ]
+        return counter
+
+    def _on_sigint(self, signum, frame):
+        self._interrupted = True
+
+    def run(self):
+        """
+        count until done and return the number of solutions
+        on Control+C, save the checkpoint and raise KeyboardInterrupt
+        """
+        if self.progress:
+            self.progress.start(self.done, self.nodes)
+        try:
+            if threading.current_thread() is not threading.main_thread():
+                return self._run()
+            old_handler = signal.signal(signal.SIGINT, self._on_sigint)
+            try:
+                return self._run()
+            finally:
+                signal.signal(signal.SIGINT, old_handler)
+        finally:
+            if self.progress:
+                self.progress.finish()
+
+    def _run(self):
+        attack_table = ChessPiece.attack_table(self.row_count, self.col_count)
+        cell_count = self.row_count * self.col_count
+        all_cells = (1 << cell_count) - 1
+        todo = self.todo
+        interval = self.interval
+        interval_nodes = self.interval_nodes
+        progress = self.progress
+        next_time = now() + interval if interval else None
+        next_nodes = self.nodes + interval_nodes if interval_nodes else None
+        check_nodes = self.nodes + CHECK_NODES
+
+        while todo:  # stack not empty
+            if self.nodes >= check_nodes:
+                check_nodes = self.nodes + CHECK_NODES
+                if progress:
+                    progress.update(self.done, self.count, self.nodes)
+                if self._interrupted:
+                    self._interrupted = False
+                    self.save()
+                    raise KeyboardInterrupt
+                if (next_time and now() >= next_time) or \
+                   (next_nodes and self.nodes >= next_nodes):
+                    self.save()
+                    if interval:
+                        next_time = now() + interval
+                    if interval_nodes:
+                        next_nodes = self.nodes + interval_nodes
+
+            stage, stage_size, cell_num, occupied, attacked, width = todo[-1]
+
+            if stage_size <= DIRECT_STAGE_SIZE:
+                count = count_bb(
+                    attack_table,
+                    cell_count,
+                    list(stage),
+                    stage_size,
+                    cell_num,
+                    occupied,
+                    attacked,
+                )
+                # update stack and count together
+                todo.pop()
+                self.count += count
+                self.done += width
+                self.nodes += 1
+                continue
+
+            free = ~(occupied | attacked) & \
+                ((1 << (cell_count - stage_size + 1)) - 1) & \
+                -(1 << cell_num)
+            tmp_todo = []
+            weights = []
+            while free:
+                cell_bit = free & -free  # lowest free cell
+                free ^= cell_bit
+                cell_num = cell_bit.bit_length() - 1
+                for piece_id, count in enumerate(stage):
+                    if count < 1:
+                        continue
+                    mask = attack_table[piece_id][cell_num]
+                    if mask & occupied:  # new piece attacks board
+                        continue
+                    new_stage = list(stage)
+                    new_stage[piece_id] -= 1
+                    # estimate the size of child's subtree by the number of
+                    # ways to choose cells for the rest of pieces among its
+                    # free cells
+                    weights.append(comb(
+                        bin(
+                            ~(occupied | attacked | mask) & all_cells &
+                            -(cell_bit << 1)
+                        ).count('1'),
+                        stage_size - 1,
+                    ) or 1)
+                    tmp_todo.append((
+                        tuple(new_stage),
+                        stage_size - 1,
+                        cell_num + 1,
+                        occupied | cell_bit,
+                        attacked | mask,
+                    ))
+            if tmp_todo:
+                width /= sum(weights)
+                tmp_todo = [
+                    item + (width * weight,)
+                    for item, weight in zip(
+                        reversed(tmp_todo),
+                        reversed(weights),
+                    )
+                ]
+            else:
+                self.done += width
+            todo[-1:] = tmp_todo
+            self.nodes += 1
+
+        self.save()
+        return self.count
+
+
+def count_solutions_checkpoint(row_count, col_count, count_by_symbol, path,
+                               interval=DEFAULT_INTERVAL,
+                               interval_nodes=None):
+    """count solution boards, saving checkpoints into given file
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    path: path of checkpoint file
+    interval: number of seconds between checkpoints, or None
+    interval_nodes: number of nodes between checkpoints, or None
+
+    returns the number of solutions that `find_solutions_s` would give
+    """
+    return CheckpointCounter(
+        row_count,
+        col_count,
+        count_by_symbol,
+        path=path,
+        interval=interval,
+        interval_nodes=interval_nodes,
+    ).run()
+
+
+def resume_count(path, interval=DEFAULT_INTERVAL, interval_nodes=None):
+    """
+    continue counting from given checkpoint file
+
+    returns the number of solutions
+    """
+    return CheckpointCounter.load(
+        path,
+        interval=interval,
+        interval_nodes=interval_nodes,
+    ).run()
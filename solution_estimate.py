@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+estimating the size of search tree (and number of solutions) of a problem
+without searching it, using Knuth's estimator
+
+each probe goes down the search tree of `find_solutions_s` from the root,
+choosing a child uniformly at random, until it gets to a solution or a dead
+end, the product of numbers of children along the path is an unbiased
+estimate of the number of nodes at each depth (and of solutions, at the
+last depth), so the mean of many probes converges to the real numbers
+
+probes that get to a solution are rare on problems with few solutions, and
+their values differ a lot, so the normal confidence interval of solutions
+is only given when at least `MIN_HITS` probes got to a solution, otherwise
+the estimate is marked as not reliable and only its lower bound is given
+
+small problems are searched completely while measuring speed, so their
+numbers are exact
+
+the running time is estimated from the number of nodes, and the speed of
+`count_bb` (which `count_solutions` runs) in nodes per second, measured on
+small subtrees of the same problem
+
+problems that `count_solutions` counts without searching (only one piece
+type, or only short-range pieces) are just counted (in another process, so
+it can be stopped when it takes too long), which gives exact numbers
+"""
+
+import math
+import random
+import multiprocessing
+from time import perf_counter
+
+from pieces import ChessPiece
+from math_util import normal_inv_cdf
+from solution import iter_children_bb, count_bb, count_solutions
+from solution_progress import format_duration
+from solution_single import get_single_symbol
+from solution_transfer import use_transfer
+
+DEFAULT_TIME_BUDGET = 5.0  # seconds
+DEFAULT_CONFIDENCE = 0.95
+CALIBRATION_FRACTION = 0.2  # fraction of time budget to measure speed
+FAST_PATH_FRACTION = 0.5  # fraction of time budget to count by fast path
+CALIBRATION_LEVEL = 2  # pieces left in subtrees that are timed
+CHECK_PROBES = 64  # number of probes between checking time
+# probes that get to a solution, for a reliable estimate of solutions
+MIN_HITS = 30
+
+
+def probe(attack_table, cell_count, stage, rand):
+    """
+    go down the search tree along a random path, and return a tuple of
+        (nodes, solutions)
+    which are the estimates of this path
+
+    stage: list containing count of each piece type, it's modified while
+        probing, but restored before return
+    rand: a `random.Random` object
+    """
+    stage_size = sum(stage)
+    placed = []  # list of piece_id, to restore `stage`
+    weight = 1
+    nodes = 0
+    cell_num = 0
+    occupied = 0
+    attacked = 0
+    while stage_size > 0:
+        free = ~(occupied | attacked) & \
+            ((1 << (cell_count - stage_size + 1)) - 1) & \
+            -(1 << cell_num)
+        children = []
+        while free:
+            cell_bit = free & -free
+            free ^= cell_bit
+            child_cell = cell_bit.bit_length() - 1
+            for piece_id, count in enumerate(stage):
+                if count > 0 and \
+                   not attack_table[piece_id][child_cell] & occupied:
+                    children.append((child_cell, piece_id))
+        if not children:
+            break
+        weight *= len(children)
+        nodes += weight
+        cell_num, piece_id = rand.choice(children)
+        occupied |= 1 << cell_num
+        attacked |= attack_table[piece_id][cell_num]
+        cell_num += 1
+        stage[piece_id] -= 1
+        stage_size -= 1
+        placed.append(piece_id)
+    for piece_id in placed:
+        stage[piece_id] += 1
+    return nodes, (weight if stage_size == 0 else 0)
+
+
+def _count_subtree_nodes(attack_table, cell_count, state):
+    """
+    return the number of nodes under `state` (not including itself)
+    """
+    nodes = 0
+    todo = [state]
+    while todo:
+        state = todo.pop()
+        if state[2] == 1:  # children are solutions, just count them
+            nodes += count_bb(
+                attack_table,
+                cell_count,
+                list(state[1]),
+                1,
+                *state[3:]
+            )
+            continue
+        for child in iter_children_bb(attack_table, cell_count, state):
+            nodes += 1
+            todo.append(child)
+    return nodes
+
+
+def measure_speed(row_count, col_count, count_by_symbol, seconds):
+    """
+    search the tree depth-first for about `seconds` (or until it's
+    finished), subtrees with `CALIBRATION_LEVEL` pieces left are counted by
+    `count_bb` which is timed, and their nodes are counted separately
+
+    returns a tuple of (nodes_per_sec, nodes, solutions, finished)
+    where `nodes_per_sec` is the speed of `count_bb`, and `nodes` and
+    `solutions` are the numbers that are searched, which are exact if
+    `finished` is True
+    """
+    cell_count = row_count * col_count
+    attack_table = ChessPiece.attack_table(row_count, col_count)
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    level = min(CALIBRATION_LEVEL, sum(stage))
+    todo = [(None, stage, sum(stage), 0, 0, 0)]
+    nodes = 0
+    solutions = 0
+    timed_nodes = 0
+    timed_seconds = 0.0
+    end_time = perf_counter() + seconds
+    while todo:
+        state = todo.pop()
+        if state[2] > level:
+            children = list(iter_children_bb(attack_table, cell_count, state))
+            nodes += len(children)
+            todo += reversed(children)
+            continue
+        subtree_nodes = _count_subtree_nodes(attack_table, cell_count, state)
+        start_time = perf_counter()
+        solutions += count_bb(
+            attack_table,
+            cell_count,
+            list(state[1]),
+            state[2],
+            *state[3:]
+        )
+        timed_seconds += perf_counter() - start_time
+        nodes += subtree_nodes
+        timed_nodes += subtree_nodes + 1  # and the state itself
+        if perf_counter() > end_time:
+            break
+    if timed_seconds > 0:
+        nodes_per_sec = timed_nodes / timed_seconds
+    else:
+        nodes_per_sec = 0.0
+    return nodes_per_sec, nodes, solutions, not todo
+
+
+def get_fast_path(row_count, col_count, count_by_symbol):
+    """
+    return the name of the way `count_solutions` counts a problem without
+    searching, or None if it searches
+    """
+    if get_single_symbol(count_by_symbol) is not None:
+        return 'single piece type'
+    if use_transfer(row_count, col_count, count_by_symbol):
+        return 'transfer matrix'
+    return None
+
+
+def _timed_count(args):
+    start_time = perf_counter()
+    count = count_solutions(*args)
+    return count, perf_counter() - start_time
+
+
+def count_fast(row_count, col_count, count_by_symbol, seconds):
+    """
+    count solutions with `count_solutions` in another process, and return
+    a tuple of (count, seconds), or None if it's not finished in `seconds`
+    """
+    pool = multiprocessing.Pool(1)
+    try:
+        result = pool.apply_async(
+            _timed_count,
+            ((row_count, col_count, count_by_symbol),),
+        )
+        try:
+            return result.get(seconds)
+        except multiprocessing.TimeoutError:
+            return None
+    finally:
+        pool.terminate()
+
+
+class TreeEstimate(object):
+    """
+    result of `estimate_tree`
+
+    nodes, solutions, runtime: estimated values
+    nodes_interval, solutions_interval, runtime_interval: tuples of
+        (low, high) of confidence intervals
+    exact: True if the whole tree was searched (or counted by fast path),
+        so numbers are exact
+    hits: number of probes that got to a solution, if it's 0, solutions
+        are not really estimated
+    reliable: False if `hits` is less than `MIN_HITS` (and not `exact`),
+        then the upper bound of `solutions_interval` is infinite
+    fast_path: name of the fast path that counts the problem without
+        searching (see `get_fast_path`), or None, if `exact` is True it was
+        used, so `nodes` are None, otherwise it did not finish in time
+    """
+    def __init__(self, probes, node_values, solution_values, nodes_per_sec,
+                 confidence, exact=False, fast_path=None, runtime=None):
+        self.probes = probes
+        self.confidence = confidence
+        self.nodes_per_sec = nodes_per_sec
+        self.exact = exact
+        self.fast_path = fast_path
+        self.hits = sum(1 for value in solution_values if value)
+        z = normal_inv_cdf(0.5 + confidence / 2)
+        self.nodes, self.nodes_interval = _mean_interval(node_values, z)
+        self.solutions, self.solutions_interval = _mean_interval(
+            solution_values,
+            z,
+        )
+        self.reliable = exact or self.hits >= MIN_HITS
+        if exact:
+            self.nodes_interval = (self.nodes, self.nodes)
+            self.solutions_interval = (self.solutions, self.solutions)
+        elif not self.reliable:
+            # with a few hits the variance is underestimated a lot, so the
+            # normal interval is only used as a lower bound
+            self.solutions_interval = (
+                self.solutions_interval[0],
+                float('inf'),
+            )
+        if exact and fast_path:
+            self.nodes = None
+            self.nodes_interval = None
+        if runtime is not None:
+            self.runtime = runtime
+            self.runtime_interval = (runtime, runtime)
+        elif nodes_per_sec > 0:
+            self.runtime = self.nodes / nodes_per_sec
+            self.runtime_interval = tuple(
+                nodes / nodes_per_sec
+                for nodes in self.nodes_interval
+            )
+        else:
+            self.runtime = None
+            self.runtime_interval = None
+
+    def to_dict(self):
+        """return the estimate as a dict that can be saved as JSON"""
+        return {
+            'probes': self.probes,
+            'exact': self.exact,
+            'fast_path': self.fast_path,
+            'hits': self.hits,
+            'reliable': self.reliable,
+            'confidence': self.confidence,
+            'nodes': self.nodes,
+            'nodes_interval': self.nodes_interval and
+            list(self.nodes_interval),
+            'solutions': self.solutions,
+            'solutions_interval': list(self.solutions_interval),
+            'nodes_per_sec': self.nodes_per_sec,
+            'runtime': self.runtime,
+            'runtime_interval': self.runtime_interval and
+            list(self.runtime_interval),
+        }
+
+    def format_table(self):
+        """return the estimate as a string that can be shown in console"""
+        if self.exact and self.fast_path:
+            lines = [
+                'Counted by %s fast path, without searching' % self.fast_path,
+                'Solutions: %d' % self.solutions,
+                'Running time: %.4f seconds' % self.runtime,
+            ]
+            return '\n'.join(lines)
+        if self.exact:
+            lines = [
+                'Searched the whole tree',
+                'Nodes: %d' % self.nodes,
+                'Solutions: %d' % self.solutions,
+            ]
+            if self.runtime is not None:
+                lines.append('Running time: %.4f seconds' % self.runtime)
+            return '\n'.join(lines)
+        percent = '%g%%' % (self.confidence * 100)
+        lines = []
+        if self.fast_path:
+            lines.append(
+                'Counting uses %s fast path, which did not finish in time, '
+                'numbers below are for searching' % self.fast_path
+            )
+        lines += [
+            'Probes: %s' % self.probes,
+            'Estimated nodes: %.4g (%s interval: %.4g - %.4g)' % (
+                (self.nodes, percent) + self.nodes_interval
+            ),
+        ]
+        if self.reliable:
+            lines.append(
+                'Estimated solutions: %.4g (%s interval: %.4g - %.4g)' % (
+                    (self.solutions, percent) + self.solutions_interval
+                )
+            )
+        elif self.hits:
+            lines.append(
+                'Estimated solutions: %.4g (not reliable, only %d probes got '
+                'to a solution, %s interval: %.4g - ?)' % (
+                    self.solutions,
+                    self.hits,
+                    percent,
+                    self.solutions_interval[0],
+                )
+            )
+        else:
+            lines.append(
+                'Estimated solutions: unknown, no probe got to a solution'
+            )
+        if self.runtime is not None:
+            lines.append(
+                'Estimated running time: %s (%s interval: %s - %s)' % (
+                    _format_time(self.runtime),
+                    percent,
+                    _format_time(self.runtime_interval[0]),
+                    _format_time(self.runtime_interval[1]),
+                )
+            )
+        return '\n'.join(lines)
+
+
+def _format_time(seconds):
+    if math.isinf(seconds):
+        return '?'
+    return format_duration(seconds)
+
+
+def _mean_interval(values, z):
+    """
+    return (mean, (low, high)) of a list of values, with a normal
+    confidence interval, `low` is not less than zero
+    """
+    count = len(values)
+    if count == 0:
+        return 0.0, (0.0, 0.0)
+    mean = sum(values) / count
+    if count == 1:
+        return mean, (0.0, float('inf'))
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    half = z * math.sqrt(variance / count)
+    return mean, (max(0.0, mean - half), mean + half)
+
+
+def estimate_tree(row_count, col_count, count_by_symbol,
+                  time_budget=DEFAULT_TIME_BUDGET, max_probes=None, seed=None,
+                  confidence=DEFAULT_CONFIDENCE):
+    """estimate number of nodes, number of solutions and running time
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    time_budget: number of seconds to spend on probing (and measuring
+        speed), unless `max_probes` probes are done sooner
+    max_probes: maximum number of probes, or None
+    seed: seed of random number generator, or None
+    confidence: confidence level of intervals, like 0.95
+
+    returns a `TreeEstimate` object
+    """
+    start_time = perf_counter()
+    cell_count = row_count * col_count
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    if not 0 < sum(stage) <= cell_count:
+        return TreeEstimate(0, [0], [0], 0.0, confidence)
+    fast_path = get_fast_path(row_count, col_count, count_by_symbol)
+    if fast_path:
+        result = count_fast(
+            row_count,
+            col_count,
+            count_by_symbol,
+            time_budget * FAST_PATH_FRACTION,
+        )
+        if result is not None:
+            count, runtime = result
+            return TreeEstimate(
+                0,
+                [0],
+                [count],
+                0.0,
+                confidence,
+                exact=True,
+                fast_path=fast_path,
+                runtime=runtime,
+            )
+    nodes_per_sec, nodes, solutions, finished = measure_speed(
+        row_count,
+        col_count,
+        count_by_symbol,
+        time_budget * CALIBRATION_FRACTION,
+    )
+    if finished:  # small problem, we know the exact numbers
+        return TreeEstimate(
+            0,
+            [nodes],
+            [solutions],
+            nodes_per_sec,
+            confidence,
+            exact=True,
+        )
+    attack_table = ChessPiece.attack_table(row_count, col_count)
+    rand = random.Random(seed)
+    node_values = []
+    solution_values = []
+    end_time = start_time + time_budget
+    while max_probes is None or len(node_values) < max_probes:
+        nodes, solutions = probe(attack_table, cell_count, stage, rand)
+        node_values.append(nodes)
+        solution_values.append(solutions)
+        if len(node_values) % CHECK_PROBES == 0 and \
+           perf_counter() > end_time:
+            break
+    return TreeEstimate(
+        len(node_values),
+        node_values,
+        solution_values,
+        nodes_per_sec,
+        confidence,
+        fast_path=fast_path,
+    )
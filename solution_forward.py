@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+forward checking: cut a branch of search as soon as the cells that are still
+safe (not occupied, not under attack) after the current cell are not enough
+for the rest of pieces
+
+this is stronger than the bound that engines always check (the number of
+cells left after the current cell), but costs more for each node, so it's
+optional, see `find_solutions_s` and `find_solutions_r`
+"""
+
+from pieces import ChessPiece
+
+# piece types that attack their whole row and column, so each one of them
+# needs a different row and a different column
+LINE_SYMBOLS = ('Q', 'R')
+
+
+def make_forward_checker(row_count, col_count):
+    """
+    return a function for given board size, that is called like:
+        check(occupied, attacked, cell_num, stage, stage_size)
+    and returns False if the rest of pieces (given by `stage` and
+    `stage_size`) can not be put on safe cells starting from `cell_num`
+
+    the per-type bound: remaining queens and rooks need different rows and
+    different columns, so there must be enough rows and enough columns that
+    have a safe cell
+    """
+    cell_count = row_count * col_count
+    full = (1 << cell_count) - 1
+    row_masks = [
+        ((1 << col_count) - 1) << (row_num * col_count)
+        for row_num in range(row_count)
+    ]
+    col_masks = [
+        sum(
+            1 << (row_num * col_count + col_num)
+            for row_num in range(row_count)
+        )
+        for col_num in range(col_count)
+    ]
+    line_ids = [
+        ChessPiece.class_by_symbol[symbol].cid
+        for symbol in LINE_SYMBOLS
+    ]
+
+    def check(occupied, attacked, cell_num, stage, stage_size):
+        safe = ~(occupied | attacked) & full & -(1 << cell_num)
+        if bin(safe).count('1') < stage_size:
+            return False
+        line_count = sum(stage[piece_id] for piece_id in line_ids)
+        if line_count > 1:
+            if sum(1 for mask in row_masks if safe & mask) < line_count:
+                return False
+            if sum(1 for mask in col_masks if safe & mask) < line_count:
+                return False
+        return True
+
+    return check
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+level-synchronous (breadth-first) search with a bounded-memory frontier
+
+all states with the same number of pieces on board form a level, each state
+is stored as a fixed-size record of its placements:
+    (cell_num (uint16), piece_id (uint8)) for each piece, sorted by cell_num
+(like records of `solution_bin`), everything else about a state can be
+calculated from them
+
+a level is kept in memory up to a limit, and the rest of it is spilled into a
+temporary file, which is streamed back in order when expanding the level
+"""
+
+import struct
+import tempfile
+
+from pieces import ChessPiece
+
+DEFAULT_MEMORY_LIMIT = 64 << 20  # bytes, for each level
+MAX_CELL_COUNT = 0x10000  # cell numbers must fit uint16 of records
+READ_SIZE = 1 << 20  # bytes to read from a spilled level each time
+
+_placement_struct = struct.Struct('<HB')
+
+
+class Frontier(object):
+    """
+    a sequence of fixed-size records, that are kept in memory up to
+    `memory_limit` bytes, and then spilled into a temporary file
+
+    records are given back in the same order that they were appended
+    """
+    def __init__(self, record_size, memory_limit=DEFAULT_MEMORY_LIMIT):
+        """
+        record_size: size of each record in bytes, at least 1
+        memory_limit: maximum number of bytes to keep in memory
+        """
+        self.record_size = record_size
+        self.memory_limit = memory_limit
+        self.buffer = bytearray()
+        self.file = None  # temporary file, if spilled
+        self.spilled_size = 0  # number of bytes in temporary file
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, record):
+        """add a record (bytes) to the end"""
+        self.buffer += record
+        self.length += 1
+        if len(self.buffer) >= self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """write records in memory into the temporary file"""
+        if not self.buffer:
+            return
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        self.file.write(self.buffer)
+        self.spilled_size += len(self.buffer)
+        self.buffer = bytearray()
+
+    def is_spilled(self):
+        """return True if some records are in the temporary file"""
+        return self.file is not None
+
+    def __iter__(self):
+        """iterate over records, as bytes objects"""
+        record_size = self.record_size
+        if self.file is not None:
+            self.file.flush()
+            self.file.seek(0)
+            read_size = max(1, READ_SIZE // record_size) * record_size
+            left = self.spilled_size
+            while left > 0:
+                data = self.file.read(min(read_size, left))
+                if not data:
+                    break
+                left -= len(data)
+                for pos in range(0, len(data), record_size):
+                    yield data[pos:pos + record_size]
+        data = bytes(self.buffer)
+        for pos in range(0, len(data), record_size):
+            yield data[pos:pos + record_size]
+
+    def close(self):
+        """free memory and remove the temporary file"""
+        self.buffer = bytearray()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def _decode_record(record, attack_table, stage):
+    """
+    decode a state record, returns a tuple of
+        (placed, stage, stage_size, cell_num, occupied, attacked)
+    which is a state of `find_solutions_bb`
+
+    stage: list containing count of each piece type in the whole problem
+    """
+    stage = list(stage)
+    placed = None
+    cell_num = -1
+    occupied = 0
+    attacked = 0
+    for cell_num, piece_id in _placement_struct.iter_unpack(record):
+        placed = (cell_num, piece_id, placed)
+        stage[piece_id] -= 1
+        occupied |= 1 << cell_num
+        attacked |= attack_table[piece_id][cell_num]
+    return (
+        placed,
+        stage,
+        sum(stage),
+        cell_num + 1,
+        occupied,
+        attacked,
+    )
+
+
+def record_to_board(record, col_count):
+    """
+    convert a state record into a `board` dict
+        { (row_num, col_num) => piece_symbol }
+    """
+    return {
+        divmod(cell_num, col_count): ChessPiece.class_list[piece_id].symbol
+        for cell_num, piece_id in _placement_struct.iter_unpack(record)
+    }
+
+
+def iter_level_records(row_count, col_count, count_by_symbol, depth,
+                       memory_limit=DEFAULT_MEMORY_LIMIT):
+    """
+    iterate over records of all states with `depth` pieces on board,
+    in the same order as `find_solutions_bb` visits them
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    depth: number of pieces on board, from 0 to the number of pieces,
+        records of the last level are solutions
+    memory_limit: maximum number of bytes to keep in memory for each level
+
+    this is a generator, yields a record (bytes) each time, see module
+    docstring for the format
+    raises ValueError if the board has more than `MAX_CELL_COUNT` cells
+    """
+    cell_count = row_count * col_count
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    piece_total = sum(stage)
+    if not 0 < piece_total <= cell_count or not 0 <= depth <= piece_total:
+        return
+    if cell_count > MAX_CELL_COUNT:
+        raise ValueError('board is too large for frontier records')
+    attack_table = ChessPiece.attack_table(row_count, col_count)
+    records = [b'']  # level 0: the empty board
+    frontier = None
+    try:
+        for level in range(depth):
+            if level + 1 < depth:
+                next_frontier = Frontier(
+                    (level + 1) * _placement_struct.size,
+                    memory_limit,
+                )
+                add = next_frontier.append
+            else:
+                next_frontier = None
+            stage_size = piece_total - level
+            for record in records:
+                _, state_stage, _, cell_num, occupied, attacked = \
+                    _decode_record(record, attack_table, stage)
+                free = ~(occupied | attacked) & \
+                    ((1 << (cell_count - stage_size + 1)) - 1) & \
+                    -(1 << cell_num)
+                while free:
+                    cell_bit = free & -free  # lowest free cell
+                    free ^= cell_bit
+                    cell_num = cell_bit.bit_length() - 1
+                    for piece_id, count in enumerate(state_stage):
+                        if count < 1:
+                            continue
+                        if attack_table[piece_id][cell_num] & occupied:
+                            continue  # new piece attacks board
+                        child = record + _placement_struct.pack(
+                            cell_num,
+                            piece_id,
+                        )
+                        if next_frontier is None:  # last level, stream it
+                            yield child
+                        else:
+                            add(child)
+            if frontier is not None:
+                frontier.close()
+            frontier = records = next_frontier
+        if depth == 0:
+            yield b''
+    finally:
+        if frontier is not None:
+            frontier.close()
+
+
+def iter_frontier(row_count, col_count, count_by_symbol, depth,
+                  memory_limit=DEFAULT_MEMORY_LIMIT):
+    """
+    iterate over all states with `depth` pieces on board, in the same order
+    as `find_solutions_bb` visits them, these are independent work units
+    that together cover the whole search tree
+
+    see `iter_level_records` for arguments
+
+    this is a generator, yields a tuple of
+        (placed, stage, stage_size, cell_num, occupied, attacked)
+    which is a state of `find_solutions_bb` (an item of its `todo` stack)
+    """
+    attack_table = ChessPiece.attack_table(row_count, col_count)
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    for record in iter_level_records(
+        row_count,
+        col_count,
+        count_by_symbol,
+        depth,
+        memory_limit,
+    ):
+        yield _decode_record(record, attack_table, stage)
+
+
+def iter_solution_records(row_count, col_count, count_by_symbol,
+                          memory_limit=DEFAULT_MEMORY_LIMIT):
+    """
+    iterate over records of all solutions, see `iter_level_records`
+    """
+    piece_total = sum(
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    )
+    return iter_level_records(
+        row_count,
+        col_count,
+        count_by_symbol,
+        piece_total,
+        memory_limit,
+    )
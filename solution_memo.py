@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+memoized counting of solutions / configurations (transposition table)
+
+the number of ways to put the rest of pieces only depends on the remaining
+pieces, the next cell, and which of the next cells each remaining piece type
+can not be put on (because it's under attack, or the piece would attack some
+piece on board), so many different boards share the same subtree count
+"""
+
+from collections import OrderedDict
+
+from pieces import ChessPiece
+
+DEFAULT_MAX_SIZE = 1000000  # maximum number of memo table entries
+
+
+class MemoCounter(object):
+    """
+    counts solutions / configurations of a board size, keeping subtree counts
+    in a memo table with a bounded size, and evicting the least recently
+    used entries
+    """
+    def __init__(self, row_count, col_count, max_size=DEFAULT_MAX_SIZE):
+        """
+        row_count: int, number or rows
+        col_count: int, number of columns
+        max_size: maximum number of entries in memo table
+        """
+        self.row_count = row_count
+        self.col_count = col_count
+        self.cell_count = row_count * col_count
+        self.attack_table = ChessPiece.attack_table(row_count, col_count)
+        self.max_size = max_size
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_stats(self):
+        """
+        return a dict of memo table statistics
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.table),
+            'max_size': self.max_size,
+        }
+
+    def clear(self):
+        """clear the memo table and statistics"""
+        self.table.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def count(self, count_by_symbol):
+        """
+        return the number of solutions that `find_solutions_s` would give
+
+        count_by_symbol: dict of { piece_symbol => count }
+        """
+        stage = [
+            count_by_symbol.get(cls.symbol, 0)
+            for cls in ChessPiece.class_list
+        ]
+        if sum(stage) < 1:  # no solution, like other implementations
+            return 0
+        return self.count_state(stage, 0, 0, 0)
+
+    def count_state(self, stage, cell_num, occupied, attacked):
+        """
+        return the number of ways to complete a board, given the state of
+        `find_solutions_bb`
+
+        stage: list or tuple containing count of each remaining piece type
+        cell_num: the first cell that we can put the next piece on
+        occupied: int bit mask of cells that have a piece
+        attacked: int bit mask of cells that are under attack
+        """
+        stage_size = sum(stage)
+        if stage_size < 1:
+            return 1
+        if stage_size > self.cell_count - cell_num:
+            return 0
+        blocked = []
+        for masks in self.attack_table:
+            piece_blocked = attacked | occupied
+            occupied_left = occupied
+            while occupied_left:
+                cell_bit = occupied_left & -occupied_left
+                occupied_left ^= cell_bit
+                piece_blocked |= masks[cell_bit.bit_length() - 1]
+            blocked.append(piece_blocked)
+        return self._count_low(
+            tuple(stage),
+            stage_size,
+            cell_num,
+            tuple(blocked),
+        )
+
+    def _count_low(self, stage, stage_size, cell_num, blocked):
+        """
+        stage: tuple containing count of each remaining piece type
+        stage_size: sum(stage), must be at least 1
+        cell_num: the first cell that we can put the next piece on
+        blocked: tuple of int bit masks, one for each piece type, of cells
+            that the piece type can not be put on, because the cell is under
+            attack or the piece would attack some piece on board
+
+        all pieces attack symmetrically, so a piece on cell `n` attacks a
+        piece of type `t` on cell `m` if and only if a piece of type `t` on
+        cell `m` attacks cell `n`
+        """
+        # cells that we can put the next piece on
+        cells = ((1 << (self.cell_count - stage_size + 1)) - 1) & \
+            -(1 << cell_num)
+
+        if stage_size == 1:
+            return bin(cells & ~blocked[stage.index(1)]).count('1')
+
+        key = (stage, cell_num) + tuple(
+            piece_blocked >> cell_num if count else 0
+            for piece_blocked, count in zip(blocked, stage)
+        )
+        table = self.table
+        try:
+            result = table[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            table.move_to_end(key)
+            return result
+
+        attack_table = self.attack_table
+        active = [
+            (piece_id, attack_table[piece_id], blocked[piece_id])
+            for piece_id, count in enumerate(stage)
+            if count > 0
+        ]
+        free = 0
+        for _, _, piece_blocked in active:
+            free |= ~piece_blocked
+        free &= cells
+
+        result = 0
+        while free:
+            cell_bit = free & -free  # lowest free cell
+            free ^= cell_bit
+            cell_num = cell_bit.bit_length() - 1
+            for piece_id, masks, piece_blocked in active:
+                if piece_blocked & cell_bit:
+                    continue
+                mask = masks[cell_num]
+                new_stage = list(stage)
+                new_stage[piece_id] -= 1
+                result += self._count_low(
+                    tuple(new_stage),
+                    stage_size - 1,
+                    cell_num + 1,
+                    tuple(
+                        other_blocked | mask | other_masks[cell_num]
+                        for other_blocked, other_masks in zip(
+                            blocked,
+                            attack_table,
+                        )
+                    ),
+                )
+
+        table[key] = result
+        if len(table) > self.max_size:
+            table.popitem(last=False)
+            self.evictions += 1
+        return result
+
+
+def count_solutions_memo(row_count, col_count, count_by_symbol,
+                         max_size=DEFAULT_MAX_SIZE):
+    """count solution boards, using a memo table of subtree counts
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    max_size: maximum number of entries in memo table
+
+    returns the number of solutions that `find_solutions_s` would give
+    """
+    return MemoCounter(row_count, col_count, max_size).count(count_by_symbol)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+NumPy-vectorized search, expanding a batch of states at once
+
+states with the same number of pieces on board are kept in NumPy arrays
+(occupied and attacked cells as uint64 bit masks), and all candidate
+placements (cell, piece type) of a whole batch are checked at once against
+the attack table, batches are searched depth-first, so memory is bounded by
+the batch size
+
+NumPy is optional, without it (or for boards with more than 64 cells) we
+fall back to `find_solutions_bb`
+"""
+
+from pieces import ChessPiece
+from solution import find_solutions_bb
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_BATCH_SIZE = 1024  # maximum number of states in a batch
+MAX_CELL_COUNT = 64  # bit masks are uint64
+
+
+def is_available(row_count=None, col_count=None):
+    """
+    return True if NumPy is installed, and the board (if given) is small
+    enough for this implementation
+    """
+    if np is None:
+        return False
+    if row_count is not None and row_count * col_count > MAX_CELL_COUNT:
+        return False
+    return True
+
+
+class _Tables(object):
+    """
+    attack table of a board size, as NumPy arrays indexed by `move`, which
+    is the index of (cell_num, piece_id) in the list of all placements of
+    the piece types in the problem, ordered by cell_num and then piece_id,
+    which is the order of trying placements in `find_solutions_bb`
+    """
+    def __init__(self, row_count, col_count, stage):
+        """
+        stage: list containing count of each piece type in the problem
+        """
+        cell_count = row_count * col_count
+        attack_table = ChessPiece.attack_table(row_count, col_count)
+        move_list = [
+            (cell_num, piece_id)
+            for cell_num in range(cell_count)
+            for piece_id, count in enumerate(stage)
+            if count > 0
+        ]
+        self.cell_count = cell_count
+        self.move_cell = np.array(
+            [cell_num for cell_num, _ in move_list],
+            dtype=np.int64,
+        )
+        self.move_piece = np.array(
+            [piece_id for _, piece_id in move_list],
+            dtype=np.int64,
+        )
+        self.move_bit = np.left_shift(
+            np.uint64(1),
+            self.move_cell.astype(np.uint64),
+        )
+        self.move_attack = np.array(
+            [
+                attack_table[piece_id][cell_num]
+                for cell_num, piece_id in move_list
+            ],
+            dtype=np.uint64,
+        )
+        self.move_symbol = [
+            ChessPiece.class_list[piece_id].symbol
+            for _, piece_id in move_list
+        ]
+
+
+def _expand_batch(tables, batch, stage_size):
+    """
+    return child states of all states of `batch` (in order), as a tuple of
+    arrays like `batch`
+
+    batch: tuple of (occupied, attacked, next_cell, stage, moves)
+        occupied, attacked: uint64 arrays of bit masks
+        next_cell: int array, the first cell that we can put a piece on
+        stage: 2D int array, count of each remaining piece type
+        moves: 2D int array, moves that made the state, see `_Tables`
+    stage_size: number of pieces left to put, same for all states
+    """
+    occupied, attacked, next_cell, stage, moves = batch
+    move_cell = tables.move_cell
+    valid = (
+        ((occupied | attacked)[:, None] & tables.move_bit[None, :]) == 0
+    )
+    valid &= (occupied[:, None] & tables.move_attack[None, :]) == 0
+    valid &= move_cell[None, :] >= next_cell[:, None]
+    # leave enough cells after it for the rest of pieces
+    valid &= (move_cell <= tables.cell_count - stage_size)[None, :]
+    valid &= stage[:, tables.move_piece] > 0
+    # np.nonzero gives indexes in row-major order: by parent, then by move
+    parents, child_moves = np.nonzero(valid)
+    child_stage = stage[parents]
+    child_stage[
+        np.arange(len(parents)),
+        tables.move_piece[child_moves],
+    ] -= 1
+    return (
+        occupied[parents] | tables.move_bit[child_moves],
+        attacked[parents] | tables.move_attack[child_moves],
+        move_cell[child_moves] + 1,
+        child_stage,
+        np.concatenate(
+            (moves[parents], child_moves[:, None]),
+            axis=1,
+        ),
+    )
+
+
+def _split_batch(batch, batch_size):
+    """split a batch into a list of batches of at most `batch_size` states"""
+    count = len(batch[0])
+    return [
+        tuple(array[start:start + batch_size] for array in batch)
+        for start in range(0, count, batch_size)
+    ]
+
+
+def find_solutions_np(row_count, col_count, count_by_symbol,
+                      batch_size=DEFAULT_BATCH_SIZE):
+    """find and iterate over solution boards, expanding batches of states
+    with NumPy, falls back to `find_solutions_bb` without NumPy
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    batch_size: maximum number of states to expand at once, memory usage
+        is proportional to it
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be a positive number')
+    if not is_available(row_count, col_count):
+        yield from find_solutions_bb(row_count, col_count, count_by_symbol)
+        return
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    piece_total = sum(stage)
+    if not 0 < piece_total <= row_count * col_count:
+        return
+    tables = _Tables(row_count, col_count, stage)
+    move_pos = [
+        divmod(cell_num, col_count)
+        for cell_num in tables.move_cell.tolist()
+    ]
+    move_symbol = tables.move_symbol
+    root = (
+        np.zeros(1, dtype=np.uint64),  # occupied cells
+        np.zeros(1, dtype=np.uint64),  # attacked cells
+        np.zeros(1, dtype=np.int64),   # first cell (top-left corner)
+        np.array([stage], dtype=np.int64),
+        np.zeros((1, 0), dtype=np.int64),  # no moves yet
+    )
+    # `todo` is a stack of batches, all states of a batch have the same
+    # number of pieces on board (which is the number of columns of moves)
+    todo = [root]
+    while todo:  # stack not empty
+        batch = todo.pop()
+        stage_size = piece_total - batch[4].shape[1]
+        children = _expand_batch(tables, batch, stage_size)
+        if stage_size <= 1:  # children are complete boards
+            for moves in children[4].tolist():
+                yield {
+                    move_pos[move]: move_symbol[move]
+                    for move in moves
+                }
+            continue
+        todo += reversed(_split_batch(children, batch_size))
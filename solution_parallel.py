@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+multi-process parallel solving
+
+the search tree of `find_solutions_bb` is split into independent subproblems
+by the placements of the first few pieces, which are solved by a pool of
+worker processes, in the same order as the serial implementation
+"""
+
+import os
+import multiprocessing
+from array import array
+from collections import deque
+
+from pieces import ChessPiece
+from solution_frontier import iter_frontier
+from solution import iter_placed_bb, count_bb
+
+SUBPROBLEMS_PER_JOB = 32  # for load balancing
+PENDING_PER_JOB = 2  # subproblems that are solved ahead of the consumer
+
+
+def make_subproblems(row_count, col_count, count_by_symbol, min_count=1):
+    """
+    split the problem into a list of independent subproblems
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    min_count: minimum number of subproblems that we want, we put more
+        pieces in subproblems until we have this many subproblems, or
+        there is only one piece left to put
+
+    each subproblem is a state of `find_solutions_bb` (see its `todo` items)
+    and they are given in the same order as `find_solutions_bb` visits them
+    """
+    stage_size = sum(
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    )
+    depth = 0
+    subproblems = list(iter_frontier(row_count, col_count, count_by_symbol, 0))
+    while len(subproblems) < min_count and depth < stage_size - 1:
+        depth += 1
+        subproblems = list(iter_frontier(
+            row_count,
+            col_count,
+            count_by_symbol,
+            depth,
+        ))
+    return subproblems
+
+
+def _count_subproblem(args):
+    """
+    worker function, return the number of solutions of a subproblem
+    args: tuple of (row_count, col_count, state)
+    """
+    row_count, col_count, state = args
+    stage_size = state[2]
+    if stage_size < 1:  # board is complete
+        return 1
+    return count_bb(
+        ChessPiece.attack_table(row_count, col_count),
+        row_count * col_count,
+        list(state[1]),
+        stage_size,
+        *state[3:]
+    )
+
+
+def _solve_subproblem(args):
+    """
+    worker function, return the solutions of a subproblem packed in an
+    array of ints, `cell_num * TYPE_COUNT + piece_id` for each piece of
+    each solution, which is much smaller than a list of boards
+    args: tuple of (row_count, col_count, state)
+    """
+    row_count, col_count, state = args
+    type_count = len(ChessPiece.class_list)
+    records = array('L')
+    if state[2] < 1:  # board is complete
+        placed_iter = [state[0]]
+    else:
+        placed_iter = iter_placed_bb(
+            ChessPiece.attack_table(row_count, col_count),
+            row_count * col_count,
+            [state],
+        )
+    for placed in placed_iter:
+        while placed:
+            cell_num, piece_id, placed = placed
+            records.append(cell_num * type_count + piece_id)
+    return records
+
+
+def _unpack_boards(records, col_count, piece_total):
+    """
+    iterate over solution boards of an array given by `_solve_subproblem`
+    """
+    type_count = len(ChessPiece.class_list)
+    symbols = [cls.symbol for cls in ChessPiece.class_list]
+    for start in range(0, len(records), piece_total):
+        board = {}
+        for code in records[start:start + piece_total]:
+            cell_num, piece_id = divmod(code, type_count)
+            board[divmod(cell_num, col_count)] = symbols[piece_id]
+        yield board
+
+
+def _map_subproblems(func, row_count, col_count, count_by_symbol, jobs,
+                     ordered):
+    """
+    call `func` on all subproblems, using `jobs` worker processes
+    and iterate over results, in order of subproblems if `ordered` is True
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    subproblems = make_subproblems(
+        row_count,
+        col_count,
+        count_by_symbol,
+        min_count=jobs * SUBPROBLEMS_PER_JOB if jobs > 1 else 1,
+    )
+    args_list = [
+        (row_count, col_count, state)
+        for state in subproblems
+    ]
+    if jobs <= 1:
+        yield from map(func, args_list)
+        return
+    with multiprocessing.Pool(jobs) as pool:
+        if not ordered:
+            # chunksize=1: each idle worker takes the next subproblem
+            yield from pool.imap_unordered(func, args_list, chunksize=1)
+            return
+        # `pool.imap` would solve all subproblems as fast as it can, and
+        # keep the results until they are taken, so we only submit a few
+        # subproblems ahead of the one that is taken
+        pending = deque()
+        for args in args_list:
+            pending.append(pool.apply_async(func, (args,)))
+            if len(pending) >= jobs * PENDING_PER_JOB:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def count_solutions_parallel(row_count, col_count, count_by_symbol,
+                             jobs=None):
+    """count solution boards, using multiple processes
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    jobs: number of worker processes, defaults to number of CPUs
+
+    returns the number of solutions that `find_solutions_s` would give
+    """
+    return sum(_map_subproblems(
+        _count_subproblem,
+        row_count,
+        col_count,
+        count_by_symbol,
+        jobs,
+        False,
+    ))
+
+
+def find_solutions_parallel(row_count, col_count, count_by_symbol,
+                            jobs=None):
+    """find and iterate over solution boards, using multiple processes
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    jobs: number of worker processes, defaults to number of CPUs
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`
+    """
+    piece_total = sum(
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    )
+    if not 0 < piece_total <= row_count * col_count:
+        return
+    for records in _map_subproblems(
+        _solve_subproblem,
+        row_count,
+        col_count,
+        count_by_symbol,
+        jobs,
+        True,
+    ):
+        yield from _unpack_boards(records, col_count, piece_total)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+live progress report of long running searches, on standard error
+"""
+
+import sys
+from time import time as now
+
+DEFAULT_INTERVAL = 0.5  # minimum number of seconds between reports
+
+
+def format_duration(seconds):
+    """format a number of seconds as H:MM:SS"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '%d:%02d:%02d' % (hours, minutes, seconds)
+
+
+class ProgressReporter(object):
+    """
+    shows the completed fraction of search, number of solutions found,
+    nodes per second and estimated remaining time, on one line that is
+    overwritten each time, not more than once in each `interval` seconds
+    """
+    def __init__(self, stream=None, interval=DEFAULT_INTERVAL):
+        """
+        stream: a text file object, default is sys.stderr
+        interval: minimum number of seconds between reports
+        """
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.start_time = None
+        self.start_fraction = 0.0
+        self.start_nodes = 0
+        self.last_time = 0.0
+        self.line_length = 0
+
+    def start(self, fraction=0.0, nodes=0):
+        """
+        called before search, or before continuing a search that has
+        completed `fraction` of the search tree and visited `nodes` nodes
+        """
+        self.start_time = now()
+        self.start_fraction = fraction
+        self.start_nodes = nodes
+        self.last_time = self.start_time
+
+    def get_eta(self, fraction, elapsed):
+        """
+        return estimated remaining seconds, or None if not known yet
+        """
+        done = fraction - self.start_fraction
+        if done <= 0 or elapsed <= 0:
+            return None
+        return elapsed * (1 - fraction) / done
+
+    def format_line(self, fraction, solutions, nodes, elapsed):
+        """
+        return the progress line to show, nodes per second are measured
+        from the start of this reporter (not of a resumed search)
+        """
+        eta = self.get_eta(fraction, elapsed)
+        nodes_per_sec = (nodes - self.start_nodes) / elapsed \
+            if elapsed > 0 else 0
+        return '%6.2f%%  solutions: %s  nodes/s: %.0f  ETA: %s' % (
+            fraction * 100,
+            solutions,
+            nodes_per_sec,
+            '?' if eta is None else format_duration(eta),
+        )
+
+    def update(self, fraction, solutions, nodes, force=False):
+        """
+        report progress, unless the last report was too recent
+
+        fraction: completed fraction of the search tree, from 0 to 1
+        solutions: number of solutions found so far
+        nodes: number of nodes visited so far
+        force: report even if the last report was too recent
+        """
+        tm = now()
+        if self.start_time is None:
+            self.start(fraction, nodes)
+        if not force and tm - self.last_time < self.interval:
+            return
+        self.last_time = tm
+        line = self.format_line(
+            fraction,
+            solutions,
+            nodes,
+            tm - self.start_time,
+        )
+        self.stream.write('\r' + line.ljust(self.line_length))
+        self.stream.flush()
+        self.line_length = len(line)
+
+    def finish(self):
+        """clear the progress line"""
+        if self.line_length:
+            self.stream.write('\r' + ' ' * self.line_length + '\r')
+            self.stream.flush()
+            self.line_length = 0
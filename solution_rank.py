@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+rank and unrank of solutions, in the order of `find_solutions_s` (and
+`find_solutions_bb`), using subtree counts of `MemoCounter`
+
+rank of a solution is its index in that order (starting from 0), and to find
+the solution of an index (unrank), we go down the search tree skipping whole
+subtrees, so it does not need to iterate over the solutions before it
+
+`find_solutions_from` also keeps the later siblings on the way down, which
+is the `todo` stack of `find_solutions_bb` at that solution, so it can
+continue from there
+"""
+
+from pieces import ChessPiece
+from solution import iter_children_bb, iter_placed_bb, placed_to_board
+from solution_memo import MemoCounter, DEFAULT_MAX_SIZE
+
+
+class SolutionRanker(object):
+    """
+    maps solutions of a problem to their indexes, and back, keeping subtree
+    counts between calls
+    """
+    def __init__(self, row_count, col_count, count_by_symbol,
+                 max_size=DEFAULT_MAX_SIZE):
+        """
+        row_count: int, number or rows
+        col_count: int, number of columns
+        count_by_symbol: dict of { piece_symbol => count }
+        max_size: maximum number of entries in memo table
+        """
+        self.row_count = row_count
+        self.col_count = col_count
+        self.cell_count = row_count * col_count
+        self.attack_table = ChessPiece.attack_table(row_count, col_count)
+        self.stage = [
+            count_by_symbol.get(cls.symbol, 0)
+            for cls in ChessPiece.class_list
+        ]
+        self.counter = MemoCounter(row_count, col_count, max_size)
+        self._total = None
+
+    def get_total(self):
+        """return the number of solutions"""
+        if self._total is None:
+            if 0 < sum(self.stage) <= self.cell_count:
+                self._total = self.counter.count_state(self.stage, 0, 0, 0)
+            else:
+                self._total = 0
+        return self._total
+
+    def _count_child(self, child):
+        _, stage, _, cell_num, occupied, attacked = child
+        return self.counter.count_state(stage, cell_num, occupied, attacked)
+
+    def _root(self):
+        return (None, self.stage, sum(self.stage), 0, 0, 0)
+
+    def _unrank_low(self, index, todo):
+        #   go down the tree to the solution of `index`, and return the
+        #   list of its later siblings (which are solutions too)
+        #   later siblings of non-solution states are added to `todo` stack
+        state = self._root()
+        while True:
+            children = list(iter_children_bb(
+                self.attack_table,
+                self.cell_count,
+                state,
+            ))
+            for child_index, child in enumerate(children):
+                count = self._count_child(child)
+                if index < count:
+                    break
+                index -= count
+            else:
+                raise RuntimeError('subtree counts do not match')
+            if child[2] == 0:
+                return children[child_index:]
+            todo += reversed(children[child_index + 1:])
+            state = child
+
+    def unrank(self, index):
+        """
+        return the solution of given index, as a `board` dict
+            {(row_num, col_num) => piece_symbol}
+        raises IndexError if index is out of range
+        """
+        if not 0 <= index < self.get_total():
+            raise IndexError('solution index out of range')
+        leaves = self._unrank_low(index, [])
+        return placed_to_board(leaves[0][0], self.col_count)
+
+    def rank(self, board):
+        """
+        return the index of a solution `board`
+            {(row_num, col_num) => piece_symbol}
+        raises ValueError if it's not a solution of this problem
+        """
+        piece_ids = {
+            cls.symbol: cls.cid
+            for cls in ChessPiece.class_list
+        }
+        path = []
+        for (row_num, col_num), symbol in board.items():
+            if symbol not in piece_ids:
+                raise ValueError('invalid piece symbol %r' % symbol)
+            if not (0 <= row_num < self.row_count and
+                    0 <= col_num < self.col_count):
+                raise ValueError(
+                    'cell (%s, %s) is not on the board' % (row_num, col_num)
+                )
+            cell_num = row_num * self.col_count + col_num
+            path.append((cell_num, piece_ids[symbol]))
+        path.sort()
+        if len(path) != sum(self.stage):
+            raise ValueError('not a solution of this problem')
+        index = 0
+        state = self._root()
+        for target in path:
+            for child in iter_children_bb(
+                self.attack_table,
+                self.cell_count,
+                state,
+            ):
+                if child[0][:2] == target:
+                    state = child
+                    break
+                index += self._count_child(child)
+            else:
+                raise ValueError('not a solution of this problem')
+        return index
+
+    def iter_from(self, offset=0):
+        """
+        iterate over solution boards, starting from the solution of index
+        `offset`, in the same order as `find_solutions_s`
+
+        only the subtrees before the solution of `offset` (and the ones on
+        the way down to it) are counted, so it does not count the whole
+        problem first, and it gives nothing if `offset` is out of range
+        """
+        if offset < 0 or not 0 < sum(self.stage) <= self.cell_count:
+            return
+        index = offset
+        todo = [self._root()]
+        leaves = []
+        while index > 0 and todo:
+            state = todo.pop()
+            if state[0] is not None:  # not the root, which is never skipped
+                count = self._count_child(state)
+                if index >= count:  # skip the whole subtree
+                    index -= count
+                    continue
+            children = list(iter_children_bb(
+                self.attack_table,
+                self.cell_count,
+                state,
+            ))
+            if state[2] == 1:  # children are solutions
+                leaves = children[index:]
+                index = 0
+            else:
+                todo += reversed(children)
+        if index > 0:  # all solutions are skipped
+            return
+        for leaf in leaves:
+            yield placed_to_board(leaf[0], self.col_count)
+        for placed in iter_placed_bb(self.attack_table, self.cell_count, todo):
+            yield placed_to_board(placed, self.col_count)
+
+
+def rank_solution(row_count, col_count, count_by_symbol, board):
+    """
+    return the index of solution `board` in the order of `find_solutions_s`
+    """
+    return SolutionRanker(row_count, col_count, count_by_symbol).rank(board)
+
+
+def unrank_solution(row_count, col_count, count_by_symbol, index):
+    """
+    return the solution `board` of given index in the order of
+    `find_solutions_s`
+    """
+    return SolutionRanker(row_count, col_count, count_by_symbol).unrank(index)
+
+
+def find_solutions_from(row_count, col_count, count_by_symbol, offset=0):
+    """find and iterate over solution boards, skipping the first `offset`
+    solutions without searching them
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    offset: index of the first solution to give
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`
+    """
+    ranker = SolutionRanker(row_count, col_count, count_by_symbol)
+    yield from ranker.iter_from(offset)
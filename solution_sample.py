@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+uniform random sampling of solutions / configurations, without enumerating
+them
+
+a sample is the solution of a uniform random index, found by going down the
+search tree with subtree counts (see `solution_rank`), which are kept for
+the next samples
+
+when most boards are solutions (like a few pieces on a big board), putting
+pieces on random cells until they don't attack each other (rejection
+sampling) is much faster than counting, so that is tried first, for a
+limited number of attempts, both ways give uniform samples
+"""
+
+import random
+
+from pieces import ChessPiece
+from solution_memo import DEFAULT_MAX_SIZE
+from solution_rank import SolutionRanker
+
+REJECTION_ATTEMPTS = 100  # attempts of rejection sampling for each sample
+
+
+class SolutionSampler(object):
+    """
+    draws uniform random solutions of a problem, keeping subtree counts
+    between samples
+    """
+    def __init__(self, row_count, col_count, count_by_symbol, seed=None,
+                 max_size=DEFAULT_MAX_SIZE):
+        """
+        row_count: int, number or rows
+        col_count: int, number of columns
+        count_by_symbol: dict of { piece_symbol => count }
+        seed: seed of random number generator, or None
+        max_size: maximum number of entries in memo table
+        """
+        self.row_count = row_count
+        self.col_count = col_count
+        self.cell_count = row_count * col_count
+        self.attack_table = ChessPiece.attack_table(row_count, col_count)
+        self.stage = [
+            count_by_symbol.get(cls.symbol, 0)
+            for cls in ChessPiece.class_list
+        ]
+        # piece_id of each piece, for rejection sampling
+        self.piece_ids = [
+            piece_id
+            for piece_id, count in enumerate(self.stage)
+            for _ in range(count)
+        ]
+        self.rand = random.Random(seed)
+        self.ranker = SolutionRanker(
+            row_count,
+            col_count,
+            count_by_symbol,
+            max_size,
+        )
+        self.use_rejection = True
+
+    def _sample_rejection(self):
+        """
+        try rejection sampling, return a `board` dict, or None if no
+        attempt gave a solution
+        """
+        attack_table = self.attack_table
+        piece_ids = self.piece_ids
+        cells = range(self.cell_count)
+        sample = self.rand.sample
+        for _ in range(REJECTION_ATTEMPTS):
+            # random distinct cells, in random order, so any arrangement of
+            # pieces has the same probability
+            cell_list = sample(cells, len(piece_ids))
+            occupied = 0
+            for cell_num in cell_list:
+                occupied |= 1 << cell_num
+            for cell_num, piece_id in zip(cell_list, piece_ids):
+                if attack_table[piece_id][cell_num] & occupied:
+                    break
+            else:
+                return {
+                    divmod(cell_num, self.col_count):
+                    ChessPiece.class_list[piece_id].symbol
+                    for cell_num, piece_id in zip(cell_list, piece_ids)
+                }
+        return None
+
+    def sample(self):
+        """
+        return a uniform random solution, as a `board` dict
+            {(row_num, col_num) => piece_symbol}
+        or None if the problem has no solution
+        """
+        if not 0 < sum(self.stage) <= self.cell_count:
+            return None
+        if self.use_rejection:
+            board = self._sample_rejection()
+            if board is not None:
+                return board
+            # most random boards are not solutions, don't try it again
+            self.use_rejection = False
+        total = self.ranker.get_total()
+        if total == 0:
+            return None
+        return self.ranker.unrank(self.rand.randrange(total))
+
+
+def sample_solutions(row_count, col_count, count_by_symbol, n, seed=None):
+    """draw uniform random solution boards (independently, so a board may
+    be given more than once)
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+    n: number of samples
+    seed: seed of random number generator, or None
+
+    returns a list of `n` boards, or an empty list if the problem has no
+    solution, where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    """
+    sampler = SolutionSampler(row_count, col_count, count_by_symbol, seed)
+    boards = []
+    for _ in range(n):
+        board = sampler.sample()
+        if board is None:
+            return []
+        boards.append(board)
+    return boards
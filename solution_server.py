@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+local solver service, using asyncio, on a Unix socket or localhost TCP port
+
+the protocol is JSON lines, each request is a JSON object like:
+    {"id": 1, "op": "count", "rows": 7, "cols": 7, "pieces": {"K": 2}}
+    {"id": 2, "op": "enumerate", "rows": 4, "cols": 4, "pieces": {"R": 4},
+     "limit": 10}
+("limit" is optional) and responses are JSON objects with the same "id":
+    {"id": 1, "count": 3063828, "source": "computed"}
+    {"id": 2, "board": [[0, 0, "R"], [1, 1, "R"], ...]}  (one for each board)
+    {"id": 2, "done": true, "count": 10}
+    {"id": 3, "error": "..."}
+an enumeration that fails after some boards ends with an error instead of
+"done"
+"source" of count is "computed", "coalesced" (the same problem was being
+counted for another request, and we waited for it), or "cached"
+
+requests of a connection are handled concurrently, so responses of
+different requests may come in any order
+"""
+
+import os
+import json
+import asyncio
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+from solution import count_solutions, find_solutions_u
+from solution_cache import problem_key
+from solution_batch import parse_problem
+
+DEFAULT_MAX_CACHED = 100000  # number of counts to keep in memory
+BOARD_QUEUE_SIZE = 1024  # boards waiting to be sent, for each request
+
+
+def _board_to_json(board):
+    return [
+        [row_num, col_num, symbol]
+        for (row_num, col_num), symbol in sorted(board.items())
+    ]
+
+
+class SolverServer(object):
+    """
+    counts and enumerates solutions for clients, counting on a pool of
+    worker processes, with coalescing of identical count requests, and a
+    cache of counts (in memory, and in a `SolutionCache` if given)
+    """
+    def __init__(self, jobs=None, cache=None, max_cached=DEFAULT_MAX_CACHED):
+        """
+        jobs: number of worker processes for counting, defaults to number
+            of CPUs, with 1 we count in a thread of this process
+        cache: a `solution_cache.SolutionCache`, or None
+        max_cached: maximum number of counts to keep in memory
+        """
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if jobs <= 1:
+            self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        else:
+            self.executor = concurrent.futures.ProcessPoolExecutor(jobs)
+        self.cache = cache
+        # SQLite calls block, so they are run on one thread (one at a time)
+        # instead of the event loop
+        self.cache_executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.max_cached = max_cached
+        self.counts = OrderedDict()  # count by problem key, LRU
+        self.in_flight = {}  # future of count by problem key
+        self.computations = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def close(self):
+        """shut down the worker pool"""
+        self.executor.shutdown(wait=False)
+        self.cache_executor.shutdown(wait=False)
+
+    def get_stats(self):
+        """return a dict of server statistics"""
+        return {
+            'computations': self.computations,
+            'coalesced': self.coalesced,
+            'cache_hits': self.cache_hits,
+            'cached': len(self.counts),
+            'in_flight': len(self.in_flight),
+        }
+
+    def _get_remembered(self, key):
+        count = self.counts.get(key)
+        if count is not None:
+            self.counts.move_to_end(key)
+        return count
+
+    def _remember(self, key, count):
+        self.counts[key] = count
+        if len(self.counts) > self.max_cached:
+            self.counts.popitem(last=False)
+
+    async def count(self, row_count, col_count, count_by_symbol):
+        """
+        return a tuple of (count, source) for a problem, see module
+        docstring for `source`
+        """
+        key = problem_key(row_count, col_count, count_by_symbol)
+        count = self._get_remembered(key)
+        if count is not None:
+            self.cache_hits += 1
+            return count, 'cached'
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: a cancelled request must not cancel the others
+            count, _ = await asyncio.shield(future)
+            return count, 'coalesced'
+        # in flight while looking up the cache file too, so identical
+        # requests are coalesced from the start
+        future = asyncio.ensure_future(self._look_up_or_count(
+            row_count,
+            col_count,
+            count_by_symbol,
+        ))
+        self.in_flight[key] = future
+        try:
+            count, source = await asyncio.shield(future)
+        finally:
+            del self.in_flight[key]
+        self._remember(key, count)
+        if source == 'cached':
+            self.cache_hits += 1
+        return count, source
+
+    async def _look_up_or_count(self, row_count, col_count, count_by_symbol):
+        """
+        return a tuple of (count, source) from the cache file, or counted by
+        the worker pool (and put into the cache file)
+        """
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            count = await loop.run_in_executor(
+                self.cache_executor,
+                self.cache.get_count,
+                row_count,
+                col_count,
+                count_by_symbol,
+            )
+            if count is not None:
+                return count, 'cached'
+        self.computations += 1
+        count = await loop.run_in_executor(
+            self.executor,
+            count_solutions,
+            row_count,
+            col_count,
+            count_by_symbol,
+        )
+        if self.cache is not None:
+            await loop.run_in_executor(
+                self.cache_executor,
+                self.cache.put_count,
+                row_count,
+                col_count,
+                count_by_symbol,
+                count,
+            )
+        return count, 'computed'
+
+    async def iter_boards(self, row_count, col_count, count_by_symbol,
+                          limit=None):
+        """
+        iterate over solution boards, as soon as they are found by a
+        thread, at most `limit` boards if it's not None
+
+        this is an async generator, yields a `board` dict each time
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(BOARD_QUEUE_SIZE)
+        stop = threading.Event()
+        end = object()
+        errors = []  # exception of producer, raised in consumer
+
+        def produce():
+            try:
+                if limit == 0:
+                    return
+                index = 0
+                for board in find_solutions_u(
+                    row_count,
+                    col_count,
+                    count_by_symbol,
+                ):
+                    if stop.is_set():
+                        break
+                    # waits while the queue is full
+                    asyncio.run_coroutine_threadsafe(
+                        queue.put(board),
+                        loop,
+                    ).result()
+                    index += 1
+                    if limit is not None and index >= limit:
+                        break
+            except Exception as e:
+                errors.append(e)
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(end), loop)
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                board = await queue.get()
+                if board is end:
+                    break
+                yield board
+            if errors:
+                raise errors[0]
+        finally:
+            stop.set()
+            # let the producer finish if it's waiting for the queue
+            while not queue.empty():
+                queue.get_nowait()
+
+    async def handle_request(self, data, send):
+        """
+        handle one request, calling `send` (a coroutine function) with each
+        response dict
+        """
+        request_id = data.get('id') if isinstance(data, dict) else None
+        try:
+            op = data.get('op', 'count') if isinstance(data, dict) else None
+            if op not in ('count', 'enumerate'):
+                raise ValueError('invalid op %r' % op)
+            row_count, col_count, count_by_symbol, _ = parse_problem(data)
+            limit = data.get('limit')
+            if limit is not None and (
+                not isinstance(limit, int) or limit < 0
+            ):
+                raise ValueError('limit must be a non-negative integer')
+        except ValueError as e:
+            await send({'id': request_id, 'error': str(e)})
+            return
+        try:
+            if op == 'count':
+                count, source = await self.count(
+                    row_count,
+                    col_count,
+                    count_by_symbol,
+                )
+                response = {'id': request_id, 'count': count, 'source': source}
+            else:
+                count = 0
+                async for board in self.iter_boards(
+                    row_count,
+                    col_count,
+                    count_by_symbol,
+                    limit,
+                ):
+                    await send({
+                        'id': request_id,
+                        'board': _board_to_json(board),
+                    })
+                    count += 1
+                response = {'id': request_id, 'done': True, 'count': count}
+        except (asyncio.CancelledError, ConnectionError):
+            raise
+        except Exception as e:
+            # like a broken worker process, or out of memory, the client
+            # gets an error instead of losing the connection (or getting
+            # a partial enumeration as done)
+            response = {
+                'id': request_id,
+                'error': '%s: %s' % (e.__class__.__name__, e),
+            }
+        await send(response)
+
+    async def handle_client(self, reader, writer):
+        """handle a client connection, see `asyncio.start_server`"""
+        async def send(response):
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    await send({'id': None, 'error': 'invalid JSON'})
+                    continue
+                task = asyncio.ensure_future(self.handle_request(data, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """
+        start listening on Unix socket `path` if given, otherwise on TCP
+        `host` and `port` (0 for a free port), return the asyncio server
+        """
+        if path:
+            return await asyncio.start_unix_server(self.handle_client, path)
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+def serve(path=None, host='127.0.0.1', port=0, jobs=None, cache=None,
+          ready=None):
+    """
+    run the solver service until interrupted
+
+    path: path of Unix socket, or None to use TCP `host` and `port`
+    ready: a function that is called with the listening addresses
+    """
+    server = SolverServer(jobs=jobs, cache=cache)
+
+    async def main():
+        async_server = await server.start(path=path, host=host, port=port)
+        if ready:
+            ready([sock.getsockname() for sock in async_server.sockets])
+        async with async_server:
+            await async_server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    finally:
+        server.close()
+        if path and os.path.exists(path):
+            os.remove(path)
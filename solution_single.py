@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+fast counting (and enumeration) of problems with only one piece type
+
+    queens: bitmask backtracking, one row at a time
+    rooks: closed form, C(rows, n) * C(cols, n) * n!
+    bishops: bishops on white and black cells never attack each other, and
+        on each color, diagonals and anti-diagonals act like rows and
+        columns of non-attacking rooks
+    kings, knights: transfer matrix, see `solution_transfer`
+"""
+
+from math_util import comb, perm
+from solution_transfer import count_solutions_transfer
+
+
+def get_single_symbol(count_by_symbol):
+    """
+    return the symbol of the only piece type of a problem, or None if
+    there is more than one piece type (or none)
+    """
+    symbols = [
+        symbol
+        for symbol, count in count_by_symbol.items()
+        if count > 0
+    ]
+    if len(symbols) != 1:
+        return None
+    return symbols[0]
+
+
+def _count_queens_low(rows_left, left, full, cols, diag, anti):
+    #   `rows_left` is the number of rows left, including current row
+    #   `left` is the number of queens left to put
+    #   `cols`, `diag` and `anti` are bit masks of columns of current row
+    #       that are attacked vertically or diagonally by queens above
+    free = full & ~(cols | diag | anti)
+    if left == 1:
+        # the last queen: any free cell of this row or rows below, which
+        # needs another loop for the rows below
+        count = bin(free).count('1')
+        if rows_left > 1:
+            count += _count_queens_low(
+                rows_left - 1,
+                1,
+                full,
+                cols,
+                (diag << 1) & full,
+                anti >> 1,
+            )
+        return count
+    count = 0
+    while free:
+        bit = free & -free
+        free ^= bit
+        count += _count_queens_low(
+            rows_left - 1,
+            left - 1,
+            full,
+            cols | bit,
+            ((diag | bit) << 1) & full,
+            (anti | bit) >> 1,
+        )
+    if rows_left > left:  # leave this row empty
+        count += _count_queens_low(
+            rows_left - 1,
+            left,
+            full,
+            cols,
+            (diag << 1) & full,
+            anti >> 1,
+        )
+    return count
+
+
+def count_queens(row_count, col_count, queen_count):
+    """
+    return the number of ways to put `queen_count` non-attacking queens
+    """
+    if not 0 < queen_count <= min(row_count, col_count):
+        return 0
+    # less rows means less rows to leave empty
+    row_count, col_count = sorted((row_count, col_count))
+    return _count_queens_low(
+        row_count,
+        queen_count,
+        (1 << col_count) - 1,
+        0,
+        0,
+        0,
+    )
+
+
+def count_rooks(row_count, col_count, rook_count):
+    """
+    return the number of ways to put `rook_count` non-attacking rooks
+    """
+    if not 0 < rook_count <= min(row_count, col_count):
+        return 0
+    return comb(row_count, rook_count) * perm(col_count, rook_count)
+
+
+def _count_lines(line_masks, max_count):
+    """
+    count ways to put non-attacking rooks on a board whose rows are given
+    by `line_masks`, each one is a bit mask of its columns
+
+    returns a list of counts for 0 to `max_count` rooks
+    """
+    line_masks = sorted(line_masks, key=lambda mask: bin(mask).count('1'))
+    if all(
+        prev & ~mask == 0
+        for prev, mask in zip(line_masks, line_masks[1:])
+    ):
+        # each row contains all columns of previous rows, so the number of
+        # free columns of a row only depends on the number of rooks above
+        counts = [1] + [0] * max_count
+        for mask in line_masks:
+            size = bin(mask).count('1')
+            for placed in range(max_count, 0, -1):
+                if size >= placed:
+                    counts[placed] += counts[placed - 1] * (size - placed + 1)
+        return counts
+    # otherwise keep used columns that later rows can still use
+    future_masks = [0] * (len(line_masks) + 1)
+    for index in range(len(line_masks) - 1, -1, -1):
+        future_masks[index] = future_masks[index + 1] | line_masks[index]
+    states = {0: [1] + [0] * max_count}  # counts by used columns
+    for index, mask in enumerate(line_masks):
+        future = future_masks[index + 1]
+        new_states = {}
+        for used, counts in states.items():
+            children = [(used, counts, 0)]  # leave this row empty
+            free = mask & ~used
+            while free:
+                bit = free & -free
+                free ^= bit
+                children.append((used | bit, counts, 1))
+            for child_used, child_counts, added in children:
+                child_used &= future
+                new_counts = new_states.get(child_used)
+                if new_counts is None:
+                    new_counts = new_states[child_used] = [0] * (max_count + 1)
+                for placed in range(max_count + 1 - added):
+                    new_counts[placed + added] += child_counts[placed]
+        states = new_states
+    total = [0] * (max_count + 1)
+    for counts in states.values():
+        for placed, count in enumerate(counts):
+            total[placed] += count
+    return total
+
+
+def count_bishops(row_count, col_count, bishop_count):
+    """
+    return the number of ways to put `bishop_count` non-attacking bishops
+    """
+    if not 0 < bishop_count <= row_count * col_count:
+        return 0
+    color_counts = []
+    for color in (0, 1):
+        # bit mask of anti-diagonals of each diagonal of this color
+        line_masks = {}
+        for row_num in range(row_count):
+            for col_num in range(col_count):
+                if (row_num + col_num) % 2 != color:
+                    continue
+                diag = row_num - col_num
+                line_masks[diag] = line_masks.get(diag, 0) | \
+                    1 << (row_num + col_num)
+        color_counts.append(_count_lines(line_masks.values(), bishop_count))
+    white, black = color_counts
+    return sum(
+        white[count] * black[bishop_count - count]
+        for count in range(bishop_count + 1)
+    )
+
+
+def count_kings(row_count, col_count, king_count):
+    """
+    return the number of ways to put `king_count` non-attacking kings
+    """
+    if not 0 < king_count <= row_count * col_count:
+        return 0
+    return count_solutions_transfer(row_count, col_count, {'K': king_count})
+
+
+def count_knights(row_count, col_count, knight_count):
+    """
+    return the number of ways to put `knight_count` non-attacking knights
+    """
+    if not 0 < knight_count <= row_count * col_count:
+        return 0
+    return count_solutions_transfer(
+        row_count,
+        col_count,
+        {'N': knight_count},
+    )
+
+
+count_func_by_symbol = {
+    'Q': count_queens,
+    'R': count_rooks,
+    'B': count_bishops,
+    'K': count_kings,
+    'N': count_knights,
+}
+
+
+def _find_lines_low(row_num, rows_left, left, col_count, full, symbol,
+                    cols, diag, anti, board):
+    #   like `_count_queens_low`, with `diag` and `anti` always 0 for rooks
+    #   `board` has the queens/rooks above, and is modified while searching
+    if left == 0:
+        yield dict(board)
+        return
+    free = full & ~(cols | diag | anti)
+    while free:
+        bit = free & -free
+        free ^= bit
+        col_num = bit.bit_length() - 1
+        board[(row_num, col_num)] = symbol
+        if symbol == 'Q':
+            yield from _find_lines_low(
+                row_num + 1,
+                rows_left - 1,
+                left - 1,
+                col_count,
+                full,
+                symbol,
+                cols | bit,
+                ((diag | bit) << 1) & full,
+                (anti | bit) >> 1,
+                board,
+            )
+        else:
+            yield from _find_lines_low(
+                row_num + 1,
+                rows_left - 1,
+                left - 1,
+                col_count,
+                full,
+                symbol,
+                cols | bit,
+                0,
+                0,
+                board,
+            )
+        del board[(row_num, col_num)]
+    if rows_left > left:  # leave this row empty
+        yield from _find_lines_low(
+            row_num + 1,
+            rows_left - 1,
+            left,
+            col_count,
+            full,
+            symbol,
+            cols,
+            (diag << 1) & full,
+            anti >> 1,
+            board,
+        )
+
+
+def find_solutions_lines(row_count, col_count, symbol, piece_count):
+    """find and iterate over solution boards of only queens or only rooks,
+    one row at a time, at most one piece in each row
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    boards are given in the same order as `find_solutions_s`
+    """
+    if symbol not in ('Q', 'R'):
+        raise ValueError('invalid piece symbol %r' % symbol)
+    if not 0 < piece_count <= min(row_count, col_count):
+        return
+    # bit i of masks is column i, so lower columns are tried first
+    yield from _find_lines_low(
+        0,
+        row_count,
+        piece_count,
+        col_count,
+        (1 << col_count) - 1,
+        symbol,
+        0,
+        0,
+        0,
+        {},
+    )
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+search statistics: number of nodes and pruning cuts of a search, by depth
+(number of pieces on board) and by piece type
+
+engines only collect statistics when a SearchStats object is given to them,
+they run a separate instrumented loop in that case, so the normal loop has
+no extra work
+"""
+
+from collections import Counter
+from time import perf_counter
+
+from pieces import ChessPiece
+
+# kinds of cuts
+CUT_ATTACKED = 'attacked'  # cell is under attack by board
+CUT_ATTACKS_BOARD = 'attacks_board'  # new piece would attack board
+CUT_BOUND = 'bound'  # not enough cells left for the rest of pieces
+CUT_FORWARD = 'forward'  # not enough safe cells, see `solution_forward`
+
+CUT_KINDS = (CUT_ATTACKED, CUT_ATTACKS_BOARD, CUT_BOUND, CUT_FORWARD)
+
+
+class SearchStats(object):
+    """
+    counters of a search
+
+    nodes: number of pieces put on board (partial or complete boards),
+        by (depth, piece_id)
+    cuts: number of cuts, by (kind, depth, piece_id), where piece_id is
+        None for cuts that are not related to a piece type (like an
+        attacked cell)
+    depth is the number of pieces on board before putting the new piece
+    """
+    def __init__(self):
+        self.nodes = Counter()
+        self.cuts = Counter()
+        self.solutions = 0
+        self.start_time = None
+        self.end_time = None
+
+    def start(self):
+        """called by engine before search"""
+        self.start_time = perf_counter()
+        self.end_time = None
+
+    def stop(self):
+        """called by engine after search"""
+        self.end_time = perf_counter()
+
+    def get_elapsed(self):
+        """return the running time of search in seconds"""
+        if self.start_time is None:
+            return 0.0
+        end_time = self.end_time
+        if end_time is None:  # still running
+            end_time = perf_counter()
+        return end_time - self.start_time
+
+    def get_node_count(self):
+        """return total number of nodes"""
+        return sum(self.nodes.values())
+
+    def get_cut_count(self, kind=None):
+        """return total number of cuts of given kind, or all kinds"""
+        return sum(
+            count for (cut_kind, _, _), count in self.cuts.items()
+            if kind is None or cut_kind == kind
+        )
+
+    def get_nodes_per_sec(self):
+        """return number of nodes per second, or 0.0 if not measured"""
+        elapsed = self.get_elapsed()
+        if elapsed <= 0:
+            return 0.0
+        return self.get_node_count() / elapsed
+
+    def get_depth_table(self):
+        """
+        return a list of (depth, nodes, cuts_by_kind) for each depth
+        where `cuts_by_kind` is a dict of { kind => count }
+        """
+        depths = {depth for depth, _ in self.nodes} | \
+            {depth for _, depth, _ in self.cuts}
+        table = []
+        for depth in sorted(depths):
+            cuts_by_kind = dict.fromkeys(CUT_KINDS, 0)
+            for (kind, cut_depth, _), count in self.cuts.items():
+                if cut_depth == depth:
+                    cuts_by_kind[kind] += count
+            table.append((
+                depth,
+                sum(
+                    count for (node_depth, _), count in self.nodes.items()
+                    if node_depth == depth
+                ),
+                cuts_by_kind,
+            ))
+        return table
+
+    def get_piece_table(self):
+        """
+        return a list of (piece_symbol, nodes, cuts_by_kind) for each piece
+        type, cuts that are not related to a piece type are not included
+        """
+        table = []
+        for cls in ChessPiece.class_list:
+            cuts_by_kind = dict.fromkeys(CUT_KINDS, 0)
+            for (kind, _, piece_id), count in self.cuts.items():
+                if piece_id == cls.cid:
+                    cuts_by_kind[kind] += count
+            nodes = sum(
+                count for (_, piece_id), count in self.nodes.items()
+                if piece_id == cls.cid
+            )
+            if nodes or any(cuts_by_kind.values()):
+                table.append((cls.symbol, nodes, cuts_by_kind))
+        return table
+
+    def to_dict(self):
+        """return statistics as a dict that can be saved as JSON"""
+        return {
+            'solutions': self.solutions,
+            'nodes': self.get_node_count(),
+            'cuts': {kind: self.get_cut_count(kind) for kind in CUT_KINDS},
+            'elapsed': self.get_elapsed(),
+            'nodes_per_sec': self.get_nodes_per_sec(),
+            'by_depth': [
+                dict(cuts_by_kind, depth=depth, nodes=nodes)
+                for depth, nodes, cuts_by_kind in self.get_depth_table()
+            ],
+            'by_piece': [
+                dict(cuts_by_kind, piece=symbol, nodes=nodes)
+                for symbol, nodes, cuts_by_kind in self.get_piece_table()
+            ],
+        }
+
+    def format_table(self):
+        """return statistics as a string that can be shown in console"""
+        header = '%-6s %12s' % ('', 'Nodes') + ''.join(
+            ' %14s' % kind for kind in CUT_KINDS
+        )
+        lines = ['By depth:', header]
+        for depth, nodes, cuts_by_kind in self.get_depth_table():
+            lines.append('%-6s %12s' % (depth, nodes) + ''.join(
+                ' %14s' % cuts_by_kind[kind] for kind in CUT_KINDS
+            ))
+        lines += ['', 'By piece type:', header]
+        for symbol, nodes, cuts_by_kind in self.get_piece_table():
+            lines.append('%-6s %12s' % (symbol, nodes) + ''.join(
+                ' %14s' % cuts_by_kind[kind] for kind in CUT_KINDS
+            ))
+        lines += [
+            '',
+            'Solutions: %s' % self.solutions,
+            'Nodes: %s' % self.get_node_count(),
+            'Cuts: %s' % self.get_cut_count(),
+            'Nodes per second: %.0f' % self.get_nodes_per_sec(),
+        ]
+        return '\n'.join(lines)
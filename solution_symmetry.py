@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+symmetry-reduced search for solutions / configurations
+
+every symmetry of the board (rotations and reflections) maps a solution to
+another solution, so we only search for canonical boards (the first board of
+each orbit, in the order of `find_solutions_s`), and then count each with its
+orbit size, or expand it into its distinct images
+"""
+
+from pieces import ChessPiece
+
+EMPTY = len(ChessPiece.class_list)  # code of empty cell, after all piece_id
+
+
+def board_symmetries(row_count, col_count):
+    """
+    return a list of symmetries of the board, identity comes first
+    each item is a tuple mapping each cell_num to the cell_num of its image
+
+    there are 8 symmetries for a square board, and 4 for other rectangles
+    all piece types attack symmetrically, so attacks are preserved
+    """
+    last_row = row_count - 1
+    last_col = col_count - 1
+    funcs = [
+        lambda row_num, col_num: (row_num, col_num),
+        lambda row_num, col_num: (row_num, last_col - col_num),
+        lambda row_num, col_num: (last_row - row_num, col_num),
+        lambda row_num, col_num: (last_row - row_num, last_col - col_num),
+    ]
+    if row_count == col_count:
+        funcs += [
+            lambda row_num, col_num: (col_num, row_num),
+            lambda row_num, col_num: (col_num, last_row - row_num),
+            lambda row_num, col_num: (last_col - col_num, row_num),
+            lambda row_num, col_num: (last_col - col_num, last_row - row_num),
+        ]
+    perms = []
+    for func in funcs:
+        perm = []
+        for cell_num in range(row_count * col_count):
+            row_num, col_num = func(*divmod(cell_num, col_count))
+            perm.append(row_num * col_count + col_num)
+        perms.append(tuple(perm))
+    return perms
+
+
+def _placed_to_key(placed):
+    """
+    convert a linked list of placements (see `find_solutions_bb`) into a
+    tuple of (cell_num, piece_id) sorted by cell_num
+    """
+    key = []
+    while placed:
+        cell_num, piece_id, placed = placed
+        key.append((cell_num, piece_id))
+    key.reverse()
+    return tuple(key)
+
+
+def _key_to_board(key, col_count):
+    """
+    convert a tuple of (cell_num, piece_id) into a `board` dict
+    """
+    return {
+        divmod(cell_num, col_count): ChessPiece.class_list[piece_id].symbol
+        for cell_num, piece_id in key
+    }
+
+
+def _orbit_keys(key, perms):
+    """
+    return the list of distinct images of `key` under `perms`, starting with
+    `key` itself
+
+    key: tuple of (cell_num, piece_id) sorted by cell_num
+    perms: list of symmetries given by `board_symmetries`
+    """
+    images = [key]
+    for perm in perms[1:]:
+        image = tuple(sorted([
+            (perm[cell_num], piece_id)
+            for cell_num, piece_id in key
+        ]))
+        if image not in images:
+            images.append(image)
+    return images
+
+
+def _advance(codes, pending, cell_num):
+    """
+    continue comparing the board with its images, knowing all cells before
+    `cell_num`
+
+    codes: list of piece_id for each cell, or EMPTY
+    pending: list of (perm, index) for each symmetry whose image has been
+        equal to the board in all cells before `index`
+
+    returns a tuple of (new_pending, excluded), or None if some image comes
+    before the board, which means the board is not canonical
+    `excluded` is a bit mask of cells after `cell_num` that must be left
+    empty, because an image would come first otherwise
+    """
+    new_pending = []
+    excluded = 0
+    for perm, index in pending:
+        while index < cell_num:
+            src_num = perm[index]
+            code = codes[index]
+            if src_num >= cell_num:
+                if code != EMPTY:
+                    break
+                # image must be empty here too, or it comes first
+                excluded |= 1 << src_num
+                index += 1
+                continue
+            image_code = codes[src_num]
+            if image_code < code:  # image comes first
+                return None
+            if image_code > code:  # board comes first, forever
+                index = -1
+                break
+            index += 1
+        if index >= 0:
+            new_pending.append((perm, index))
+    return new_pending, excluded
+
+
+def _search_low(attack_table,
+                cell_count,
+                codes,
+                placed,
+                stage,
+                stage_size,
+                cell_num,
+                occupied,
+                attacked,
+                pending):
+    """
+    this is a generator, yields a tuple of (placed, stabilizer_size) for each
+    canonical solution after given state, see `_iter_canonical`
+
+    `codes` and `stage` are modified while searching, and restored at the
+    end
+    """
+    free = ~(occupied | attacked) & \
+        ((1 << (cell_count - stage_size + 1)) - 1) & \
+        -(1 << cell_num)
+    active = [
+        (piece_id, attack_table[piece_id])
+        for piece_id, count in enumerate(stage)
+        if count > 0
+    ]
+    while free:
+        cell_bit = free & -free  # lowest free cell
+        free ^= cell_bit
+        cell_num = cell_bit.bit_length() - 1
+        for piece_id, masks in active:
+            mask = masks[cell_num]
+            if mask & occupied:  # new piece attacks board
+                continue
+            codes[cell_num] = piece_id
+            if stage_size <= 1:  # board complete, all other cells are empty
+                advanced = _advance(codes, pending, cell_count)
+                codes[cell_num] = EMPTY
+                if advanced is not None:
+                    # images that are still equal, are equal to the board
+                    yield (cell_num, piece_id, placed), 1 + len(advanced[0])
+                continue
+            advanced = _advance(codes, pending, cell_num + 1)
+            if advanced is None:
+                codes[cell_num] = EMPTY
+                continue
+            new_pending, excluded = advanced
+            stage[piece_id] -= 1
+            yield from _search_low(
+                attack_table,
+                cell_count,
+                codes,
+                (cell_num, piece_id, placed),
+                stage,
+                stage_size - 1,
+                cell_num + 1,
+                occupied | cell_bit,
+                attacked | mask | excluded,
+                new_pending,
+            )
+            stage[piece_id] += 1
+            codes[cell_num] = EMPTY
+
+
+def _iter_canonical(row_count, col_count, count_by_symbol):
+    """
+    iterate over canonical solutions, in the order of `find_solutions_s`
+    yields a tuple of (key, orbit_size) for each one, see `_placed_to_key`
+
+    a board is canonical if it comes before all of its images, we compare
+    the board with its images cell by cell while searching, cut the branch
+    as soon as an image comes first, and leave the cells empty that would
+    make an image come first
+    """
+    cell_count = row_count * col_count
+    stage = [
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    ]
+    stage_size = sum(stage)
+    if not 0 < stage_size <= cell_count:
+        return
+    perms = board_symmetries(row_count, col_count)
+    for placed, stabilizer_size in _search_low(
+        ChessPiece.attack_table(row_count, col_count),
+        cell_count,
+        [EMPTY] * cell_count,
+        None,   # nothing placed yet
+        stage,  # initial stage
+        stage_size,  # initial stage_size
+        0,      # first cell (top-left corner)
+        0,      # occupied cells
+        0,      # attacked cells
+        [(perm, 0) for perm in perms[1:]],
+    ):
+        yield _placed_to_key(placed), len(perms) // stabilizer_size
+
+
+def find_canonical_solutions(row_count, col_count, count_by_symbol):
+    """find and iterate over canonical solution boards
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+
+    this is a generator, yields a tuple of (board, orbit_size) each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    and `orbit_size` is the number of distinct boards that are symmetric to
+    it (including itself)
+    """
+    for key, orbit_size in _iter_canonical(
+        row_count,
+        col_count,
+        count_by_symbol,
+    ):
+        yield _key_to_board(key, col_count), orbit_size
+
+
+def find_solutions_sym(row_count, col_count, count_by_symbol):
+    """find and iterate over solution boards, using symmetry-reduced search
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+
+    this is a generator, yields a completed `board` each time
+    where `board` is a dict of {(row_num, col_num) => piece_symbol}
+    gives the same set of boards as `find_solutions_s`, but each canonical
+    board is followed by its symmetric images
+    """
+    perms = board_symmetries(row_count, col_count)
+    for key, _ in _iter_canonical(row_count, col_count, count_by_symbol):
+        for image in _orbit_keys(key, perms):
+            yield _key_to_board(image, col_count)
+
+
+def count_solutions_sym(row_count, col_count, count_by_symbol):
+    """count solution boards, using symmetry-reduced search
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+
+    returns the number of solutions that `find_solutions_s` would give
+    """
+    return sum(
+        orbit_size
+        for _, orbit_size in _iter_canonical(
+            row_count,
+            col_count,
+            count_by_symbol,
+        )
+    )
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+transfer-matrix counting for problems with only short-range pieces
+
+kings and knights only attack cells within two rows, so when we go over
+cells one by one (in order of cell_num), whether a piece can be put on a
+cell only depends on the pieces on the last few cells (the window), and
+the number of ways to complete the board only depends on the window and
+the number of pieces of each type that are already put
+
+so we keep the number of ways to reach each (window, placed counts), and
+update them for each cell, which is a transfer matrix between row profiles
+broken into one step for each cell, it takes time linear in `row_count`
+(and exponential in `col_count`, so the narrow side of board is used as
+`col_count`)
+"""
+
+from pieces import ChessPiece
+from math_util import comb
+
+# the transfer matrix is used for boards whose narrow side is at most this
+# many cells for each piece after the first, because its time grows
+# exponentially with the narrow side, and time of `count_bb` with the
+# number of pieces, measured against `count_bb`: with 3 pieces it's slower
+# on square boards wider than 8 (10x10 -k1 -n2: 0.27s against 0.05s), with
+# 4 pieces it's still faster on 12x12 (-k2 -n2: 4.4s against 11.1s)
+MAX_WIDTH_PER_PIECE = 4
+
+
+def is_short_range(count_by_symbol):
+    """
+    return True if all piece types of a problem have `attack_range`
+    """
+    return all(
+        ChessPiece.class_by_symbol[symbol].attack_range is not None
+        for symbol, count in count_by_symbol.items()
+        if count > 0
+    )
+
+
+def use_transfer(row_count, col_count, count_by_symbol):
+    """
+    return True if `count_solutions` should count a problem with the
+    transfer matrix: only short-range pieces, on a board that is narrow
+    enough for the number of pieces (see `MAX_WIDTH_PER_PIECE`)
+    """
+    if not is_short_range(count_by_symbol):
+        return False
+    piece_count = sum(
+        count_by_symbol.get(cls.symbol, 0)
+        for cls in ChessPiece.class_list
+    )
+    max_width = MAX_WIDTH_PER_PIECE * (piece_count - 1)
+    return min(row_count, col_count) <= max_width
+
+
+def _back_masks(col_count, piece_id, attack_range):
+    """
+    return a list of bit masks for each column, of cells before a piece on
+    that column that it attacks, bit i is the cell i + 1 cells back
+    """
+    row_num = attack_range  # the last row of a board tall enough
+    attack_table = ChessPiece.attack_table(attack_range + 1, col_count)
+    masks = []
+    for col_num in range(col_count):
+        cell_num = row_num * col_count + col_num
+        attacked = attack_table[piece_id][cell_num] & ((1 << cell_num) - 1)
+        mask = 0
+        while attacked:
+            bit = attacked & -attacked
+            attacked ^= bit
+            mask |= 1 << (cell_num - bit.bit_length())
+        masks.append(mask)
+    return masks
+
+
+def count_solutions_transfer(row_count, col_count, count_by_symbol):
+    """count solution boards of a problem with only short-range pieces
+    (see `is_short_range`), with a transfer matrix over cells
+
+    row_count: int, number or rows
+    col_count: int, number of columns
+    count_by_symbol: dict of { piece_symbol => count }
+
+    returns the number of solutions that `find_solutions_s` would give
+    """
+    if not is_short_range(count_by_symbol):
+        raise ValueError('all piece types must have attack_range')
+    piece_ids = []
+    totals = []
+    for cls in ChessPiece.class_list:
+        count = count_by_symbol.get(cls.symbol, 0)
+        if count > 0:
+            piece_ids.append(cls.cid)
+            totals.append(count)
+    if not 0 < sum(totals) <= row_count * col_count:
+        return 0
+    if col_count > row_count:
+        # attacks are symmetric, so the transposed board has the same count
+        row_count, col_count = col_count, row_count
+    attack_range = max(
+        ChessPiece.class_list[piece_id].attack_range
+        for piece_id in piece_ids
+    )
+    back_masks = [
+        _back_masks(col_count, piece_id, attack_range)
+        for piece_id in piece_ids
+    ]
+    span = max(
+        mask.bit_length()
+        for masks in back_masks
+        for mask in masks
+    ) or 1
+    type_count = len(piece_ids)
+    # a window is kept in one int, as a `span`-bit occupancy mask for each
+    # piece type, bit 0 of each mask is the previous cell
+    keep = 0
+    for index in range(type_count):
+        keep |= ((1 << span) - 2) << (index * span)
+    # a new piece of type `index` on column `col_num` is valid if
+    # window & conflicts[col_num][index] == 0, that is, it does not attack
+    # any piece, and no piece of any type attacks it
+    conflicts = []
+    for col_num in range(col_count):
+        col_conflicts = []
+        for index in range(type_count):
+            conflict = 0
+            for other in range(type_count):
+                conflict |= (
+                    back_masks[index][col_num] | back_masks[other][col_num]
+                ) << (other * span)
+            col_conflicts.append(conflict)
+        conflicts.append(col_conflicts)
+    # counts of each window, by placed counts, are kept in one int, as
+    # `width`-bit fields, the field number of placed counts is
+    #   sum(placed[index] * radix[index])
+    # so we can add all counts of two windows with one addition, and count
+    # the ways to put a piece with a mask and a shift
+    radixes = []
+    size = 1
+    bound = 1  # more than any count, ignoring attacks
+    cell_count = row_count * col_count
+    for total in totals:
+        radixes.append(size)
+        size *= total + 1
+        bound *= comb(cell_count, min(total, cell_count // 2))
+    width = bound.bit_length() + 1
+    moves = []
+    for index, (radix, total) in enumerate(zip(radixes, totals)):
+        # fields that have less than `total` pieces of this type
+        addable = 0
+        for placed in range(size):
+            if placed // radix % (total + 1) < total:
+                addable |= 1 << (placed * width)
+        addable *= (1 << width) - 1
+        moves.append((1 << (index * span), radix * width, addable))
+
+    states = {0: 1}  # counts by window
+    for _ in range(row_count):
+        for col_conflicts in conflicts:
+            new_states = {}
+            get = new_states.get
+            for window, counts in states.items():
+                child = (window << 1) & keep  # leave the cell empty
+                new_states[child] = get(child, 0) + counts
+                for (bit, shift, addable), conflict in zip(
+                    moves,
+                    col_conflicts,
+                ):
+                    if window & conflict:
+                        continue
+                    added = (counts & addable) << shift
+                    if added:
+                        new_states[child | bit] = get(child | bit, 0) + added
+            states = new_states
+    field_mask = (1 << width) - 1
+    return sum(
+        counts >> ((size - 1) * width) & field_mask
+        for counts in states.values()
+    )
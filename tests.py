@@ -3,7 +3,16 @@
 this module contains test cases (based on Python's unittest)
 """
 
+import io
+import os
+import sys
+import json
+import random
+import asyncio
+import tempfile
 import unittest
+from unittest import mock
+from itertools import islice
 
 from pieces import (
     ChessPiece,
@@ -17,9 +26,81 @@ from pieces import (
 from solution import (
     find_solutions_s,
     find_solutions_r,
+    find_solutions_q,
+    find_solutions_bb,
+    iter_placed_bb,
+    find_solutions_pm,
+    find_solutions_u,
+    find_solutions,
+    count_solutions,
+    check_piece_order,
+)
+from solution_single import count_func_by_symbol, find_solutions_lines
+from solution_transfer import (
+    count_solutions_transfer,
+    is_short_range,
+    use_transfer,
+)
+from math_util import comb
+from solution_symmetry import (
+    board_symmetries,
+    find_canonical_solutions,
+    find_solutions_sym,
+    count_solutions_sym,
+)
+from solution_parallel import (
+    make_subproblems,
+    find_solutions_parallel,
+    count_solutions_parallel,
+)
+from solution_memo import (
+    MemoCounter,
+    count_solutions_memo,
+)
+from solution_bin import (
+    SolutionWriter,
+    SolutionStore,
+    read_header,
+    iter_boards_bin,
+    check_board_size,
+)
+from solution_checkpoint import (
+    CheckpointCounter,
+    resume_count,
+)
+from solution_numpy import find_solutions_np
+from solution_batch import run_batch, iter_jsonl
+from solution_cache import (
+    SolutionCache,
+    problem_key,
+    count_solutions_cached,
+)
+from solution_frontier import (
+    Frontier,
+    iter_frontier,
+    iter_solution_records,
+)
+from solution_progress import ProgressReporter
+from solution_estimate import estimate_tree, probe, TreeEstimate
+from solution_sample import SolutionSampler, sample_solutions
+from solution_rank import (
+    SolutionRanker,
+    rank_solution,
+    find_solutions_from,
+)
+from solution_stats import SearchStats, CUT_ATTACKS_BOARD, CUT_FORWARD
+from benchmark import (
+    CATALOGUE,
+    run_benchmark,
+    compare_results,
+    count_nodes,
 )
 from solution_analyze import check_board_iter_order
 
+if sys.version_info >= (3, 7):
+    # the solver service needs Python 3.7, see `serve_main` of main.py
+    from solution_server import SolverServer
+
 
 class ChessPieceTest(unittest.TestCase):
     """test case for ChessPiece class"""
@@ -81,6 +162,64 @@ class ChessPieceTest(unittest.TestCase):
         self.assertFalse(ChessPiece.pos_attacked_by_board(4, 3, board))
 
 
+class AttackTableTest(unittest.TestCase):
+    """test case for precomputed attack tables of ChessPiece classes"""
+    def test_attack_masks(self):
+        """
+        test method for ChessPiece.attack_masks class method
+        compare with attacks_pos method of each class
+        """
+        row_count, col_count = 4, 5
+        cell_count = row_count * col_count
+        for cls in ChessPiece.class_list:
+            masks = cls.attack_masks(row_count, col_count)
+            self.assertEqual(len(masks), cell_count)
+            for cell_num in range(cell_count):
+                piece = cls(*divmod(cell_num, col_count))
+                for other_num in range(cell_count):
+                    self.assertEqual(
+                        bool(masks[cell_num] >> other_num & 1),
+                        other_num != cell_num and
+                        piece.attacks_pos(*divmod(other_num, col_count)),
+                    )
+
+    def test_attack_table_cache(self):
+        """
+        the attack table of a board size must be built only once
+        """
+        self.assertIs(
+            ChessPiece.attack_table(6, 3),
+            ChessPiece.attack_table(6, 3),
+        )
+        self.assertIsNot(
+            ChessPiece.attack_table(6, 3),
+            ChessPiece.attack_table(3, 6),
+        )
+
+    def test_board_attack_mask(self):
+        """
+        test method for ChessPiece.board_attack_mask class method
+        compare with ChessPiece.pos_attacked_by_board
+        """
+        row_count, col_count = 5, 5
+        board = {
+            (0, 0): 'Q',
+            (0, 4): 'K',
+            (2, 4): 'R',
+            (3, 0): 'B',
+            (4, 4): 'N',
+        }
+        mask = ChessPiece.board_attack_mask(board, row_count, col_count)
+        for row_num in range(row_count):
+            for col_num in range(col_count):
+                if (row_num, col_num) in board:
+                    continue
+                self.assertEqual(
+                    bool(mask >> (row_num * col_count + col_num) & 1),
+                    ChessPiece.pos_attacked_by_board(row_num, col_num, board),
+                )
+
+
 class KingTest(unittest.TestCase):
     """test case for King class"""
     def test_attacks_1(self):
@@ -184,16 +323,17 @@ class KnightTest(unittest.TestCase):
 class SolutionCountTest(unittest.TestCase):
     """
     test case for counting unique solutions / configurations
-    using both stack and recursive implementations
+    using stack, recursive and bitboard implementations, and count_solutions
     (queue implementation is too slow, so we don't bother)
     """
     def check_count(self, solution_count, *args):
         """
         solution_count: known count of unique solutions / configurations
-        the rest of arguments (*args) are given to find_solutions_s
-            and find_solutions_r functions
+        the rest of arguments (*args) are given to find_solutions_s,
+            find_solutions_r and find_solutions_bb functions
 
-        calls TestCase.assertEqual for both stack and recursive implementations
+        calls TestCase.assertEqual for all 3 implementations,
+        count_solutions, find_solutions_pm and find_solutions_u
         """
         self.assertEqual(
             sum(1 for _ in find_solutions_s(*args)),  # 's' for stack
@@ -203,6 +343,19 @@ class SolutionCountTest(unittest.TestCase):
             sum(1 for _ in find_solutions_r(*args)),  # 'r' for recursive
             solution_count,
         )
+        self.assertEqual(
+            sum(1 for _ in find_solutions_bb(*args)),  # 'bb' for bitboard
+            solution_count,
+        )
+        self.assertEqual(count_solutions(*args), solution_count)
+        self.assertEqual(
+            sum(1 for _ in find_solutions_pm(*args)),  # 'pm' for piece-major
+            solution_count,
+        )
+        self.assertEqual(
+            sum(1 for _ in find_solutions_u(*args)),  # 'u' for undo
+            solution_count,
+        )
 
     def test_count_1(self):
         self.check_count(
@@ -260,18 +413,39 @@ class SolutionCountTest(unittest.TestCase):
             {'K': 3, 'N': 3},
         )
 
+    def test_count_empty(self):
+        self.check_count(
+            0,  # solution count
+            2,  # row count
+            2,  # column count
+            {},
+        )
+
+    def test_count_too_many(self):
+        self.check_count(
+            0,  # solution count
+            2,  # row count
+            2,  # column count
+            {'N': 5},
+        )
+
 
 class SolutionUniquenessTest(unittest.TestCase):
     """
     test case for checking uniqueness of solutions / configurations
-    using both stack and recursive implementations
-    (queue implementation is too slow, so we don't bother)
+    using stack, recursive, queue and bitboard implementations
     """
     def check_u_order(self, row_count, col_count, count_by_symbol):
         """
         checks the uniqueness and order of boards by stack implementations
         """
-        for find_solutions in (find_solutions_s, find_solutions_r):
+        for find_solutions in (
+            find_solutions_s,
+            find_solutions_r,
+            find_solutions_q,
+            find_solutions_bb,
+            find_solutions_u,
+        ):
             gen = find_solutions(row_count, col_count, count_by_symbol)
             self.assertTrue(check_board_iter_order(
                 gen,
@@ -300,6 +474,1016 @@ class SolutionUniquenessTest(unittest.TestCase):
             {'K': 2, 'Q': 1, 'B': 1, 'R': 1, 'N': 2},
         )
 
+    def test_bb_same_order(self):
+        """
+        bitboard implementation must give the same boards in the same order
+        as stack implementation
+        """
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        self.assertEqual(
+            list(find_solutions_bb(*args)),
+            list(find_solutions_s(*args)),
+        )
+
+
+class SinglePieceTypeTest(unittest.TestCase):
+    """
+    test case for fast paths of problems with only one piece type
+    """
+    def test_count(self):
+        for row_count, col_count in ((1, 4), (3, 3), (3, 5), (5, 4)):
+            for symbol, count_func in count_func_by_symbol.items():
+                for piece_count in range(6):
+                    self.assertEqual(
+                        count_func(row_count, col_count, piece_count),
+                        sum(1 for _ in find_solutions_bb(
+                            row_count,
+                            col_count,
+                            {symbol: piece_count},
+                        )),
+                        msg='%sx%s %s%s' % (
+                            row_count,
+                            col_count,
+                            symbol,
+                            piece_count,
+                        ),
+                    )
+        self.assertEqual(count_solutions(8, 8, {'Q': 8}), 92)
+        self.assertEqual(count_solutions(6, 6, {'N': 8}), 688946)
+
+    def test_find(self):
+        for symbol in ('Q', 'R'):
+            for row_count, col_count, piece_count in (
+                (4, 5, 3),
+                (5, 4, 4),
+                (6, 6, 6),
+            ):
+                self.assertEqual(
+                    list(find_solutions_lines(
+                        row_count,
+                        col_count,
+                        symbol,
+                        piece_count,
+                    )),
+                    list(find_solutions_s(
+                        row_count,
+                        col_count,
+                        {symbol: piece_count},
+                    )),
+                )
+        for count_by_symbol in ({'Q': 4}, {'B': 3}, {'K': 1, 'N': 2}):
+            self.assertEqual(
+                list(find_solutions(4, 4, count_by_symbol)),
+                list(find_solutions_s(4, 4, count_by_symbol)),
+            )
+
+
+class TransferTest(unittest.TestCase):
+    """
+    test case for transfer-matrix counting of short-range pieces
+    """
+    def test_count(self):
+        self.assertTrue(is_short_range({'K': 2, 'N': 1, 'Q': 0}))
+        self.assertFalse(is_short_range({'K': 2, 'B': 1}))
+        for row_count, col_count in ((1, 5), (3, 4), (5, 3), (4, 4)):
+            for count_by_symbol in (
+                {'K': 1, 'N': 2},
+                {'K': 2, 'N': 2},
+                {'K': 3, 'N': 1},
+            ):
+                self.assertEqual(
+                    count_solutions_transfer(
+                        row_count,
+                        col_count,
+                        count_by_symbol,
+                    ),
+                    sum(1 for _ in find_solutions_bb(
+                        row_count,
+                        col_count,
+                        count_by_symbol,
+                    )),
+                )
+        self.assertEqual(count_solutions(6, 6, {'K': 2, 'N': 2}), 59392)
+
+    def test_long_board(self):
+        # kings on one row: choose 3 cells with gaps, knights on one row
+        # never attack each other
+        self.assertEqual(
+            count_solutions_transfer(1000, 1, {'K': 3}),
+            comb(998, 3),
+        )
+        self.assertEqual(
+            count_solutions_transfer(1, 1000, {'N': 4}),
+            comb(1000, 4),
+        )
+
+    def test_use_transfer(self):
+        # count_bb is faster for a few pieces on a wide board
+        self.assertFalse(use_transfer(9, 9, {'K': 2, 'N': 1}))
+        self.assertFalse(use_transfer(10, 10, {'K': 1, 'N': 2}))
+        self.assertTrue(use_transfer(1000, 3, {'K': 2, 'N': 1}))
+        self.assertTrue(use_transfer(9, 9, {'K': 2, 'N': 2}))
+        self.assertFalse(use_transfer(3, 3, {'K': 2, 'B': 1}))
+        for row_count, col_count, count_by_symbol, expected in (
+            (9, 9, {'K': 2, 'N': 1}, False),
+            (20, 4, {'K': 2, 'N': 1}, True),
+        ):
+            with mock.patch(
+                'solution.count_solutions_transfer',
+                wraps=count_solutions_transfer,
+            ) as transfer:
+                count = count_solutions(row_count, col_count, count_by_symbol)
+            self.assertEqual(transfer.called, expected)
+            self.assertEqual(
+                count,
+                count_solutions_transfer(
+                    row_count,
+                    col_count,
+                    count_by_symbol,
+                ),
+            )
+
+
+class PieceMajorTest(unittest.TestCase):
+    """
+    test case for piece-major implementation
+    """
+    def test_same_set(self):
+        """
+        piece-major implementation must give the same set of boards as
+        stack implementation, with any order of piece types
+        """
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'R': 1, 'N': 2})
+        expected = {
+            tuple(sorted(board.items()))
+            for board in find_solutions_s(*args)
+        }
+        for piece_order in ('QRBKN', 'NKBRQ', 'K', 'KN', ''):
+            boards = [
+                tuple(sorted(board.items()))
+                for board in find_solutions_pm(*args, piece_order=piece_order)
+            ]
+            self.assertEqual(len(boards), len(expected))
+            self.assertEqual(set(boards), expected)
+
+    def test_piece_order(self):
+        args = (3, 3, {'K': 1, 'N': 1})
+        check_piece_order('NK')
+        for piece_order in ('KK', 'KX', 'NKN'):
+            self.assertRaises(ValueError, check_piece_order, piece_order)
+            self.assertRaises(
+                ValueError,
+                list,
+                find_solutions_pm(*args, piece_order=piece_order),
+            )
+        # checked even if the problem has no solution
+        self.assertRaises(
+            ValueError,
+            list,
+            find_solutions_pm(0, 0, {}, piece_order='KK'),
+        )
+
+
+class SymmetryTest(unittest.TestCase):
+    """
+    test case for symmetry-reduced search
+    """
+    def check_sym(self, row_count, col_count, count_by_symbol):
+        """
+        symmetry-reduced search must give the same set of boards as the
+        stack implementation, with no duplicates
+        """
+        args = (row_count, col_count, count_by_symbol)
+        expected = {
+            tuple(sorted(board.items()))
+            for board in find_solutions_s(*args)
+        }
+        boards = [
+            tuple(sorted(board.items()))
+            for board in find_solutions_sym(*args)
+        ]
+        self.assertEqual(len(boards), len(expected))
+        self.assertEqual(set(boards), expected)
+        self.assertEqual(count_solutions_sym(*args), len(expected))
+        self.assertEqual(
+            sum(size for _, size in find_canonical_solutions(*args)),
+            len(expected),
+        )
+
+    def test_symmetries(self):
+        self.assertEqual(len(board_symmetries(4, 4)), 8)
+        self.assertEqual(len(board_symmetries(3, 5)), 4)
+        for perm in board_symmetries(4, 4):
+            self.assertEqual(sorted(perm), list(range(16)))
+
+    def test_sym_1(self):
+        self.check_sym(4, 4, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+
+    def test_sym_2(self):
+        self.check_sym(5, 5, {'K': 2, 'Q': 1, 'B': 1, 'R': 1, 'N': 2})
+
+    def test_sym_3(self):
+        self.check_sym(4, 6, {'R': 1, 'N': 3})
+
+    def test_sym_4(self):
+        self.check_sym(3, 3, {'K': 1})
+
+
+class ParallelTest(unittest.TestCase):
+    """
+    test case for multi-process parallel solving
+    """
+    args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+
+    def test_subproblems(self):
+        subproblems = make_subproblems(*self.args, min_count=50)
+        self.assertGreaterEqual(len(subproblems), 50)
+        self.assertEqual(make_subproblems(2, 2, {}), [])
+
+    def test_count_parallel(self):
+        expected = count_solutions(*self.args)
+        for jobs in (1, 2):
+            self.assertEqual(
+                count_solutions_parallel(*self.args, jobs=jobs),
+                expected,
+            )
+
+    def test_find_parallel(self):
+        expected = list(find_solutions_bb(*self.args))
+        for jobs in (1, 2):
+            self.assertEqual(
+                list(find_solutions_parallel(*self.args, jobs=jobs)),
+                expected,
+            )
+
+
+class MemoCounterTest(unittest.TestCase):
+    """
+    test case for memoized counting
+    """
+    def test_count_memo(self):
+        for args in (
+            (3, 3, {'K': 2}),
+            (4, 4, {'K': 2, 'Q': 1, 'B': 1, 'N': 1}),
+            (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'R': 1, 'N': 2}),
+            (2, 2, {}),
+        ):
+            self.assertEqual(
+                count_solutions_memo(*args),
+                count_solutions(*args),
+            )
+
+    def test_memo_eviction(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'R': 1, 'N': 2})
+        counter = MemoCounter(5, 5, max_size=10)
+        self.assertEqual(counter.count(args[2]), count_solutions(*args))
+        stats = counter.get_stats()
+        self.assertLessEqual(stats['size'], 10)
+        self.assertGreater(stats['evictions'], 0)
+
+    def test_memo_hits(self):
+        counter = MemoCounter(5, 5)
+        count = counter.count({'N': 4})
+        self.assertGreater(counter.get_stats()['hits'], 0)
+        misses = counter.get_stats()['misses']
+        self.assertEqual(counter.count({'N': 4}), count)
+        self.assertEqual(counter.get_stats()['misses'], misses)
+
+
+class BinaryFormatTest(unittest.TestCase):
+    """
+    test case for binary solution file format
+    """
+    def test_write_read(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        boards = list(find_solutions_bb(*args))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'solutions.bin')
+            with open(path, 'wb') as fileobj:
+                with SolutionWriter(fileobj, *args, buffer_size=100) as writer:
+                    for board in boards:
+                        writer.write(board)
+            with open(path, 'rb') as fileobj:
+                header = read_header(fileobj)
+            self.assertEqual(header['row_count'], 5)
+            self.assertEqual(header['col_count'], 5)
+            self.assertEqual(header['count_by_symbol']['K'], 2)
+            self.assertEqual(header['count_by_symbol']['R'], 0)
+            self.assertEqual(header['record_count'], len(boards))
+            self.assertEqual(header['record_size'], 5 * 3)
+            self.assertEqual(
+                os.path.getsize(path),
+                header['header_size'] + len(boards) * header['record_size'],
+            )
+            self.assertEqual(list(iter_boards_bin(path, 1000)), boards)
+
+    def test_store(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        boards = list(find_solutions_bb(*args))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'solutions.bin')
+            with open(path, 'wb') as fileobj:
+                with SolutionWriter(fileobj, *args) as writer:
+                    for board in boards:
+                        writer.write(board)
+            with SolutionStore(path) as store:
+                self.assertEqual(len(store), len(boards))
+                self.assertEqual(store[0], boards[0])
+                self.assertEqual(store[1234], boards[1234])
+                self.assertEqual(store[-1], boards[-1])
+                with self.assertRaises(IndexError):
+                    store[len(boards)]
+                view = store[100:200]
+                self.assertEqual(len(view), 100)
+                self.assertEqual(list(view), boards[100:200])
+                self.assertEqual(list(view[10:20:3]), boards[110:120:3])
+                self.assertEqual(list(store[::1000]), boards[::1000])
+                buf = view.get_buffer()
+                self.assertEqual(len(buf), 100 * store.record_size)
+                buf.release()
+
+    def test_too_large(self):
+        for row_count, col_count in ((300, 300), (1, 0x10000)):
+            with self.assertRaises(ValueError):
+                SolutionWriter(io.BytesIO(), row_count, col_count, {'K': 1})
+            with self.assertRaises(ValueError):
+                check_board_size(row_count, col_count)
+        check_board_size(256, 256)
+
+    def test_bad_magic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'solutions.bin')
+            with open(path, 'wb') as fileobj:
+                fileobj.write(b'X' * 100)
+            with self.assertRaises(ValueError):
+                list(iter_boards_bin(path))
+
+
+class _StopCounter(CheckpointCounter):
+    """
+    a CheckpointCounter that is interrupted after its first checkpoint
+    """
+    def save(self):
+        CheckpointCounter.save(self)
+        if self.todo:
+            raise KeyboardInterrupt
+
+
+class CheckpointTest(unittest.TestCase):
+    """
+    test case for counting with checkpoints and resuming
+    """
+    def test_resume(self):
+        args = (6, 6, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'checkpoint.json')
+            counter = _StopCounter(
+                *args,
+                path=path,
+                interval=None,
+                interval_nodes=2000
+            )
+            with self.assertRaises(KeyboardInterrupt):
+                counter.run()
+            self.assertFalse(counter.is_done())
+            loaded = CheckpointCounter.load(path)
+            self.assertEqual(loaded.nodes, counter.nodes)
+            self.assertEqual(loaded.todo, counter.todo)
+            self.assertEqual(resume_count(path), count_solutions(*args))
+
+    def test_count(self):
+        for args in (
+            (3, 3, {'K': 2, 'R': 1}),
+            (4, 4, {'R': 2, 'N': 4}),
+            (2, 2, {}),
+            (2, 2, {'N': 5}),
+        ):
+            self.assertEqual(
+                CheckpointCounter(*args).run(),
+                count_solutions(*args),
+            )
+
+
+class ForwardCheckTest(unittest.TestCase):
+    """
+    test case for forward checking of stack and recursive engines
+    """
+    def test_forward_check(self):
+        for row_count, col_count, count_by_symbol in (
+            (4, 4, {'K': 1, 'Q': 1, 'N': 2}),
+            (5, 4, {'Q': 2, 'R': 2}),
+            (6, 6, {'Q': 6}),
+        ):
+            args = (row_count, col_count, count_by_symbol)
+            stats = SearchStats()
+            stats_fc = SearchStats()
+            boards = list(find_solutions_s(*args, stats=stats))
+            self.assertEqual(
+                list(find_solutions_s(*args, stats=stats_fc,
+                                      forward_check=True)),
+                boards,
+            )
+            self.assertEqual(
+                list(find_solutions_s(*args, forward_check=True)),
+                boards,
+            )
+            self.assertEqual(
+                list(find_solutions_r(*args, forward_check=True)),
+                boards,
+            )
+            self.assertTrue(stats_fc.get_cut_count(CUT_FORWARD) > 0)
+            self.assertTrue(
+                stats_fc.get_node_count() < stats.get_node_count()
+            )
+
+
+class EstimateTest(unittest.TestCase):
+    """
+    test case for estimating size of search tree
+    """
+    def test_probe(self):
+        # the mean of probes converges to the real numbers
+        args = (4, 4, {'R': 2, 'N': 2})
+        stage = [
+            args[2].get(cls.symbol, 0)
+            for cls in ChessPiece.class_list
+        ]
+        attack_table = ChessPiece.attack_table(4, 4)
+        rand = random.Random(1)
+        total_nodes = 0
+        total_solutions = 0
+        probe_count = 5000
+        for _ in range(probe_count):
+            nodes, solutions = probe(attack_table, 16, stage, rand)
+            total_nodes += nodes
+            total_solutions += solutions
+        self.assertEqual(stage, [0, 0, 0, 2, 2])
+        self.assertAlmostEqual(
+            total_nodes / probe_count / count_nodes(*args),
+            1,
+            delta=0.1,
+        )
+        self.assertAlmostEqual(
+            total_solutions / probe_count / count_solutions(*args),
+            1,
+            delta=0.2,
+        )
+
+    def test_estimate(self):
+        estimate = estimate_tree(4, 4, {'R': 2, 'N': 2})
+        self.assertTrue(estimate.exact)
+        self.assertEqual((estimate.nodes, estimate.solutions), (586, 88))
+        self.assertIsNone(estimate.fast_path)
+        estimate = estimate_tree(
+            6,
+            6,
+            {'K': 2, 'Q': 2, 'B': 2, 'N': 1},
+            time_budget=0.5,
+            max_probes=256,
+            seed=1,
+        )
+        self.assertFalse(estimate.exact)
+        self.assertEqual(estimate.probes, 256)
+        low, high = estimate.nodes_interval
+        self.assertTrue(low <= estimate.nodes <= high)
+        self.assertIn('Estimated running time', estimate.format_table())
+
+    def test_coverage(self):
+        # with enough hits, the interval of solutions contains the real
+        # number in most runs, with a few hits it's marked as not reliable,
+        # and its upper bound is open
+        args = (5, 5, {'Q': 2, 'B': 2, 'K': 1})
+        solution_count = count_solutions(*args)
+        stage = [
+            args[2].get(cls.symbol, 0)
+            for cls in ChessPiece.class_list
+        ]
+        attack_table = ChessPiece.attack_table(5, 5)
+        for probe_count, reliable, min_covered in (
+            (3000, True, 18),
+            (300, False, 20),
+        ):
+            covered = 0
+            for seed in range(20):
+                rand = random.Random(seed)
+                node_values = []
+                solution_values = []
+                for _ in range(probe_count):
+                    nodes, solutions = probe(attack_table, 25, stage, rand)
+                    node_values.append(nodes)
+                    solution_values.append(solutions)
+                estimate = TreeEstimate(
+                    probe_count,
+                    node_values,
+                    solution_values,
+                    0.0,
+                    0.95,
+                )
+                self.assertEqual(estimate.reliable, reliable)
+                low, high = estimate.solutions_interval
+                if low <= solution_count <= high:
+                    covered += 1
+            self.assertTrue(covered >= min_covered)
+        self.assertIn('not reliable', estimate.format_table())
+
+    def test_fast_path(self):
+        # counted by `solution_single`, much faster than searching
+        estimate = estimate_tree(12, 12, {'B': 12})
+        self.assertTrue(estimate.exact)
+        self.assertEqual(estimate.fast_path, 'single piece type')
+        self.assertEqual(estimate.solutions, 17029582652416)
+        self.assertIsNone(estimate.nodes)
+        self.assertTrue(estimate.runtime < 1)
+        self.assertIn('fast path', estimate.format_table())
+        self.assertEqual(estimate.to_dict()['nodes_interval'], None)
+
+
+class RankTest(unittest.TestCase):
+    """
+    test case for rank and unrank of solutions
+    """
+    def test_rank(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        solutions = list(find_solutions_s(*args))
+        ranker = SolutionRanker(*args)
+        self.assertEqual(ranker.get_total(), len(solutions))
+        for index in range(0, len(solutions), 97):
+            self.assertEqual(ranker.unrank(index), solutions[index])
+            self.assertEqual(ranker.rank(solutions[index]), index)
+        self.assertRaises(IndexError, ranker.unrank, len(solutions))
+        self.assertRaises(
+            ValueError,
+            ranker.rank,
+            {(0, 0): 'K', (0, 1): 'K', (2, 2): 'Q', (4, 0): 'B', (4, 4): 'N'},
+        )
+        # cells off the board must not be taken as other cells, like (0, 3)
+        # as (1, 0)
+        for cell in ((0, 3), (-1, 0), (3, 0)):
+            self.assertRaises(
+                ValueError,
+                rank_solution,
+                3,
+                3,
+                {'K': 1},
+                {cell: 'K'},
+            )
+
+    def test_find_solutions_from(self):
+        args = (4, 4, {'R': 2, 'N': 2})
+        solutions = list(find_solutions_s(*args))
+        for offset in range(len(solutions) + 2):
+            self.assertEqual(
+                list(find_solutions_from(*args, offset=offset)),
+                solutions[offset:],
+            )
+        solutions = list(find_solutions_s(3, 3, {'N': 1}))
+        for offset in range(len(solutions) + 1):
+            self.assertEqual(
+                list(find_solutions_from(3, 3, {'N': 1}, offset)),
+                solutions[offset:],
+            )
+
+    def test_iter_from_lazy(self):
+        # the first solutions are given without counting the problem
+        ranker = SolutionRanker(8, 8, {'K': 2, 'Q': 2, 'B': 2, 'N': 2})
+        with mock.patch.object(
+            ranker.counter,
+            'count_state',
+            wraps=ranker.counter.count_state,
+        ) as count_state:
+            boards = list(islice(ranker.iter_from(0), 3))
+        self.assertFalse(count_state.called)
+        self.assertEqual(len(boards), 3)
+
+
+class SampleTest(unittest.TestCase):
+    """
+    test case for uniform random sampling of solutions
+    """
+    def check_uniform(self, sampler, count_by_symbol):
+        args = (sampler.row_count, sampler.col_count, count_by_symbol)
+        solution_set = {
+            tuple(sorted(board.items()))
+            for board in find_solutions_s(*args)
+        }
+        counts = {}
+        for _ in range(100 * len(solution_set)):
+            key = tuple(sorted(sampler.sample().items()))
+            counts[key] = counts.get(key, 0) + 1
+        self.assertEqual(set(counts), solution_set)
+        self.assertTrue(all(50 < count < 150 for count in counts.values()))
+
+    def test_rejection(self):
+        sampler = SolutionSampler(3, 3, {'K': 2}, seed=1)
+        self.check_uniform(sampler, {'K': 2})
+        self.assertTrue(sampler.use_rejection)
+
+    def test_tree(self):
+        sampler = SolutionSampler(4, 4, {'R': 2, 'N': 2}, seed=1)
+        sampler.use_rejection = False
+        self.check_uniform(sampler, {'R': 2, 'N': 2})
+
+    def test_sample_solutions(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        boards = sample_solutions(*args, 5, seed=2)
+        self.assertEqual(len(boards), 5)
+        self.assertEqual(boards, sample_solutions(*args, 5, seed=2))
+        solution_set = {
+            tuple(sorted(board.items()))
+            for board in find_solutions_s(*args)
+        }
+        for board in boards:
+            self.assertIn(tuple(sorted(board.items())), solution_set)
+        self.assertEqual(sample_solutions(3, 3, {'Q': 4}, 5), [])
+
+
+class SearchStatsTest(unittest.TestCase):
+    """
+    test case for search statistics of stack and bitboard engines
+    """
+    def test_stats(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        stats_s = SearchStats()
+        boards = list(find_solutions_s(*args, stats=stats_s))
+        self.assertEqual(boards, list(find_solutions_s(*args)))
+        stats_bb = SearchStats()
+        self.assertEqual(
+            list(find_solutions_bb(*args, stats=stats_bb)),
+            boards,
+        )
+        for stats in (stats_s, stats_bb):
+            self.assertEqual(stats.solutions, len(boards))
+            depth_table = stats.get_depth_table()
+            self.assertEqual(depth_table[-1][1], len(boards))
+            self.assertTrue(stats.get_cut_count(CUT_ATTACKS_BOARD) > 0)
+            self.assertTrue(stats.get_elapsed() > 0)
+            self.assertIn('Nodes per second', stats.format_table())
+        self.assertEqual(stats_s.nodes, stats_bb.nodes)
+        self.assertEqual(stats_s.get_node_count(), count_nodes(*args))
+
+    def test_same_boards(self):
+        """
+        engines with statistics have separate copies of their loops, which
+        must give the same boards in the same order
+        """
+        engines = (
+            (find_solutions_s, {}),
+            (find_solutions_s, {'forward_check': True}),
+            (find_solutions_bb, {}),
+        )
+        for _, tier, row_count, col_count, count_by_symbol, _ in CATALOGUE:
+            if tier != 'smoke':
+                continue
+            args = (row_count, col_count, count_by_symbol)
+            for find_solutions, kwargs in engines:
+                self.assertEqual(
+                    list(find_solutions(*args, stats=SearchStats(), **kwargs)),
+                    list(find_solutions(*args, **kwargs)),
+                )
+
+
+class FrontierTest(unittest.TestCase):
+    """
+    test case for breadth-first search with spilled frontier
+    """
+    def test_spill(self):
+        frontier = Frontier(3, memory_limit=10)
+        records = [bytes([n, n, n]) for n in range(100)]
+        for record in records:
+            frontier.append(record)
+        self.assertTrue(frontier.is_spilled())
+        self.assertEqual(len(frontier), 100)
+        self.assertEqual(list(frontier), records)
+        frontier.close()
+
+    def test_queue_spilled(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'R': 1, 'N': 2})
+        self.assertEqual(
+            list(find_solutions_q(*args, memory_limit=100)),
+            list(find_solutions_bb(*args)),
+        )
+
+    def test_frontier(self):
+        args = (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        states = list(iter_frontier(*args, depth=2))
+        self.assertEqual(states[0][2], 3)  # stage_size
+        self.assertEqual(
+            sum(
+                1 for _ in iter_placed_bb(
+                    ChessPiece.attack_table(5, 5),
+                    25,
+                    list(reversed(states)),
+                )
+            ),
+            count_solutions(*args),
+        )
+        # symbols that are not piece types are not counted as pieces
+        self.assertEqual(
+            len(list(iter_solution_records(3, 3, {'K': 1, 'X': 2}))),
+            9,
+        )
+        with self.assertRaises(ValueError):
+            next(iter_solution_records(300, 300, {'K': 1}))
+
+
+class NumpyTest(unittest.TestCase):
+    """
+    test case for NumPy batch implementation (which falls back to bitboard
+    implementation if NumPy is not installed)
+    """
+    def test_same_order(self):
+        for args in (
+            (5, 5, {'K': 2, 'Q': 1, 'B': 1, 'R': 1, 'N': 2}),
+            (6, 4, {'Q': 2, 'N': 3}),
+            (8, 8, {'Q': 8}),
+        ):
+            self.assertEqual(
+                list(find_solutions_np(*args, batch_size=100)),
+                list(find_solutions_s(*args)),
+            )
+
+    def test_count_empty(self):
+        self.assertEqual(list(find_solutions_np(3, 3, {})), [])
+        self.assertEqual(list(find_solutions_np(2, 2, {'N': 5})), [])
+        with self.assertRaises(ValueError):
+            list(find_solutions_np(3, 3, {'K': 1}, batch_size=0))
+
+
+class BatchTest(unittest.TestCase):
+    """
+    test case for solving problems given as JSON lines
+    """
+    def test_batch(self):
+        lines = [
+            '{"id": 1, "rows": 4, "cols": 4, "pieces": {"R": 2, "N": 4}}',
+            '',
+            '{"rows": 3, "cols": 3, "pieces": {"K": 2, "R": 1}, '
+            '"method": "memo"}',
+            '{"rows": 3, "cols": 3, "pieces": {"K": 2}, "method": "stats"}',
+            '{"rows": 4, "cols": 4, "pieces": {"R": 4}, "method": "symmetry"}',
+            '{"rows": 3}',
+            'bad line',
+        ]
+        items = list(iter_jsonl(lines))
+        self.assertEqual(len(items), 6)
+        for jobs in (1, 2):
+            results = sorted(
+                run_batch(list(items), jobs=jobs),
+                key=lambda result: result['index'],
+            )
+            self.assertEqual(
+                [result.get('count') for result in results],
+                [8, 4, 16, 24, None, None],
+            )
+            self.assertEqual(results[0]['id'], 1)
+            self.assertEqual(results[2]['stats']['solutions'], 16)
+            self.assertIn('error', results[4])
+            self.assertIn('error', results[5])
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'needs Python 3.7')
+class ServerTest(unittest.TestCase):
+    """
+    test case for the local solver service
+    """
+    def test_coalesce(self):
+        server = SolverServer(jobs=1)
+
+        async def run():
+            first = await asyncio.gather(
+                server.count(4, 5, {'K': 2, 'N': 2}),
+                server.count(5, 4, {'K': 2, 'N': 2}),
+            )
+            second = await server.count(4, 5, {'K': 2, 'N': 2})
+            return first, second
+
+        try:
+            first, second = asyncio.run(run())
+        finally:
+            server.close()
+        count = count_solutions(4, 5, {'K': 2, 'N': 2})
+        self.assertEqual(
+            first,
+            [(count, 'computed'), (count, 'coalesced')],
+        )
+        self.assertEqual(second, (count, 'cached'))
+        self.assertEqual(server.computations, 1)
+
+    def test_cache_file(self):
+        # the cache file is used on a thread of its own, not the event loop
+        with SolutionCache(':memory:') as cache:
+            cache.put_count(3, 3, {'K': 2}, 16)
+            server = SolverServer(jobs=1, cache=cache)
+
+            async def run():
+                return await asyncio.gather(
+                    server.count(3, 3, {'K': 2}),
+                    server.count(4, 4, {'K': 2}),
+                )
+
+            try:
+                results = asyncio.run(run())
+            finally:
+                server.close()
+            count = count_solutions(4, 4, {'K': 2})
+            self.assertEqual(results, [(16, 'cached'), (count, 'computed')])
+            self.assertEqual(cache.get_count(4, 4, {'K': 2}), count)
+            self.assertEqual(server.cache_hits, 1)
+
+    def test_requests(self):
+        server = SolverServer(jobs=1)
+
+        async def run():
+            async_server = await server.start(port=0)
+            host, port = async_server.sockets[0].getsockname()[:2]
+            reader, writer = await asyncio.open_connection(host, port)
+            requests = [
+                {'id': 1, 'op': 'count', 'rows': 4, 'cols': 4,
+                 'pieces': {'R': 4}},
+                {'id': 2, 'op': 'enumerate', 'rows': 3, 'cols': 3,
+                 'pieces': {'K': 2, 'R': 1}},
+                {'id': 3, 'op': 'enumerate', 'rows': 4, 'cols': 4,
+                 'pieces': {'N': 4}, 'limit': 5},
+                {'id': 4, 'op': 'count', 'rows': 0, 'cols': 4},
+            ]
+            for data in requests:
+                writer.write(json.dumps(data).encode('utf-8') + b'\n')
+            writer.write_eof()
+            responses = []
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                responses.append(json.loads(line.decode('utf-8')))
+            writer.close()
+            async_server.close()
+            await async_server.wait_closed()
+            return responses
+
+        try:
+            responses = asyncio.run(run())
+        finally:
+            server.close()
+        by_id = {}
+        for response in responses:
+            by_id.setdefault(response['id'], []).append(response)
+        self.assertEqual(
+            by_id[1],
+            [{'id': 1, 'count': 24, 'source': 'computed'}],
+        )
+        boards = [
+            {(row_num, col_num): symbol for row_num, col_num, symbol in
+             response['board']}
+            for response in by_id[2][:-1]
+        ]
+        self.assertEqual(
+            boards,
+            list(find_solutions_s(3, 3, {'K': 2, 'R': 1})),
+        )
+        self.assertEqual(by_id[2][-1], {'id': 2, 'done': True, 'count': 4})
+        self.assertEqual(len(by_id[3]), 6)
+        self.assertEqual(by_id[3][-1]['count'], 5)
+        self.assertIn('error', by_id[4][0])
+
+    def test_errors(self):
+        server = SolverServer(jobs=1)
+        server.executor.shutdown()  # so counting fails
+        responses = []
+
+        async def send(response):
+            responses.append(response)
+
+        def find_solutions_broken(*args):
+            yield {(0, 0): 'K'}
+            raise RuntimeError('broken')
+
+        async def run():
+            await server.handle_request(
+                {'id': 1, 'rows': 3, 'cols': 3, 'pieces': {'K': 1}},
+                send,
+            )
+            with mock.patch(
+                'solution_server.find_solutions_u',
+                find_solutions_broken,
+            ):
+                await server.handle_request(
+                    {'id': 2, 'op': 'enumerate', 'rows': 3, 'cols': 3,
+                     'pieces': {'K': 1}},
+                    send,
+                )
+
+        try:
+            asyncio.run(run())
+        finally:
+            server.close()
+        self.assertEqual(responses[0]['id'], 1)
+        self.assertIn('error', responses[0])
+        self.assertEqual(responses[1]['id'], 2)
+        self.assertIn('board', responses[1])
+        self.assertEqual(
+            responses[2],
+            {'id': 2, 'error': 'RuntimeError: broken'},
+        )
+
+
+class SolutionCacheTest(unittest.TestCase):
+    """
+    test case for persistent cache of solution counts
+    """
+    def test_key(self):
+        self.assertEqual(
+            problem_key(4, 6, {'K': 2, 'N': 1}),
+            problem_key(6, 4, {'N': 1, 'K': 2, 'Q': 0}),
+        )
+        self.assertNotEqual(
+            problem_key(4, 6, {'K': 2}),
+            problem_key(4, 6, {'K': 3}),
+        )
+
+    def test_cache(self):
+        calls = []
+
+        def count_func(*args):
+            calls.append(args)
+            return count_solutions(*args)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'cache', 'counts.sqlite3')
+            with SolutionCache(path, max_entries=2) as cache:
+                args = (3, 4, {'K': 2, 'R': 1})
+                count = count_solutions(*args)
+                for row_count, col_count in ((3, 4), (4, 3), (3, 4)):
+                    self.assertEqual(count_solutions_cached(
+                        row_count,
+                        col_count,
+                        args[2],
+                        cache=cache,
+                        count_func=count_func,
+                    ), count)
+                self.assertEqual(len(calls), 1)
+                cache.put_count(5, 5, {'N': 1}, 25)
+                cache.put_count(5, 5, {'N': 2}, 2 ** 70)
+                self.assertEqual(cache.get_size(), 2)
+                self.assertIsNone(cache.get_count(*args))  # evicted
+                self.assertEqual(cache.get_count(5, 5, {'N': 2}), 2 ** 70)
+            with SolutionCache(path) as cache:  # persistent
+                self.assertEqual(cache.get_count(5, 5, {'N': 1}), 25)
+                cache.put_solutions_path(5, 5, {'N': 1}, path)
+                self.assertEqual(
+                    cache.get_solutions_path(5, 5, {'N': 1}),
+                    os.path.abspath(path),
+                )
+                self.assertIsNone(cache.get_solutions_path(5, 5, {'N': 2}))
+
+
+class ProgressTest(unittest.TestCase):
+    """
+    test case for progress reporter and completed fraction of search
+    """
+    def test_progress(self):
+        stream = io.StringIO()
+        progress = ProgressReporter(stream, interval=0)
+        args = (6, 6, {'K': 2, 'Q': 1, 'B': 1, 'N': 1})
+        counter = CheckpointCounter(*args, progress=progress)
+        self.assertEqual(counter.run(), count_solutions(*args))
+        self.assertAlmostEqual(counter.done, 1.0)
+        output = stream.getvalue()
+        self.assertIn('solutions: ', output)
+        self.assertIn('ETA: ', output)
+        self.assertTrue(output.endswith('\r'))
+
+    def test_eta(self):
+        progress = ProgressReporter(io.StringIO())
+        progress.start(0.2, 1000)
+        self.assertIsNone(progress.get_eta(0.2, 10))
+        self.assertAlmostEqual(progress.get_eta(0.6, 10), 10)
+
+
+class BenchmarkTest(unittest.TestCase):
+    """
+    test case for benchmark suite
+    """
+    def test_run_compare(self):
+        data = run_benchmark(
+            CATALOGUE[:2],
+            ['stack', 'count'],
+            repeat=2,
+            warmup=0,
+            memory=False,
+        )
+        results = data['results']
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['count'], 4)
+        self.assertEqual(results[0]['nodes'], results[1]['nodes'])
+        rows = compare_results(data, data)
+        self.assertEqual(len(rows), 4)
+        self.assertFalse(any(row[-1] for row in rows))
+        slow = {'results': [
+            dict(result, median=result['median'] * 2 + 1)
+            for result in results
+        ]}
+        self.assertTrue(all(row[-1] for row in compare_results(data, slow)))
+
 
 if __name__ == '__main__':
     unittest.main()